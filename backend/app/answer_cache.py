@@ -0,0 +1,112 @@
+import os
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.cache import LRUCache
+
+# In-memory answer cache configuration
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "10000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+# Comma-separated normalization rules applied to questions before lookup
+ANSWER_CACHE_NORMALIZATION = os.getenv(
+    "ANSWER_CACHE_NORMALIZATION", "lowercase,spelling,punctuation,whitespace"
+)
+
+# British spellings mapped to the American form so both hit the same entry
+SPELLING_VARIANTS = {
+    "colour": "color",
+    "colours": "colors",
+    "coloured": "colored",
+    "grey": "gray",
+    "centre": "center",
+    "metre": "meter",
+    "metres": "meters",
+    "theatre": "theater",
+    "favourite": "favorite",
+    "neighbour": "neighbor",
+    "neighbours": "neighbors",
+    "aeroplane": "airplane",
+    "aeroplanes": "airplanes",
+    "tyre": "tire",
+    "tyres": "tires",
+    "jewellery": "jewelry",
+    "organise": "organize",
+    "recognise": "recognize",
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WORD = re.compile(r"\w+")
+
+
+def _lowercase(text: str) -> str:
+    return text.lower()
+
+
+def _spelling(text: str) -> str:
+    return _WORD.sub(lambda m: SPELLING_VARIANTS.get(m.group(0), m.group(0)), text)
+
+
+def _punctuation(text: str) -> str:
+    return _PUNCTUATION.sub(" ", text)
+
+
+def _whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+
+NORMALIZATION_RULES = {
+    "lowercase": _lowercase,
+    "spelling": _spelling,
+    "punctuation": _punctuation,
+    "whitespace": _whitespace,
+}
+
+
+class AnswerCache:
+    """
+    In-process LRU/TTL cache of VQA answers keyed on
+    (image content hash, normalized question).
+
+    Sits in front of db.get_or_create_answer so repeated questions are
+    answered without a database round-trip.
+    """
+
+    def __init__(self, max_entries: int, ttl: Optional[float], rules: Iterable[str]):
+        self.rules = [rule.strip() for rule in rules if rule.strip()]
+        unknown = [rule for rule in self.rules if rule not in NORMALIZATION_RULES]
+        if unknown:
+            raise ValueError(
+                f"Unknown normalization rules {unknown}, expected any of {list(NORMALIZATION_RULES)}"
+            )
+        self.cache = LRUCache(max_entries=max_entries, ttl=ttl)
+
+    def normalize(self, question: str) -> str:
+        for rule in self.rules:
+            question = NORMALIZATION_RULES[rule](question)
+        return question
+
+    def get(self, image_hash: str, question: str) -> Optional[Tuple[str, float]]:
+        """
+        Returns:
+            tuple: (answer, confidence), or None on a miss
+        """
+        return self.cache.get((image_hash, self.normalize(question)))
+
+    def put(self, image_hash: str, question: str, answer: str, confidence: float):
+        self.cache.put((image_hash, self.normalize(question)), (answer, confidence))
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> Dict:
+        stats = self.cache.stats()
+        stats["normalization"] = self.rules
+        return stats
+
+
+answer_cache = AnswerCache(
+    max_entries=ANSWER_CACHE_SIZE,
+    ttl=ANSWER_CACHE_TTL if ANSWER_CACHE_TTL > 0 else None,
+    rules=ANSWER_CACHE_NORMALIZATION.split(","),
+)
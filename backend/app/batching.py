@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+from PIL import Image
+
+
+class VQABatchScheduler:
+    """
+    Collects concurrent VQA requests into micro-batches.
+
+    Callers submit a single (image, question) pair and get back a Future.
+    A background worker waits up to `window_ms` after the first pending
+    request for more requests to arrive (or until `max_batch_size` is
+    reached) and then runs them together through `run_batch`.
+
+    run_batch: a function taking (images, questions) and returning a list
+               of (answer, confidence) tuples in the same order.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Image.Image], List[str]], List[Tuple[str, float]]],
+        max_batch_size: int = 8,
+        window_ms: float = 25.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.window_ms = window_ms
+
+        self._queue: "queue.Queue[Tuple[Image.Image, str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        self._batches_run = 0
+        self._requests_served = 0
+        self._largest_batch = 0
+
+    def submit(self, image: Image.Image, question: str) -> Future:
+        """
+        Queue an image/question pair for the next batch.
+
+        Returns:
+            Future: resolves to (answer, confidence)
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((image, question, future))
+        return future
+
+    def stats(self) -> Dict:
+        """
+        Get batching statistics.
+        """
+        with self._lock:
+            return {
+                "batches_run": self._batches_run,
+                "requests_served": self._requests_served,
+                "largest_batch": self._largest_batch,
+                "avg_batch_size": (
+                    self._requests_served / self._batches_run if self._batches_run else 0.0
+                ),
+                "pending": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.window_ms,
+            }
+
+    def _ensure_worker(self):
+        # Start the worker on first use so importing the module stays cheap
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run_forever, name="vqa-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run_forever(self):
+        while True:
+            batch = self._collect_batch()
+
+            # Drop requests whose callers have already given up
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            images = [item[0] for item in batch]
+            questions = [item[1] for item in batch]
+
+            try:
+                results = self.run_batch(images, questions)
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"run_batch returned {len(results)} results for {len(batch)} requests"
+                    )
+            except Exception as e:
+                print(f"[ERROR] VQA batch of {len(batch)} failed: {e}")
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+            with self._lock:
+                self._batches_run += 1
+                self._requests_served += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import torch
+
+
+def tensor_nbytes(tensor: torch.Tensor) -> int:
+    """
+    Size of a tensor's data in bytes.
+    """
+    return tensor.element_size() * tensor.nelement()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by entry count and/or size.
+
+    Args:
+        max_bytes: Evict once the summed size of all entries exceeds this
+        max_entries: Evict once there are more entries than this
+        size_of: Function returning the size in bytes of a value
+                 (required when max_bytes is set)
+        ttl: Seconds after which an entry expires (None never expires)
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        size_of: Optional[Callable[[Any], int]] = None,
+        ttl: Optional[float] = None,
+    ):
+        if max_bytes is not None and size_of is None:
+            raise ValueError("size_of is required when max_bytes is set")
+
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size_of = size_of or (lambda value: 0)
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= entry[1]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        Insert or replace a value.
+
+        Returns:
+            bool: False if the value alone is larger than max_bytes and
+                  was not stored
+        """
+        size = self.size_of(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            self._evict()
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "ttl": self.ttl,
+            }
+
+    def _evict(self):
+        # Caller holds the lock
+        while self._entries and (
+            (self.max_bytes is not None and self._bytes > self.max_bytes)
+            or (self.max_entries is not None and len(self._entries) > self.max_entries)
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
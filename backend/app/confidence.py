@@ -0,0 +1,60 @@
+from typing import List
+
+import torch
+from transformers import LogitsProcessor
+
+# last_token:   probability of the final generated token (the original behaviour)
+# mean_logprob: geometric mean of the chosen-token probabilities
+# min_prob:     probability of the least certain generated token
+CONFIDENCE_MODES = ("last_token", "mean_logprob", "min_prob")
+
+
+class ConfidenceTracker(LogitsProcessor):
+    """
+    Logits processor that records the log-probability of the most likely
+    token at every decoding step and leaves the scores untouched.
+
+    Only one float per row per step is kept, instead of the full
+    vocabulary-sized logits that output_scores=True holds for every step,
+    so memory stays flat however long the answer is. With greedy decoding
+    the most likely token is the generated token.
+    """
+
+    def __init__(self):
+        self.step_logprobs: List[torch.Tensor] = []
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        with torch.no_grad():
+            logits = scores.float()
+            logprob = logits.max(dim=-1).values - torch.logsumexp(logits, dim=-1)
+        self.step_logprobs.append(logprob)
+        return scores
+
+    def confidence(self, row: int, last_step: int, mode: str = "last_token") -> float:
+        """
+        Confidence for one row of the batch.
+
+        Args:
+            row: Row index in the batch
+            last_step: Index of the step that produced the row's final token
+                       (later steps are padding for rows that finished early)
+            mode: One of CONFIDENCE_MODES
+
+        Returns:
+            float: Confidence in [0, 1]
+        """
+        if mode not in CONFIDENCE_MODES:
+            raise ValueError(f"Unknown confidence mode '{mode}', expected one of {CONFIDENCE_MODES}")
+        if not self.step_logprobs:
+            return 1.0  # fallback
+
+        logprobs = torch.stack(self.step_logprobs[:last_step + 1])[:, row]
+
+        if mode == "last_token":
+            value = logprobs[-1]
+        elif mode == "mean_logprob":
+            value = logprobs.mean()
+        else:
+            value = logprobs.min()
+
+        return value.exp().item()
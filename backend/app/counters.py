@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Set, Tuple
+
+# Pending increments are written at least this often...
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "5"))
+# ...or as soon as this many increments are waiting
+COUNTER_FLUSH_EVENTS = int(os.getenv("COUNTER_FLUSH_EVENTS", "500"))
+
+# Field order of the (views, downloads) delta tuples
+COUNTER_FIELDS = ("views", "downloads")
+
+
+class CounterBuffer:
+    """
+    Write-behind buffer for per-image view and download counters.
+
+    Increments are summed in memory and handed to `flush_fn` as one batch
+    of {image_id: (views, downloads)} deltas every `flush_interval`
+    seconds or once `flush_events` increments are pending, so a popular
+    image costs one UPDATE per flush instead of one per request. Deltas
+    that fail to flush are kept and retried on the next flush. Images
+    passed to `discard` are never counted or flushed again.
+
+    Args:
+        flush_fn: Function that persists a batch of deltas in one transaction
+        flush_interval: Maximum seconds between flushes
+        flush_events: Number of pending increments that triggers a flush
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[Dict[int, Tuple[int, int]]], None],
+        flush_interval: float = COUNTER_FLUSH_INTERVAL,
+        flush_events: int = COUNTER_FLUSH_EVENTS,
+    ):
+        self.flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.flush_events = flush_events
+
+        self._pending: Dict[int, list] = {}
+        self._pending_events = 0
+        # Batch being written, still counted by pending() until it commits
+        self._in_flight: Dict[int, Tuple[int, int]] = {}
+        # Deleted images; IDs are not reused, so they never need counting again
+        self._discarded: Set[int] = set()
+        self._lock = threading.Lock()
+        # Serialises flushes so a retry never races a newer batch
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._worker = None
+
+        self.flushes = 0
+        self.flushed_events = 0
+        self.failed_flushes = 0
+        self.last_flush_time = None
+
+    def increment(self, image_id: int, field: str, amount: int = 1):
+        index = COUNTER_FIELDS.index(field)
+        with self._lock:
+            if image_id in self._discarded:
+                return
+            self._ensure_worker()
+            deltas = self._pending.setdefault(image_id, [0, 0])
+            deltas[index] += amount
+            self._pending_events += amount
+            if self._pending_events >= self.flush_events:
+                self._wakeup.set()
+
+    def pending(self, image_id: int) -> Tuple[int, int]:
+        """
+        Unflushed (views, downloads) for one image, to add to values read
+        from the database.
+        """
+        with self._lock:
+            deltas = self._pending.get(image_id, (0, 0))
+            in_flight = self._in_flight.get(image_id, (0, 0))
+            return deltas[0] + in_flight[0], deltas[1] + in_flight[1]
+
+    def pending_totals(self) -> Tuple[int, int]:
+        with self._lock:
+            all_deltas = list(self._pending.values()) + list(self._in_flight.values())
+            return sum(d[0] for d in all_deltas), sum(d[1] for d in all_deltas)
+
+    def discard(self, image_id: int):
+        """
+        Drop pending increments for an image that is about to be deleted
+        and ignore any made from now on.
+
+        Waits for a flush in progress, so increments of the image already
+        handed to `flush_fn` are written (or dropped, if that flush failed)
+        before the caller reads and deletes the row.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._discarded.add(image_id)
+                deltas = self._pending.pop(image_id, None)
+                if deltas:
+                    self._pending_events -= sum(deltas)
+
+    def flush(self) -> int:
+        """
+        Write all pending increments now.
+
+        Returns:
+            int: Number of images updated
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = {image_id: tuple(deltas) for image_id, deltas in self._pending.items()}
+                events = self._pending_events
+                self._pending = {}
+                self._pending_events = 0
+                self._in_flight = batch
+
+            if not batch:
+                return 0
+
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                print(f"[ERROR] Failed to flush {events} counter increments, will retry: {e}")
+                with self._lock:
+                    self._in_flight = {}
+                    for image_id, deltas in batch.items():
+                        merged = self._pending.setdefault(image_id, [0, 0])
+                        merged[0] += deltas[0]
+                        merged[1] += deltas[1]
+                    self._pending_events += events
+                    self.failed_flushes += 1
+                return 0
+
+            with self._lock:
+                self._in_flight = {}
+                self.flushes += 1
+                self.flushed_events += events
+                self.last_flush_time = time.time()
+            return len(batch)
+
+    def close(self):
+        """
+        Stop the background flusher and write whatever is still pending.
+        """
+        with self._lock:
+            self._stopped = True
+            worker = self._worker
+        self._wakeup.set()
+        if worker is not None:
+            worker.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "pending_images": len(self._pending),
+                "pending_events": self._pending_events,
+                "flushes": self.flushes,
+                "flushed_events": self.flushed_events,
+                "failed_flushes": self.failed_flushes,
+                "last_flush_time": self.last_flush_time,
+                "flush_interval": self.flush_interval,
+                "flush_events": self.flush_events,
+            }
+
+    def _ensure_worker(self):
+        # Caller holds the lock
+        if self._worker is None and not self._stopped:
+            self._worker = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with self._lock:
+                stopped = self._stopped
+            if stopped:
+                return
+            self.flush()
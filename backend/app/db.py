@@ -1,7 +1,19 @@
 import pyodbc
 import os
-from datetime import datetime
-from typing import Optional, Tuple, List, Dict
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Tuple, List, Dict, Set
+
+from app.counters import CounterBuffer
+from app.db_pool import ConnectionPool, connect_sqlite
+from app.generation_stats import GenerationStats
+from app.inflight import SingleFlight
+from app.search_index import search_index
+from app.thumbnails import create_thumbnails, delete_thumbnails, missing_thumbnails
+from app.utils import content_hash
 
 # Direct connection parameters
 DB_SERVER = r"(localdb)\MSSQLLocalDB"
@@ -10,51 +22,172 @@ UPLOAD_DIR = r"C:\Users\ADMIN\Downloads\multimodal_lab\VQA\uploads"
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Connection pool configuration. DB_BACKEND=sqlite runs the same queries
+# against a local SQLite file for load testing.
+DB_BACKEND = os.getenv("DB_BACKEND", "mssql")
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "vqa_local.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+SQLITE_SCHEMA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "database", "sqlite_schema.sql"
+)
+
+# Rows that violate a unique index raise one of these, depending on backend
+INTEGRITY_ERRORS = (pyodbc.IntegrityError, sqlite3.IntegrityError)
+
 # -----------------------------
-# Establish database connection
+# Establish database connection pool
 # -----------------------------
-try:
-    conn = pyodbc.connect(
-        f'DRIVER={{ODBC Driver 17 for SQL Server}};'
-        f'SERVER={DB_SERVER};'
-        f'DATABASE={DB_DATABASE};'
-        f'Trusted_Connection=yes;'
-    )
-    print("✅ Connected to SQL Server successfully!")
-    cursor = conn.cursor()
-except pyodbc.Error as e:
-    conn = None
-    print("❌ Failed to connect to SQL Server")
-    print(e)
+def _connect_mssql():
+    try:
+        conn = pyodbc.connect(
+            f'DRIVER={{ODBC Driver 17 for SQL Server}};'
+            f'SERVER={DB_SERVER};'
+            f'DATABASE={DB_DATABASE};'
+            f'Trusted_Connection=yes;'
+        )
+    except pyodbc.Error as e:
+        print("❌ Failed to connect to SQL Server")
+        print(e)
+        raise
+    return conn
+
+
+def _connect_sqlite():
+    conn = connect_sqlite(DB_SQLITE_PATH)
+    if os.path.exists(SQLITE_SCHEMA):
+        with open(SQLITE_SCHEMA) as f:
+            conn.executescript(f.read())
+    return conn
+
+
+if DB_BACKEND == "sqlite":
+    pool = ConnectionPool(_connect_sqlite, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, dialect="sqlite")
+    print(f"[INFO] Using SQLite database at {DB_SQLITE_PATH}")
+else:
+    pool = ConnectionPool(_connect_mssql, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
 
 # -----------------------------
 # Insert an image and return ImageID
 # -----------------------------
 def insert_image(filename: str, filedata: bytes) -> int:
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    safe_filename = f"{timestamp}_{filename}"
-    file_path = os.path.join(UPLOAD_DIR, safe_filename)
+    """
+    Store an upload by content and return its ImageID.
 
-    with open(file_path, "wb") as f:
-        f.write(filedata)
+    Files are saved as <sha256><ext> in UPLOAD_DIR and deduplicated on the
+    ContentHash column, so re-uploading the same bytes under any name
+    reuses the existing row (and its cached answers) without writing a
+    new file, while different images that share a name stay separate.
+    """
+    image_hash = content_hash(filedata)
 
-    cursor.execute("SELECT ImageID FROM Images WHERE FileName = ?", filename)
-    row = cursor.fetchone()
-    if row:
-        print("[Info] Image already exists, reusing ImageID")
-        return row[0]
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ImageID FROM Images WHERE ContentHash = ?", (image_hash,))
+        row = cursor.fetchone()
+        if row:
+            print("[Info] Image already exists, reusing ImageID")
+            return row[0]
 
-    sql = """
-    INSERT INTO Images (FileName, FilePath, UploadTime)
-    OUTPUT INSERTED.ImageID
-    VALUES (?, ?, GETDATE())
+        extension = os.path.splitext(filename or "")[1].lower() or ".bin"
+        file_path = os.path.join(UPLOAD_DIR, f"{image_hash}{extension}")
+
+        if not os.path.exists(file_path):
+            # Write then rename so a crash never leaves a partial file under the
+            # hash name; the temp name is unique so identical concurrent uploads
+            # do not write to the same file
+            tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(filedata)
+            os.replace(tmp_path, file_path)
+
+            try:
+                create_thumbnails(file_path)
+            except Exception as e:
+                # The gallery creates missing thumbnails on demand
+                print(f"[WARNING] Could not create thumbnails for {file_path}: {e}")
+
+        sql = """
+        INSERT INTO Images (FileName, FilePath, ContentHash, UploadTime)
+        OUTPUT INSERTED.ImageID
+        VALUES (?, ?, ?, GETDATE())
+        """
+        try:
+            cursor.execute(sql, (filename, file_path, image_hash))
+            image_id = cursor.fetchone()[0]
+        except INTEGRITY_ERRORS:
+            # A concurrent upload of the same bytes won the unique index
+            conn.rollback()
+            cursor.execute("SELECT ImageID FROM Images WHERE ContentHash = ?", (image_hash,))
+            return cursor.fetchone()[0]
+
+        if image_id is None:
+            raise ValueError("Failed to get ImageID after insert")
+        conn.commit()
+        return image_id
+
+
+def backfill_image_hashes() -> int:
     """
-    cursor.execute(sql, filename, file_path)
-    image_id = cursor.fetchone()[0]
-    if image_id is None:
-        raise ValueError("Failed to get ImageID after insert")
-    conn.commit()
-    return image_id
+    Fill ContentHash for images uploaded before content-addressed storage.
+    Files are left where they are; rows whose file is missing are skipped.
+
+    Returns:
+        int: Number of rows updated
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ImageID, FilePath FROM Images WHERE ContentHash IS NULL")
+        rows = cursor.fetchall()
+
+        updated = 0
+        for image_id, file_path in rows:
+            if not file_path or not os.path.exists(file_path):
+                print(f"[WARNING] File not found for ImageID {image_id}: {file_path}")
+                continue
+
+            with open(file_path, "rb") as f:
+                image_hash = content_hash(f.read())
+
+            try:
+                cursor.execute(
+                    "UPDATE Images SET ContentHash = ? WHERE ImageID = ?",
+                    (image_hash, image_id)
+                )
+                conn.commit()
+                updated += 1
+            except INTEGRITY_ERRORS:
+                # Duplicate bytes already hashed under another ImageID
+                conn.rollback()
+                print(f"[Info] ImageID {image_id} duplicates an existing image, left unhashed")
+
+    return updated
+
+
+def backfill_thumbnails() -> int:
+    """
+    Create thumbnails for uploaded and generated images stored before
+    thumbnails were written on save.
+
+    Returns:
+        int: Number of images thumbnailed
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT FilePath FROM Images")
+        file_paths = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT FilePath FROM GeneratedImages WHERE Status = 'completed'")
+        file_paths += [row[0] for row in cursor.fetchall()]
+
+    created = 0
+    for file_path in missing_thumbnails(file_paths):
+        try:
+            create_thumbnails(file_path)
+            created += 1
+        except Exception as e:
+            print(f"[WARNING] Could not create thumbnails for {file_path}: {e}")
+
+    return created
 
 # def insert_image(filename: str, filedata: bytes) -> int:
 #     # Check if image already exists
@@ -77,6 +210,14 @@ def insert_image(filename: str, filedata: bytes) -> int:
 #     conn.commit()
 #     return image_id
 
+def question_hash(question: str) -> str:
+    """
+    Indexable key for QuestionText. Hashes the UTF-16LE bytes so it equals
+    HASHBYTES('SHA2_256', QuestionText) on the NVARCHAR column, which the
+    migration uses to backfill existing rows.
+    """
+    return content_hash(question.encode("utf-16-le"))
+
 # -----------------------------
 # Insert a question and return QuestionID
 # -----------------------------
@@ -85,15 +226,17 @@ def insert_question(image_id: int, question: str) -> int:
         raise ValueError("Cannot insert question with NULL image_id")
     
     sql = """
-    INSERT INTO Questions (ImageID, QuestionText)
+    INSERT INTO Questions (ImageID, QuestionText, QuestionHash)
     OUTPUT INSERTED.QuestionID
-    VALUES (?, ?)
+    VALUES (?, ?, ?)
     """
-    cursor.execute(sql, image_id, question)
-    question_id = cursor.fetchone()[0]
-    if question_id is None:
-        raise ValueError("Failed to get QuestionID after insert")
-    conn.commit()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, (image_id, question, question_hash(question)))
+        question_id = cursor.fetchone()[0]
+        if question_id is None:
+            raise ValueError("Failed to get QuestionID after insert")
+        conn.commit()
     return question_id
 
 # -----------------------------
@@ -108,16 +251,138 @@ def insert_answer(question_id: int, answer: str, confidence: float) -> int:
     OUTPUT INSERTED.AnswerID
     VALUES (?, ?, ?)
     """
-    cursor.execute(sql, question_id, answer, confidence)
-    answer_id = cursor.fetchone()[0]
-    if answer_id is None:
-        raise ValueError("Failed to get AnswerID after insert")
-    conn.commit()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, (question_id, answer, confidence))
+        answer_id = cursor.fetchone()[0]
+        if answer_id is None:
+            raise ValueError("Failed to get AnswerID after insert")
+        conn.commit()
     return answer_id
 
 # -----------------------------
 # Get or create answer for an image/question
 # -----------------------------
+# Look the question up on the (ImageID, QuestionHash) unique index, insert it
+# only if it is missing, and return its ID with any stored answer, in one
+# round-trip. Repeated questions, the common case, take no write locks.
+_UPSERT_QUESTION_SQL = {
+    "mssql": """
+    SET NOCOUNT ON;
+    DECLARE @Question TABLE (QuestionID INT);
+
+    INSERT INTO @Question
+    SELECT QuestionID FROM Questions WHERE ImageID = ? AND QuestionHash = ?;
+
+    IF NOT EXISTS (SELECT 1 FROM @Question)
+    BEGIN
+        MERGE Questions WITH (HOLDLOCK) AS target
+        USING (SELECT ? AS ImageID, ? AS QuestionHash, ? AS QuestionText) AS source
+            ON target.ImageID = source.ImageID AND target.QuestionHash = source.QuestionHash
+        WHEN NOT MATCHED THEN
+            INSERT (ImageID, QuestionHash, QuestionText)
+            VALUES (source.ImageID, source.QuestionHash, source.QuestionText)
+        OUTPUT INSERTED.QuestionID INTO @Question;
+
+        -- Another request inserted it since the first lookup
+        IF NOT EXISTS (SELECT 1 FROM @Question)
+            INSERT INTO @Question
+            SELECT QuestionID FROM Questions WHERE ImageID = ? AND QuestionHash = ?;
+    END;
+
+    SELECT q.QuestionID, a.AnswerText, a.ConfidenceScore
+    FROM @Question q
+    OUTER APPLY (
+        SELECT TOP 1 AnswerText, ConfidenceScore
+        FROM Answers
+        WHERE QuestionID = q.QuestionID
+        ORDER BY AnswerID
+    ) a;
+    """,
+    "sqlite": [
+        """
+        INSERT INTO Questions (ImageID, QuestionHash, QuestionText)
+        VALUES (?, ?, ?)
+        ON CONFLICT (ImageID, QuestionHash) WHERE QuestionHash IS NOT NULL DO NOTHING
+        """,
+        """
+        SELECT q.QuestionID, a.AnswerText, a.ConfidenceScore
+        FROM Questions q
+        LEFT JOIN Answers a ON a.AnswerID = (
+            SELECT MIN(AnswerID) FROM Answers WHERE QuestionID = q.QuestionID
+        )
+        WHERE q.ImageID = ? AND q.QuestionHash = ?
+        """,
+    ],
+}
+
+# Store the answer unless another process got there first, and return
+# whichever answer is stored
+_INSERT_ANSWER_ONCE_SQL = {
+    "mssql": """
+    SET NOCOUNT ON;
+    INSERT INTO Answers (QuestionID, AnswerText, ConfidenceScore)
+    SELECT ?, ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM Answers WITH (UPDLOCK, HOLDLOCK) WHERE QuestionID = ?);
+
+    SELECT TOP 1 AnswerText, ConfidenceScore FROM Answers WHERE QuestionID = ? ORDER BY AnswerID;
+    """,
+    "sqlite": [
+        """
+        INSERT INTO Answers (QuestionID, AnswerText, ConfidenceScore)
+        SELECT ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM Answers WHERE QuestionID = ?)
+        """,
+        "SELECT AnswerText, ConfidenceScore FROM Answers WHERE QuestionID = ? ORDER BY AnswerID LIMIT 1",
+    ],
+}
+
+# Concurrent requests for the same (image, question) share one generation
+_answer_flights = SingleFlight()
+
+
+def _upsert_question(image_id: int, question: str, key: str) -> Tuple[int, Optional[str], Optional[float]]:
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        if pool.dialect == "sqlite":
+            insert_sql, select_sql = _UPSERT_QUESTION_SQL["sqlite"]
+            cursor.execute(select_sql, (image_id, key))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute(insert_sql, (image_id, key, question))
+                cursor.execute(select_sql, (image_id, key))
+                row = cursor.fetchone()
+        else:
+            cursor.execute(
+                _UPSERT_QUESTION_SQL["mssql"],
+                (image_id, key, image_id, key, question, image_id, key)
+            )
+            row = cursor.fetchone()
+        conn.commit()
+    return row[0], row[1], row[2]
+
+
+def _insert_answer_once(question_id: int, answer: str, confidence: float) -> Tuple[str, float]:
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        if pool.dialect == "sqlite":
+            insert_sql, select_sql = _INSERT_ANSWER_ONCE_SQL["sqlite"]
+            cursor.execute(insert_sql, (question_id, answer, confidence, question_id))
+            cursor.execute(select_sql, (question_id,))
+        else:
+            cursor.execute(
+                _INSERT_ANSWER_ONCE_SQL["mssql"],
+                (question_id, answer, confidence, question_id, question_id)
+            )
+        row = cursor.fetchone()
+        conn.commit()
+    return row[0], row[1]
+
+
+def answer_flight_stats() -> Dict:
+    return _answer_flights.stats()
+
+
 def get_or_create_answer(image_id: int, question: str, generate_answer_fn):
     """
     Checks if question exists for an image:
@@ -126,49 +391,117 @@ def get_or_create_answer(image_id: int, question: str, generate_answer_fn):
       - If question doesn't exist → inserts question and generates answer.
     
     generate_answer_fn: a function that returns (answer, confidence)
+
+    The question is looked up (and inserted if new) on the (ImageID,
+    QuestionHash) unique index and any stored answer read back in a
+    single round-trip. Concurrent
+    calls for the same question run generate_answer_fn once and share the
+    result. The pooled connection is released while the answer is
+    generated, so a slow model call never holds a database connection.
     """
-    cursor.execute(
-        "SELECT QuestionID FROM Questions WHERE ImageID = ? AND QuestionText = ?",
-        image_id, question
-    )
-    row = cursor.fetchone()
+    key = question_hash(question)
+    question_id, answer, confidence = _upsert_question(image_id, question, key)
+    if answer is not None:
+        return question_id, answer, confidence, True  # Existing answer
 
-    if row:
-        question_id = row[0]
-        cursor.execute(
-            "SELECT AnswerText, ConfidenceScore FROM Answers WHERE QuestionID = ?",
-            question_id
-        )
-        ans_row = cursor.fetchone()
-        if ans_row:
-            return question_id, ans_row[0], ans_row[1], True  # Existing answer
-        else:
-            answer, confidence = generate_answer_fn()
-            cursor.execute(
-                "INSERT INTO Answers (QuestionID, AnswerText, ConfidenceScore) VALUES (?, ?, ?)",
-                question_id, answer, confidence
-            )
-            conn.commit()
-            return question_id, answer, confidence, False
-    else:
-        cursor.execute(
-            "INSERT INTO Questions (ImageID, QuestionText) VALUES (?, ?)",
-            image_id, question
-        )
-        conn.commit()
-        cursor.execute(
-            "SELECT QuestionID FROM Questions WHERE ImageID = ? AND QuestionText = ?",
-            image_id, question
-        )
-        question_id = cursor.fetchone()[0]
+    def generate_and_store():
+        generated_answer, generated_confidence = generate_answer_fn()
+        return _insert_answer_once(question_id, generated_answer, generated_confidence)
 
-        answer, confidence = generate_answer_fn()
-        cursor.execute(
-            "INSERT INTO Answers (QuestionID, AnswerText, ConfidenceScore) VALUES (?, ?, ?)",
-            question_id, answer, confidence
-        )
-        conn.commit()
-        return question_id, answer, confidence, False
+    (answer, confidence), shared = _answer_flights.do((image_id, key), generate_and_store)
+    return question_id, answer, confidence, shared
+
+# -----------------------------
+# Questions and answers for one image
+# -----------------------------
+def get_image_questions(image_id: int) -> List[Tuple[int, str, Optional[str]]]:
+    """
+    Returns:
+        list: (QuestionID, QuestionText, AnswerText) rows for the image
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT q.QuestionID, q.QuestionText, a.AnswerText
+            FROM Questions q
+            LEFT JOIN Answers a ON q.QuestionID = a.QuestionID
+            WHERE q.ImageID = ?
+        """, (image_id,))
+        return [tuple(row) for row in cursor.fetchall()]
+
+# -----------------------------
+# Look up the stored file for an image
+# -----------------------------
+FILE_TABLES = {
+    "uploads": ("Images", "ImageID"),
+    "generated": ("GeneratedImages", "GeneratedImageID"),
+}
+
+
+def get_file_path(kind: str, record_id: int) -> Optional[str]:
+    """
+    Get the FilePath of an uploaded or generated image.
+
+    Args:
+        kind: "uploads" or "generated"
+        record_id: ImageID or GeneratedImageID
+
+    Returns:
+        str: File path, or None if there is no such row
+    """
+    table, id_column = FILE_TABLES[kind]
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT FilePath FROM {table} WHERE {id_column} = ?", (record_id,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+# -----------------------------
+# Page through uploaded images with their question counts
+# -----------------------------
+def get_images_page(after_id: Optional[int] = None, limit: int = 50) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Get one page of uploaded images, newest first, with question counts.
+
+    Uses keyset pagination on ImageID and a single grouped query, so the
+    cost of a page does not grow with the size of the table.
+
+    Args:
+        after_id: ImageID cursor returned by the previous page (None for the first page)
+        limit: Maximum number of images to return
+
+    Returns:
+        tuple: (images, next_cursor) where next_cursor is None on the last page
+    """
+    where = "WHERE i.ImageID < ?" if after_id is not None else ""
+    sql = f"""
+    SELECT TOP (?)
+        i.ImageID, i.FileName, i.FilePath, COUNT(q.QuestionID)
+    FROM Images i
+    LEFT JOIN Questions q ON q.ImageID = i.ImageID
+    {where}
+    GROUP BY i.ImageID, i.FileName, i.FilePath
+    ORDER BY i.ImageID DESC
+    """
+    # Fetch one extra row to know whether another page exists
+    params = (limit + 1, after_id) if after_id is not None else (limit + 1,)
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    images = [
+        {
+            "image_id": row[0],
+            "file_name": row[1],
+            "file_path": row[2],
+            "questions_count": row[3],
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = images[-1]["image_id"] if len(rows) > limit else None
+    return images, next_cursor
 
 def insert_generated_image(
     prompt: str,
@@ -202,7 +535,7 @@ def insert_generated_image(
         generation_duration: Time taken to generate (in seconds)
         model_used: Name/version of the model used
         file_size: Size of the file in bytes
-        status: Status of generation (completed/failed/processing)
+        status: Status of generation (completed/failed/queued/processing)
         error_message: Error message if generation failed
     
     Returns:
@@ -225,40 +558,406 @@ def insert_generated_image(
     """
     
     try:
-        cursor.execute(
-            sql,
-            prompt,
-            negative_prompt,
-            file_path,
-            file_name,
-            seed,
-            num_inference_steps,
-            guidance_scale,
-            image_width,
-            image_height,
-            generation_duration,
-            model_used,
-            status,
-            error_message,
-            file_size
-        )
+        with generation_stats.writing(), _tracking_own_write() as track, pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (
+                prompt,
+                negative_prompt,
+                file_path,
+                file_name,
+                seed,
+                num_inference_steps,
+                guidance_scale,
+                image_width,
+                image_height,
+                generation_duration,
+                model_used,
+                status,
+                error_message,
+                file_size
+            ))
         
-        generated_image_id = cursor.fetchone()[0]
+            generated_image_id = cursor.fetchone()[0]
         
-        if generated_image_id is None:
-            raise ValueError("Failed to get GeneratedImageID after insert")
+            if generated_image_id is None:
+                raise ValueError("Failed to get GeneratedImageID after insert")
         
-        conn.commit()
-        print(f"[SUCCESS] Inserted generated image with ID: {generated_image_id}")
+            track(generated_image_id, (status, model_used, generation_duration, file_size, None))
+            conn.commit()
+            print(f"[SUCCESS] Inserted generated image with ID: {generated_image_id}")
+
+            if status == "completed":
+                search_index.add(generated_image_id, prompt, negative_prompt)
+            generation_stats.record_insert(status, model_used, generation_duration, file_size)
         
-        return generated_image_id
+            return generated_image_id
         
     except Exception as e:
-        conn.rollback()
         print(f"[ERROR] Failed to insert generated image: {e}")
         raise
 
 
+def _enable_fast_executemany(cursor):
+    # pyodbc sends the whole parameter array in one round-trip instead of one per row
+    if pool.dialect == "mssql":
+        cursor.fast_executemany = True
+
+
+def insert_generated_images_bulk(records: List[Dict]) -> List[int]:
+    """
+    Insert many generated image records, and optionally their tags, in a
+    single transaction.
+
+    Each record takes the same keys as the keyword arguments of
+    insert_generated_image, plus an optional "tags" list. Either every
+    row is written or none is.
+
+    Args:
+        records: Generated image records; file_path must be unique per record
+
+    Returns:
+        list: GeneratedImageID of each record, in input order
+    """
+    if not records:
+        return []
+
+    rows = []
+    for record in records:
+        file_size = record.get("file_size")
+        if file_size is None and os.path.exists(record["file_path"]):
+            file_size = os.path.getsize(record["file_path"])
+        rows.append((
+            record["prompt"],
+            record.get("negative_prompt"),
+            record["file_path"],
+            record["file_name"],
+            record["seed"],
+            record.get("num_inference_steps", 30),
+            record.get("guidance_scale", 7.5),
+            record.get("image_width", 512),
+            record.get("image_height", 512),
+            record.get("generation_duration"),
+            record.get("model_used", "stable-diffusion-2-1"),
+            record.get("status", "completed"),
+            record.get("error_message"),
+            file_size
+        ))
+
+    columns = """
+    INSERT INTO GeneratedImages (
+        Prompt, NegativePrompt, FilePath, FileName,
+        Seed, NumInferenceSteps, GuidanceScale,
+        ImageWidth, ImageHeight, GenerationDuration,
+        ModelUsed, Status, ErrorMessage, FileSize
+    )
+    """
+    row_placeholders = "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+    try:
+        with generation_stats.writing(), _tracking_own_write() as track, pool.connection() as conn:
+            cursor = conn.cursor()
+            _enable_fast_executemany(cursor)
+            if pool.dialect == "mssql":
+                # Multi-row INSERTs whose OUTPUT rows carry the file path of
+                # each new ID, since SQL Server does not return them in VALUES
+                # order. 100 rows keep under the 2100 parameter limit.
+                ids_by_path = {}
+                for start in range(0, len(rows), 100):
+                    chunk = rows[start:start + 100]
+                    cursor.execute(
+                        columns
+                        + "OUTPUT INSERTED.GeneratedImageID, INSERTED.FilePath VALUES "
+                        + ", ".join(row_placeholders for _ in chunk),
+                        tuple(value for row in chunk for value in row)
+                    )
+                    for generated_image_id, file_path in cursor.fetchall():
+                        ids_by_path[file_path] = generated_image_id
+                generated_image_ids = [ids_by_path[row[2]] for row in rows]
+            else:
+                # SQLite has no round-trip to save; RETURNING gives each row's ID
+                generated_image_ids = []
+                for row in rows:
+                    cursor.execute(columns + "OUTPUT INSERTED.GeneratedImageID VALUES " + row_placeholders, row)
+                    generated_image_ids.append(cursor.fetchone()[0])
+
+            tag_rows = [
+                (generated_image_id, tag.lower().strip())
+                for generated_image_id, record in zip(generated_image_ids, records)
+                for tag in record.get("tags") or []
+                if tag.strip()
+            ]
+            if tag_rows:
+                cursor.executemany(
+                    "INSERT INTO PromptTags (GeneratedImageID, TagName) VALUES (?, ?)",
+                    tag_rows
+                )
+
+            for generated_image_id, row in zip(generated_image_ids, rows):
+                track(generated_image_id, (row[11], row[10], row[9], row[13], None))
+            conn.commit()
+            for row in rows:
+                # row holds the values actually written, defaults included
+                generation_stats.record_insert(
+                    status=row[11], model=row[10], duration=row[9], file_size=row[13]
+                )
+
+        for generated_image_id, record in zip(generated_image_ids, records):
+            if record.get("status", "completed") == "completed":
+                search_index.add(generated_image_id, record["prompt"], record.get("negative_prompt"))
+
+        print(f"[SUCCESS] Inserted {len(generated_image_ids)} generated images in one transaction")
+        return generated_image_ids
+
+    except Exception as e:
+        print(f"[ERROR] Failed to bulk insert generated images: {e}")
+        raise
+
+
+# -----------------------------
+# Text-to-image job queue
+# -----------------------------
+# Queued generations are GeneratedImages rows that move
+# queued -> processing -> completed/failed, so the queue survives restarts
+# and can be drained by a worker in another process.
+# Claim the oldest queued job. READPAST lets concurrent workers skip rows
+# another worker has locked instead of waiting for them.
+_CLAIM_JOB_SQL = {
+    "mssql": """
+    SET NOCOUNT ON;
+    WITH next_job AS (
+        SELECT TOP (1) *
+        FROM GeneratedImages WITH (ROWLOCK, UPDLOCK, READPAST)
+        WHERE Status = 'queued'
+        ORDER BY GeneratedImageID
+    )
+    UPDATE next_job
+    SET Status = 'processing', StartedAt = GETDATE()
+    OUTPUT INSERTED.GeneratedImageID, INSERTED.Prompt, INSERTED.NegativePrompt, INSERTED.Seed,
+        INSERTED.NumInferenceSteps, INSERTED.GuidanceScale, INSERTED.ImageWidth,
+        INSERTED.ImageHeight, INSERTED.ModelUsed, INSERTED.GenerationTime;
+    """,
+    "sqlite": """
+    UPDATE GeneratedImages
+    SET Status = 'processing', StartedAt = CURRENT_TIMESTAMP
+    WHERE GeneratedImageID = (
+        SELECT GeneratedImageID FROM GeneratedImages
+        WHERE Status = 'queued'
+        ORDER BY GeneratedImageID
+        LIMIT 1
+    )
+    RETURNING GeneratedImageID, Prompt, NegativePrompt, Seed, NumInferenceSteps, GuidanceScale,
+        ImageWidth, ImageHeight, ModelUsed, GenerationTime
+    """,
+}
+
+# Put jobs whose worker died mid-generation back in the queue. The
+# parameter is the negative age in seconds (SQL Server) or a DATETIME
+# modifier such as '-1800 seconds' (SQLite).
+_REQUEUE_STALE_JOBS_SQL = {
+    "mssql": """
+    UPDATE GeneratedImages
+    SET Status = 'queued', StartedAt = NULL
+    OUTPUT INSERTED.ModelUsed, INSERTED.GenerationTime
+    WHERE Status = 'processing' AND StartedAt < DATEADD(second, ?, GETDATE())
+    """,
+    "sqlite": """
+    UPDATE GeneratedImages
+    SET Status = 'queued', StartedAt = NULL
+    WHERE Status = 'processing' AND StartedAt < DATETIME('now', ?)
+    RETURNING ModelUsed, GenerationTime
+    """,
+}
+
+
+def _job_from_row(row) -> Dict:
+    return {
+        "job_id": row[0],
+        "prompt": row[1],
+        "negative_prompt": row[2],
+        "seed": row[3],
+        "num_inference_steps": row[4],
+        "guidance_scale": row[5],
+        "width": row[6],
+        "height": row[7],
+        "model_used": row[8],
+        "generation_time": row[9],
+    }
+
+
+def claim_generation_job() -> Optional[Dict]:
+    """
+    Mark the oldest queued generation as processing and return it.
+    
+    Safe to call from several workers and processes at once: each job is
+    handed to exactly one of them.
+    
+    Returns:
+        dict: The job's generation parameters, or None if the queue is empty
+    """
+    with generation_stats.writing(), pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_CLAIM_JOB_SQL[pool.dialect])
+        row = cursor.fetchone()
+        conn.commit()
+
+        if row is None:
+            return None
+        job = _job_from_row(row)
+        generation_stats.record_status_change(
+            "queued", "processing", job["model_used"], None, None, job["generation_time"]
+        )
+    return job
+
+
+def complete_generation_job(job: Dict, file_path: str, file_name: str,
+                            generation_duration: float, file_size: int) -> bool:
+    """
+    Record the result of a claimed job.
+    
+    Returns:
+        bool: False if the row was deleted or requeued while generating
+    """
+    with generation_stats.writing(), pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE GeneratedImages
+            SET Status = 'completed', FilePath = ?, FileName = ?,
+                GenerationDuration = ?, FileSize = ?, ErrorMessage = NULL
+            WHERE GeneratedImageID = ? AND Status = 'processing'
+            """,
+            (file_path, file_name, generation_duration, file_size, job["job_id"])
+        )
+        updated = cursor.rowcount > 0
+        conn.commit()
+
+        if updated:
+            generation_stats.record_status_change(
+                "processing", "completed", job["model_used"], generation_duration, file_size,
+                job["generation_time"]
+            )
+
+    if updated:
+        search_index.add(job["job_id"], job["prompt"], job["negative_prompt"])
+    return updated
+
+
+def fail_generation_job(job: Dict, error_message: str, generation_duration: Optional[float] = None) -> bool:
+    """
+    Mark a claimed job as failed.
+    
+    Returns:
+        bool: False if the row was deleted or requeued while generating
+    """
+    with generation_stats.writing(), pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE GeneratedImages
+            SET Status = 'failed', ErrorMessage = ?, GenerationDuration = ?
+            WHERE GeneratedImageID = ? AND Status = 'processing'
+            """,
+            (error_message, generation_duration, job["job_id"])
+        )
+        updated = cursor.rowcount > 0
+        conn.commit()
+
+        if updated:
+            generation_stats.record_status_change(
+                "processing", "failed", job["model_used"], generation_duration, None, job["generation_time"]
+            )
+    return updated
+
+
+def requeue_stale_generation_jobs(timeout_seconds: float) -> int:
+    """
+    Return jobs that have been processing for longer than timeout_seconds
+    to the queue, e.g. after the worker running them crashed.
+    
+    Returns:
+        int: Number of jobs requeued
+    """
+    with generation_stats.writing(), pool.connection() as conn:
+        cursor = conn.cursor()
+        age = -int(timeout_seconds)
+        cursor.execute(
+            _REQUEUE_STALE_JOBS_SQL[pool.dialect],
+            (f"{age} seconds" if pool.dialect == "sqlite" else age,)
+        )
+        rows = cursor.fetchall()
+        conn.commit()
+
+        for model_used, generation_time in rows:
+            generation_stats.record_status_change("processing", "queued", model_used, None, None, generation_time)
+    if rows:
+        print(f"[WARNING] Requeued {len(rows)} stalled text-to-image jobs")
+    return len(rows)
+
+
+def get_generation_job(job_id: int) -> Optional[Dict]:
+    """
+    Status of a text-to-image job.
+    
+    Args:
+        job_id: GeneratedImageID returned when the job was queued
+    
+    Returns:
+        dict: status, queue position (number of queued jobs ahead of it),
+              error message and generation parameters, or None if not found
+    """
+    sql = """
+    SELECT 
+        GeneratedImageID, Prompt, NegativePrompt, Seed, NumInferenceSteps,
+        GuidanceScale, ImageWidth, ImageHeight, Status, ErrorMessage,
+        GenerationTime, StartedAt, GenerationDuration, FilePath,
+        (SELECT COUNT(*) FROM GeneratedImages ahead
+         WHERE ahead.Status = 'queued' AND ahead.GeneratedImageID < GeneratedImages.GeneratedImageID)
+    FROM GeneratedImages
+    WHERE GeneratedImageID = ?
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, (job_id,))
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+    return {
+        "job_id": row[0],
+        "prompt": row[1],
+        "negative_prompt": row[2],
+        "seed": row[3],
+        "num_inference_steps": row[4],
+        "guidance_scale": row[5],
+        "width": row[6],
+        "height": row[7],
+        "status": row[8],
+        "error_message": row[9],
+        "submitted_at": row[10],
+        "started_at": row[11],
+        "generation_duration": row[12],
+        "file_path": row[13],
+        "queue_position": row[14] if row[8] == "queued" else None,
+    }
+
+
+def get_generation_queue_counts() -> Dict[str, int]:
+    """
+    Number of queued and processing text-to-image jobs.
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT Status, COUNT(*) FROM GeneratedImages
+            WHERE Status IN ('queued', 'processing')
+            GROUP BY Status
+            """
+        )
+        counts = {status: count for status, count in cursor.fetchall()}
+    return {"queued": counts.get("queued", 0), "processing": counts.get("processing", 0)}
+
+
 def get_generated_image_by_id(generated_image_id: int) -> Optional[Dict]:
     """
     Retrieve a generated image record by its ID.
@@ -280,31 +979,33 @@ def get_generated_image_by_id(generated_image_id: int) -> Optional[Dict]:
     """
     
     try:
-        cursor.execute(sql, generated_image_id)
-        row = cursor.fetchone()
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (generated_image_id,))
+            row = cursor.fetchone()
         
-        if row:
-            return {
-                "generated_image_id": row[0],
-                "prompt": row[1],
-                "negative_prompt": row[2],
-                "file_path": row[3],
-                "file_name": row[4],
-                "seed": row[5],
-                "num_inference_steps": row[6],
-                "guidance_scale": row[7],
-                "image_width": row[8],
-                "image_height": row[9],
-                "generation_time": row[10],
-                "generation_duration": row[11],
-                "model_used": row[12],
-                "status": row[13],
-                "view_count": row[14],
-                "download_count": row[15],
-                "file_size": row[16]
-            }
+            if row:
+                return _merge_pending_counts({
+                    "generated_image_id": row[0],
+                    "prompt": row[1],
+                    "negative_prompt": row[2],
+                    "file_path": row[3],
+                    "file_name": row[4],
+                    "seed": row[5],
+                    "num_inference_steps": row[6],
+                    "guidance_scale": row[7],
+                    "image_width": row[8],
+                    "image_height": row[9],
+                    "generation_time": row[10],
+                    "generation_duration": row[11],
+                    "model_used": row[12],
+                    "status": row[13],
+                    "view_count": row[14],
+                    "download_count": row[15],
+                    "file_size": row[16]
+                })
         
-        return None
+            return None
         
     except Exception as e:
         print(f"[ERROR] Failed to get generated image: {e}")
@@ -332,60 +1033,364 @@ def get_recent_generated_images(limit: int = 50) -> List[Dict]:
     """
     
     try:
-        cursor.execute(sql, limit)
-        rows = cursor.fetchall()
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (limit,))
+            rows = cursor.fetchall()
         
-        images = []
-        for row in rows:
-            images.append({
-                "generated_image_id": row[0],
-                "prompt": row[1],
-                "negative_prompt": row[2],
-                "file_path": row[3],
-                "file_name": row[4],
-                "seed": row[5],
-                "image_width": row[6],
-                "image_height": row[7],
-                "generation_time": row[8],
-                "view_count": row[9],
-                "download_count": row[10]
-            })
+            images = []
+            for row in rows:
+                images.append({
+                    "generated_image_id": row[0],
+                    "prompt": row[1],
+                    "negative_prompt": row[2],
+                    "file_path": row[3],
+                    "file_name": row[4],
+                    "seed": row[5],
+                    "image_width": row[6],
+                    "image_height": row[7],
+                    "generation_time": row[8],
+                    "view_count": row[9],
+                    "download_count": row[10]
+                })
         
-        return images
+            return [_merge_pending_counts(image) for image in images]
         
     except Exception as e:
         print(f"[ERROR] Failed to get recent images: {e}")
         return []
 
 
-def search_generated_images(search_term: str) -> List[Dict]:
+_search_index_lock = threading.Lock()
+
+
+def _iter_searchable_prompts(batch_size: int = 5000):
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT GeneratedImageID, Prompt, NegativePrompt FROM GeneratedImages WHERE Status = 'completed'"
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0], row[1], row[2]
+
+
+def _ensure_search_index():
+    # Built from the table once, then maintained on insert/delete. A search
+    # arriving while warm_search_index() is still loading waits for it.
+    if not search_index.loaded:
+        with _search_index_lock:
+            if not search_index.loaded:
+                if _follow_external_writes:
+                    # Before the load, so nothing completed meanwhile is missed
+                    _start_external_catch_up()
+                search_index.load(_iter_searchable_prompts())
+                print(f"[INFO] Prompt search index loaded: {search_index.stats()['documents']} images")
+
+
+def warm_search_index():
     """
-    Search generated images by prompt text.
-    
+    Load the prompt search index in a background thread, so the first
+    search does not pay for reading the whole table.
+    """
+    def load():
+        try:
+            _ensure_search_index()
+        except Exception as e:
+            # Retried on the first search
+            print(f"[WARNING] Could not load the prompt search index: {e}")
+
+    threading.Thread(target=load, name="search-index-load", daemon=True).start()
+
+
+# -----------------------------
+# Writes made by other processes
+# -----------------------------
+# The search index and statistics rollup follow this process's own writes.
+# When another process writes GeneratedImages too, e.g. the queue worker
+# run with `python -m app.generation_queue`, follow_external_writes() makes
+# both catch up from the table on read, at most once per interval.
+EXTERNAL_WRITES_SYNC_INTERVAL = float(os.getenv("EXTERNAL_WRITES_SYNC_INTERVAL", "15"))
+
+_OPEN_STATUSES = ("queued", "processing")
+
+_follow_external_writes = False
+_external_lock = threading.Lock()
+_external_catch_up_lock = threading.Lock()
+_external_next_sync = 0.0
+# Search index: highest GeneratedImageID looked at so far, and jobs that
+# were queued or processing when last looked at
+_external_last_id: Optional[int] = None
+_external_open_jobs: Set[int] = set()
+# Statistics: the same, set by the reconcile, plus the rows this process
+# wrote above that ID. Each maps to the (status, model, duration, file
+# size, generation time) the totals hold for it.
+_stats_last_id: Optional[int] = None
+_stats_tracked_rows: Dict[int, Tuple] = {}
+_stats_seeded = 0
+# This process's writes to GeneratedImages: IDs being written, and the
+# sequence number at which each was last written. A catch-up leaves rows
+# written while it ran to the writer, which records them itself.
+_own_writes_pending: Dict[int, int] = {}
+_own_writes_done: Dict[int, int] = {}
+_own_writes_seq = 0
+
+
+def follow_external_writes():
+    """
+    Pick up images generated, and statistics changed, by other processes.
+    Call at startup, before the statistics and the search index are loaded.
+    """
+    global _follow_external_writes
+    _follow_external_writes = True
+
+
+@contextmanager
+def _tracking_own_write():
+    """
+    Yield track(generated_image_id, state), called before committing a
+    write that records its own statistics change; state is the row's
+    (status, model, duration, file size, generation time) afterwards, or
+    None once deleted. It returns the state the totals hold for the row,
+    if it is tracked, which may be older than the row. Enter inside
+    generation_stats.writing().
+
+    Job claims and results are only written by processes running
+    generation workers, which do not follow external writes.
+    """
+    global _own_writes_seq
+    tracked = {}
+
+    def track(generated_image_id: int, state: Optional[Tuple]) -> Optional[Tuple]:
+        if not _follow_external_writes:
+            return None
+        with _external_lock:
+            _own_writes_pending[generated_image_id] = _own_writes_pending.get(generated_image_id, 0) + 1
+            held = _stats_tracked_rows.get(generated_image_id)
+        tracked[generated_image_id] = state
+        return held
+
+    succeeded = False
+    try:
+        yield track
+        succeeded = True
+    finally:
+        if tracked:
+            with _external_lock:
+                _own_writes_seq += 1
+                for generated_image_id, state in tracked.items():
+                    if _own_writes_pending[generated_image_id] > 1:
+                        _own_writes_pending[generated_image_id] -= 1
+                    else:
+                        del _own_writes_pending[generated_image_id]
+                    _own_writes_done[generated_image_id] = _own_writes_seq
+                    if not succeeded or _stats_last_id is None:
+                        continue
+                    if state is None:
+                        _stats_tracked_rows.pop(generated_image_id, None)
+                    elif (state[0] in _OPEN_STATUSES or generated_image_id in _stats_tracked_rows
+                          or generated_image_id > _stats_last_id):
+                        _stats_tracked_rows[generated_image_id] = state
+
+
+def _start_external_catch_up():
+    # Remember where the table is now; later catch-ups look at newer rows
+    # and at the jobs that were still open
+    global _external_last_id
+    with _external_lock, pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(GeneratedImageID) FROM GeneratedImages")
+        _external_last_id = cursor.fetchone()[0] or 0
+        cursor.execute("SELECT GeneratedImageID FROM GeneratedImages WHERE Status IN ('queued', 'processing')")
+        _external_open_jobs.clear()
+        _external_open_jobs.update(row[0] for row in cursor.fetchall())
+
+
+def _seed_external_stats(last_id: int, open_jobs: Dict[int, Tuple]):
+    # Called with the rows the statistics are being reconciled from
+    global _stats_last_id, _stats_seeded
+    with _external_lock:
+        _stats_last_id = last_id
+        _stats_tracked_rows.clear()
+        _stats_tracked_rows.update(open_jobs)
+        _stats_seeded += 1
+
+
+def _catch_up_external_writes():
+    """
+    Apply images and job changes written since the last catch-up, by any
+    process: index newly completed images and feed new rows, status
+    changes and deleted jobs to the statistics totals.
+    """
+    global _external_last_id, _external_next_sync
+    if not _follow_external_writes:
+        return
+    if _external_last_id is None:
+        _start_external_catch_up()
+
+    with _external_lock:
+        now = time.monotonic()
+        if now < _external_next_sync:
+            return
+        _external_next_sync = now + EXTERNAL_WRITES_SYNC_INTERVAL
+
+    # A writer itself, so a reconcile overlapping it tries again
+    with _external_catch_up_lock, generation_stats.writing():
+        with _external_lock:
+            search_last_id = _external_last_id
+            search_open_jobs = set(_external_open_jobs)
+            stats_last_id = _stats_last_id
+            stats_seeded = _stats_seeded
+            stats_tracked = dict(_stats_tracked_rows)
+            own_writes_seq = _own_writes_seq
+        from_id = search_last_id if stats_last_id is None else min(search_last_id, stats_last_id)
+        open_jobs = sorted(
+            generated_image_id for generated_image_id in search_open_jobs | set(stats_tracked)
+            if generated_image_id <= from_id
+        )
+
+        columns = """
+        SELECT GeneratedImageID, Status, Prompt, NegativePrompt,
+            ModelUsed, GenerationDuration, FileSize, GenerationTime
+        FROM GeneratedImages
+        """
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(columns + "WHERE GeneratedImageID > ?", (from_id,))
+            rows = cursor.fetchall()
+            # 1000 per query keeps under SQL Server's 2100 parameter limit
+            for start in range(0, len(open_jobs), 1000):
+                chunk = open_jobs[start:start + 1000]
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(columns + f"WHERE GeneratedImageID IN ({placeholders})", tuple(chunk))
+                rows.extend(cursor.fetchall())
+
+        seen = {row[0] for row in rows}
+        with _external_lock:
+            for generated_image_id, status, prompt, negative_prompt, *_ in rows:
+                if generated_image_id <= search_last_id and generated_image_id not in search_open_jobs:
+                    continue
+                _external_last_id = max(_external_last_id, generated_image_id)
+                if status in _OPEN_STATUSES:
+                    _external_open_jobs.add(generated_image_id)
+                    continue
+                _external_open_jobs.discard(generated_image_id)
+                if status == "completed":
+                    search_index.add(generated_image_id, prompt, negative_prompt)
+
+            # Open jobs that are gone were deleted
+            for generated_image_id in search_open_jobs - seen:
+                _external_open_jobs.discard(generated_image_id)
+                search_index.remove(generated_image_id)
+
+        if stats_last_id is not None:
+            _catch_up_stats(rows, seen, stats_last_id, stats_seeded, stats_tracked, own_writes_seq)
+
+
+def _catch_up_stats(rows, seen: Set[int], stats_last_id: int, stats_seeded: int,
+                    stats_tracked: Dict[int, Tuple], own_writes_seq: int):
+    # Compare the rows read against the state the totals hold for them
+    global _stats_last_id
+    with _external_lock:
+        if _stats_seeded != stats_seeded:
+            # Reconciled meanwhile; the next catch-up starts from there
+            return
+
+        def written_by_us(generated_image_id):
+            return (generated_image_id in _own_writes_pending
+                    or _own_writes_done.get(generated_image_id, 0) > own_writes_seq)
+
+        last_id = stats_last_id
+        for generated_image_id, status, _, _, model, duration, file_size, generation_time in rows:
+            if written_by_us(generated_image_id):
+                continue
+            state = (status, model, duration, file_size, generation_time)
+            old = _stats_tracked_rows.get(generated_image_id)
+            if old is not None:
+                if old[0] != status:
+                    generation_stats.record_status_change(
+                        old[0], status, model, duration, file_size, generation_time,
+                        old_duration=old[2], old_file_size=old[3]
+                    )
+            elif generated_image_id > stats_last_id:
+                generation_stats.record_insert(status, model, duration, file_size, generation_time)
+            else:
+                continue
+            last_id = max(last_id, generated_image_id)
+            if status in _OPEN_STATUSES:
+                _stats_tracked_rows[generated_image_id] = state
+            else:
+                _stats_tracked_rows.pop(generated_image_id, None)
+
+        # Tracked rows that are gone were deleted by another process
+        for generated_image_id in set(stats_tracked) - seen:
+            old = _stats_tracked_rows.get(generated_image_id)
+            if old is None or written_by_us(generated_image_id):
+                continue
+            del _stats_tracked_rows[generated_image_id]
+            generation_stats.record_delete(
+                status=old[0], model=old[1], duration=old[2], file_size=old[3],
+                generation_time=old[4], views=0, downloads=0
+            )
+
+        _stats_last_id = max(_stats_last_id, last_id)
+        # Rows written before this catch-up started are in the tracked state
+        for generated_image_id, seq in list(_own_writes_done.items()):
+            if seq <= own_writes_seq:
+                del _own_writes_done[generated_image_id]
+
+
+def search_generated_images(search_term: str, limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
+    """
+    Search generated images by prompt text, best matches first.
+
+    Uses the in-memory inverted index in app/search_index.py with BM25
+    ranking over tokenized prompts (negative prompts count for less), so
+    only the requested page is read from the database.
+
     Args:
-        search_term: Text to search for in prompts
-    
+        search_term: Words to search for in prompts; the last word also
+                     matches as a prefix
+        limit: Maximum number of images to return
+        offset: Number of ranked results to skip
+
     Returns:
-        list: List of matching image records
-    """
-    sql = """
-    SELECT 
-        GeneratedImageID, Prompt, NegativePrompt, FilePath, FileName,
-        Seed, GenerationTime, ViewCount, DownloadCount
-    FROM GeneratedImages
-    WHERE Status = 'completed'
-        AND (Prompt LIKE ? OR NegativePrompt LIKE ?)
-    ORDER BY GenerationTime DESC
+        tuple: (list of matching image records with a "score", total number of matches)
     """
-    
     try:
-        search_pattern = f"%{search_term}%"
-        cursor.execute(sql, search_pattern, search_pattern)
-        rows = cursor.fetchall()
-        
+        _ensure_search_index()
+        try:
+            _catch_up_external_writes()
+        except Exception as e:
+            # Search what is indexed; the catch-up is retried next time
+            print(f"[WARNING] Could not catch up on external writes: {e}")
+        ranked, total = search_index.search(search_term, limit=limit, offset=offset)
+        if not ranked:
+            return [], total
+
+        placeholders = ", ".join("?" for _ in ranked)
+        sql = f"""
+        SELECT 
+            GeneratedImageID, Prompt, NegativePrompt, FilePath, FileName,
+            Seed, GenerationTime, ViewCount, DownloadCount
+        FROM GeneratedImages
+        WHERE GeneratedImageID IN ({placeholders})
+        """
+
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, tuple(doc_id for doc_id, _ in ranked))
+            rows = {row[0]: row for row in cursor.fetchall()}
+
         images = []
-        for row in rows:
-            images.append({
+        for doc_id, score in ranked:
+            row = rows.get(doc_id)
+            if row is None:
+                continue
+            images.append(_merge_pending_counts({
                 "generated_image_id": row[0],
                 "prompt": row[1],
                 "negative_prompt": row[2],
@@ -394,19 +1399,74 @@ def search_generated_images(search_term: str) -> List[Dict]:
                 "seed": row[5],
                 "generation_time": row[6],
                 "view_count": row[7],
-                "download_count": row[8]
-            })
-        
-        return images
-        
+                "download_count": row[8],
+                "score": score
+            }))
+
+        return images, total
+
     except Exception as e:
         print(f"[ERROR] Failed to search images: {e}")
-        return []
+        return [], 0
+
+
+def _flush_counters(deltas: Dict[int, Tuple[int, int]]):
+    """
+    Apply a batch of buffered (views, downloads) increments in one transaction.
+    Increments for images that no longer exist are dropped, so they never
+    reach the statistics totals.
+    """
+    sql = """
+    UPDATE GeneratedImages
+    SET ViewCount = ViewCount + ?, DownloadCount = DownloadCount + ?
+    WHERE GeneratedImageID = ?
+    """
+    image_ids = sorted(deltas)
+    with generation_stats.writing(), pool.connection() as conn:
+        cursor = conn.cursor()
+        existing = set()
+        # 1000 per query keeps under SQL Server's 2100 parameter limit
+        for start in range(0, len(image_ids), 1000):
+            chunk = image_ids[start:start + 1000]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(
+                f"SELECT GeneratedImageID FROM GeneratedImages WHERE GeneratedImageID IN ({placeholders})",
+                tuple(chunk)
+            )
+            existing.update(row[0] for row in cursor.fetchall())
+
+        applied = [(image_id, deltas[image_id]) for image_id in image_ids if image_id in existing]
+        if applied:
+            _enable_fast_executemany(cursor)
+            cursor.executemany(sql, [
+                (views, downloads, generated_image_id)
+                for generated_image_id, (views, downloads) in applied
+            ])
+        conn.commit()
+        generation_stats.record_counts(
+            sum(views for _, (views, _) in applied),
+            sum(downloads for _, (_, downloads) in applied)
+        )
+
+
+# View and download increments are buffered and written in batches
+counter_buffer = CounterBuffer(_flush_counters)
+
+
+def _merge_pending_counts(image: Dict) -> Dict:
+    # Add increments that have not been flushed yet so reads stay accurate
+    views, downloads = counter_buffer.pending(image["generated_image_id"])
+    if "view_count" in image:
+        image["view_count"] = (image["view_count"] or 0) + views
+    if "download_count" in image:
+        image["download_count"] = (image["download_count"] or 0) + downloads
+    return image
 
 
 def increment_view_count(generated_image_id: int) -> bool:
     """
     Increment the view count for a generated image.
+    The increment is buffered and written by the next counter flush.
     
     Args:
         generated_image_id: The ID of the image
@@ -414,19 +1474,11 @@ def increment_view_count(generated_image_id: int) -> bool:
     Returns:
         bool: True if successful, False otherwise
     """
-    sql = """
-    UPDATE GeneratedImages
-    SET ViewCount = ViewCount + 1
-    WHERE GeneratedImageID = ?
-    """
-    
     try:
-        cursor.execute(sql, generated_image_id)
-        conn.commit()
+        counter_buffer.increment(generated_image_id, "views")
         return True
         
     except Exception as e:
-        conn.rollback()
         print(f"[ERROR] Failed to increment view count: {e}")
         return False
 
@@ -434,26 +1486,28 @@ def increment_view_count(generated_image_id: int) -> bool:
 def increment_download_count(generated_image_id: int) -> bool:
     """
     Increment the download count for a generated image.
+    The increment is buffered and written by the next counter flush.
     
     Args:
         generated_image_id: The ID of the image
     
     Returns:
-        bool: True if successful, False otherwise
-    """
-    sql = """
-    UPDATE GeneratedImages
-    SET DownloadCount = DownloadCount + 1
-    WHERE GeneratedImageID = ?
+        bool: True if successful, False if the image does not exist or on error
     """
-    
     try:
-        cursor.execute(sql, generated_image_id)
-        conn.commit()
+        # Downloads are posted by clients, so check the ID before counting it
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT 1 FROM GeneratedImages WHERE GeneratedImageID = ?",
+                (generated_image_id,)
+            )
+            if cursor.fetchone() is None:
+                return False
+        counter_buffer.increment(generated_image_id, "downloads")
         return True
         
     except Exception as e:
-        conn.rollback()
         print(f"[ERROR] Failed to increment download count: {e}")
         return False
 
@@ -478,65 +1532,168 @@ def get_images_by_seed(seed: int) -> List[Dict]:
     """
     
     try:
-        cursor.execute(sql, seed)
-        rows = cursor.fetchall()
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (seed,))
+            rows = cursor.fetchall()
         
-        images = []
-        for row in rows:
-            images.append({
-                "generated_image_id": row[0],
-                "prompt": row[1],
-                "negative_prompt": row[2],
-                "file_path": row[3],
-                "file_name": row[4],
-                "seed": row[5],
-                "generation_time": row[6],
-                "image_width": row[7],
-                "image_height": row[8]
-            })
+            images = []
+            for row in rows:
+                images.append({
+                    "generated_image_id": row[0],
+                    "prompt": row[1],
+                    "negative_prompt": row[2],
+                    "file_path": row[3],
+                    "file_name": row[4],
+                    "seed": row[5],
+                    "generation_time": row[6],
+                    "image_width": row[7],
+                    "image_height": row[8]
+                })
         
-        return images
+            return images
         
     except Exception as e:
         print(f"[ERROR] Failed to get images by seed: {e}")
         return []
 
 
-def get_generation_statistics() -> Dict:
+def find_generated_image(
+    prompt: str,
+    negative_prompt: Optional[str],
+    seed: int,
+    num_inference_steps: int,
+    guidance_scale: float,
+    image_width: int,
+    image_height: int,
+    model_used: str,
+    statuses: Tuple[str, ...] = ("completed",)
+) -> Optional[Dict]:
     """
-    Get overall statistics about image generation.
+    Find the newest image generated with exactly these parameters.
+    
+    Generation with a fixed seed is deterministic, so a match can be
+    returned instead of generating the same image again. The Seed index
+    narrows the search to a handful of rows.
+    
+    Args:
+        statuses: Row statuses that count as a match, e.g. include
+                  'queued' and 'processing' to find jobs still pending
     
     Returns:
-        dict: Statistics including total images, avg duration, etc.
+        dict: generated_image_id, file_path and status, or None
     """
-    sql = """
-    SELECT 
-        COUNT(*) as TotalImages,
-        COUNT(CASE WHEN Status = 'completed' THEN 1 END) as CompletedImages,
-        COUNT(CASE WHEN Status = 'failed' THEN 1 END) as FailedImages,
-        AVG(CASE WHEN Status = 'completed' THEN GenerationDuration END) as AvgDuration,
-        SUM(FileSize) as TotalStorageUsed,
-        SUM(ViewCount) as TotalViews,
-        SUM(DownloadCount) as TotalDownloads
+    placeholders = ", ".join("?" for _ in statuses)
+    sql = f"""
+    SELECT TOP (?) GeneratedImageID, FilePath, Status
     FROM GeneratedImages
+    WHERE Seed = ? AND Prompt = ? AND COALESCE(NegativePrompt, '') = ?
+        AND NumInferenceSteps = ? AND GuidanceScale = ?
+        AND ImageWidth = ? AND ImageHeight = ? AND ModelUsed = ?
+        AND Status IN ({placeholders})
+    ORDER BY GeneratedImageID DESC
     """
     
-    try:
-        cursor.execute(sql)
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, (
+            1,
+            seed,
+            prompt,
+            # A missing negative prompt generates the same image as ""
+            negative_prompt or "",
+            num_inference_steps,
+            guidance_scale,
+            image_width,
+            image_height,
+            model_used,
+            *statuses
+        ))
         row = cursor.fetchone()
-        
-        if row:
-            return {
-                "total_images": row[0] or 0,
-                "completed_images": row[1] or 0,
-                "failed_images": row[2] or 0,
-                "avg_duration_seconds": float(row[3]) if row[3] else 0.0,
-                "total_storage_bytes": row[4] or 0,
-                "total_views": row[5] or 0,
-                "total_downloads": row[6] or 0
+    
+    if row is None:
+        return None
+    return {"generated_image_id": row[0], "file_path": row[1], "status": row[2]}
+
+
+# Running totals for /generation-statistics/, kept current on every write
+generation_stats = GenerationStats()
+
+
+def _load_generation_stats_rows() -> List[Tuple]:
+    # Runs outside generation_stats' lock; its rows are dropped if a write
+    # overlapped. Open jobs get a group each, so that when following
+    # external writes the catch-up knows what the totals hold for them.
+    sql = """
+    SELECT 
+        CAST(GenerationTime AS DATE) as GenerationDate,
+        ModelUsed,
+        Status,
+        COUNT(*),
+        SUM(GenerationDuration),
+        COUNT(GenerationDuration),
+        SUM(FileSize),
+        SUM(ViewCount),
+        SUM(DownloadCount),
+        MAX(GeneratedImageID),
+        MAX(GenerationTime),
+        OpenJobID
+    FROM (
+        SELECT *,
+            CASE WHEN Status IN ('queued', 'processing') THEN GeneratedImageID END AS OpenJobID
+        FROM GeneratedImages
+    ) AS Images
+    GROUP BY CAST(GenerationTime AS DATE), ModelUsed, Status, OpenJobID
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        rows = [tuple(row) for row in cursor.fetchall()]
+
+    if _follow_external_writes:
+        _seed_external_stats(
+            max((row[9] for row in rows), default=0),
+            {
+                row[11]: (row[2], row[1], row[4], row[6], row[10])
+                for row in rows if row[11] is not None
             }
-        
-        return {}
+        )
+    return [row[:9] for row in rows]
+
+
+def reconcile_generation_statistics():
+    """
+    Rebuild the statistics rollup from the table. Run at startup; the
+    rollup is then maintained incrementally.
+    """
+    generation_stats.reconcile(_load_generation_stats_rows)
+
+
+def get_generation_statistics() -> Dict:
+    """
+    Get overall statistics about image generation, plus per-day and
+    per-model breakdowns.
+    
+    Served from the in-memory rollup, so the cost does not depend on the
+    size of GeneratedImages.
+    
+    Returns:
+        dict: Statistics including total images, avg duration, etc.
+    """
+    try:
+        generation_stats.ensure_loaded(_load_generation_stats_rows)
+        try:
+            _catch_up_external_writes()
+        except Exception as e:
+            # Serve the totals as they are; the catch-up is retried next time
+            print(f"[WARNING] Could not catch up on external writes: {e}")
+        stats = generation_stats.snapshot()
+
+        # Include view/download increments that have not been flushed yet
+        pending_views, pending_downloads = counter_buffer.pending_totals()
+        stats["total_views"] += pending_views
+        stats["total_downloads"] += pending_downloads
+        return stats
         
     except Exception as e:
         print(f"[ERROR] Failed to get statistics: {e}")
@@ -555,32 +1712,54 @@ def delete_generated_image(generated_image_id: int, delete_file: bool = False) -
         bool: True if successful, False otherwise
     """
     try:
-        # Get file path if we need to delete the file
-        if delete_file:
+        # Before reading the row, so the counts it holds are final and
+        # the stats below subtract exactly what was added for it
+        counter_buffer.discard(generated_image_id)
+        with generation_stats.writing(), _tracking_own_write() as track, pool.connection() as conn:
+            # Also before reading: the state the totals hold for a job that
+            # another process moved on, which may not be caught up yet
+            held = track(generated_image_id, None)
+            cursor = conn.cursor()
             cursor.execute(
-                "SELECT FilePath FROM GeneratedImages WHERE GeneratedImageID = ?",
-                generated_image_id
+                """
+                SELECT FilePath, Status, ModelUsed, GenerationDuration, FileSize,
+                    GenerationTime, ViewCount, DownloadCount
+                FROM GeneratedImages
+                WHERE GeneratedImageID = ?
+                """,
+                (generated_image_id,)
             )
             row = cursor.fetchone()
-            
-            if row and row[0]:
+
+            # Delete the physical file if requested
+            if delete_file and row and row[0]:
                 file_path = row[0]
                 if os.path.exists(file_path):
                     os.remove(file_path)
                     print(f"[INFO] Deleted file: {file_path}")
+                delete_thumbnails(file_path)
         
-        # Delete from database
-        cursor.execute(
-            "DELETE FROM GeneratedImages WHERE GeneratedImageID = ?",
-            generated_image_id
-        )
-        conn.commit()
+            # Delete from database
+            cursor.execute(
+                "DELETE FROM GeneratedImages WHERE GeneratedImageID = ?",
+                (generated_image_id,)
+            )
+            # Another process may have deleted the row since it was read;
+            # then it is only still counted if it is a tracked job
+            deleted = row is not None and cursor.rowcount > 0
+            conn.commit()
+            search_index.remove(generated_image_id)
+            if held or deleted:
+                status, model_used, generation_duration, file_size, generation_time = held or row[1:6]
+                generation_stats.record_delete(
+                    status=status, model=model_used, duration=generation_duration, file_size=file_size,
+                    generation_time=generation_time, views=row[6] if row else 0, downloads=row[7] if row else 0
+                )
         
-        print(f"[SUCCESS] Deleted generated image ID: {generated_image_id}")
-        return True
+            print(f"[SUCCESS] Deleted generated image ID: {generated_image_id}")
+            return True
         
     except Exception as e:
-        conn.rollback()
         print(f"[ERROR] Failed to delete generated image: {e}")
         return False
 
@@ -602,12 +1781,13 @@ def add_prompt_tag(generated_image_id: int, tag_name: str) -> bool:
     """
     
     try:
-        cursor.execute(sql, generated_image_id, tag_name.lower().strip())
-        conn.commit()
-        return True
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (generated_image_id, tag_name.lower().strip()))
+            conn.commit()
+            return True
         
     except Exception as e:
-        conn.rollback()
         print(f"[ERROR] Failed to add tag: {e}")
         return False
 
@@ -630,9 +1810,11 @@ def get_tags_for_image(generated_image_id: int) -> List[str]:
     """
     
     try:
-        cursor.execute(sql, generated_image_id)
-        rows = cursor.fetchall()
-        return [row[0] for row in rows]
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (generated_image_id,))
+            rows = cursor.fetchall()
+            return [row[0] for row in rows]
         
     except Exception as e:
         print(f"[ERROR] Failed to get tags: {e}")
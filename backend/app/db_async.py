@@ -0,0 +1,59 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app import db
+
+# One thread per pooled connection, so queued queries wait here rather
+# than on the pool's checkout timeout
+DB_ASYNC_WORKERS = int(os.getenv("DB_ASYNC_WORKERS", str(db.DB_POOL_SIZE)))
+
+_executor = ThreadPoolExecutor(max_workers=DB_ASYNC_WORKERS, thread_name_prefix="db")
+
+
+async def run(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking database call on the DB thread pool and await its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def _async(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+    return wrapper
+
+
+def shutdown():
+    _executor.shutdown(wait=True)
+
+
+# Awaitable versions of the app.db API for FastAPI handlers. Scripts and
+# worker threads keep calling app.db directly.
+insert_image = _async(db.insert_image)
+insert_question = _async(db.insert_question)
+insert_answer = _async(db.insert_answer)
+get_or_create_answer = _async(db.get_or_create_answer)
+get_image_questions = _async(db.get_image_questions)
+get_images_page = _async(db.get_images_page)
+get_file_path = _async(db.get_file_path)
+insert_generated_image = _async(db.insert_generated_image)
+insert_generated_images_bulk = _async(db.insert_generated_images_bulk)
+get_generated_image_by_id = _async(db.get_generated_image_by_id)
+get_recent_generated_images = _async(db.get_recent_generated_images)
+get_generation_job = _async(db.get_generation_job)
+get_generation_queue_counts = _async(db.get_generation_queue_counts)
+search_generated_images = _async(db.search_generated_images)
+increment_view_count = _async(db.increment_view_count)
+increment_download_count = _async(db.increment_download_count)
+get_images_by_seed = _async(db.get_images_by_seed)
+find_generated_image = _async(db.find_generated_image)
+get_generation_statistics = _async(db.get_generation_statistics)
+reconcile_generation_statistics = _async(db.reconcile_generation_statistics)
+delete_generated_image = _async(db.delete_generated_image)
+add_prompt_tag = _async(db.add_prompt_tag)
+get_tags_for_image = _async(db.get_tags_for_image)
@@ -0,0 +1,256 @@
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict
+
+import pyodbc
+
+
+class PoolTimeoutError(Exception):
+    """
+    Raised when no connection becomes available within the pool timeout.
+    """
+
+
+class _PooledConnection:
+    def __init__(self, raw):
+        self.raw = raw
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Each request checks out its own connection with `connection()`, so
+    concurrent requests never share a cursor. Connections that sat idle
+    longer than `health_check_interval` are pinged before being handed
+    out and replaced if the ping fails; connections that raise a
+    connection-level error while in use are discarded instead of being
+    returned to the pool.
+
+    Args:
+        connect: Function that opens a new raw connection
+        max_size: Maximum number of open connections
+        timeout: Seconds to wait for a free connection before giving up
+        health_check_interval: Idle seconds after which a connection is
+                               pinged before reuse
+        dialect: "mssql" or "sqlite"
+    """
+
+    def __init__(
+        self,
+        connect: Callable,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        dialect: str = "mssql",
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.dialect = dialect
+
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+
+        self._checkouts = 0
+        self._reconnects = 0
+        self._discarded = 0
+        self._timeouts = 0
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of the block.
+        Uncommitted work is rolled back when the block exits.
+        """
+        pooled = self._checkout()
+        broken = False
+        try:
+            yield pooled.raw
+        except Exception as e:
+            broken = self._is_disconnect(e)
+            raise
+        finally:
+            self._checkin(pooled, broken)
+
+    def close_all(self):
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(pooled)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "dialect": self.dialect,
+                "max_size": self.max_size,
+                "open": self._open,
+                "idle": self._idle.qsize(),
+                "in_use": self._open - self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "reconnects": self._reconnects,
+                "discarded": self._discarded,
+                "timeouts": self._timeouts,
+            }
+
+    def _checkout(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = None
+
+            if pooled is None:
+                with self._lock:
+                    can_open = self._open < self.max_size
+                    if can_open:
+                        self._open += 1
+                if can_open:
+                    try:
+                        pooled = _PooledConnection(self.connect())
+                    except Exception:
+                        with self._lock:
+                            self._open -= 1
+                        raise
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        with self._lock:
+                            self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.timeout}s"
+                        )
+                    # Wake up periodically in case a discarded connection freed a slot
+                    try:
+                        pooled = self._idle.get(timeout=min(remaining, 0.1))
+                    except queue.Empty:
+                        continue
+
+            if time.monotonic() - pooled.last_used > self.health_check_interval and not self._ping(pooled):
+                # Stale connection (server restart, network drop): replace it
+                self._close(pooled)
+                with self._lock:
+                    self._reconnects += 1
+                continue
+
+            with self._lock:
+                self._checkouts += 1
+            return pooled
+
+    def _checkin(self, pooled: _PooledConnection, broken: bool):
+        if not broken:
+            try:
+                pooled.raw.rollback()
+            except Exception:
+                broken = True
+
+        if broken:
+            self._close(pooled)
+            with self._lock:
+                self._discarded += 1
+            return
+
+        pooled.last_used = time.monotonic()
+        self._idle.put(pooled)
+
+    def _ping(self, pooled: _PooledConnection) -> bool:
+        try:
+            cursor = pooled.raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, pooled: _PooledConnection):
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._open -= 1
+
+    def _is_disconnect(self, error: Exception) -> bool:
+        if isinstance(error, pyodbc.Error):
+            # SQLSTATE class 08 is "connection exception"; HYT00/HYT01 are timeouts
+            state = str(error.args[0]) if error.args else ""
+            return state.startswith("08") or state in ("HYT00", "HYT01")
+        if isinstance(error, sqlite3.OperationalError):
+            return "unable to open" in str(error) or "disk i/o" in str(error).lower()
+        return False
+
+
+# -----------------------------
+# SQLite backend (local load testing)
+# -----------------------------
+_OUTPUT_INSERTED = re.compile(r"\bOUTPUT\s+INSERTED\.(\w+)\s*", re.IGNORECASE)
+_SELECT_TOP = re.compile(r"^(\s*SELECT\s+)TOP\s*\(\?\)\s*", re.IGNORECASE)
+_CAST_DATE = re.compile(r"\bCAST\(\s*(\w+)\s+AS\s+DATE\s*\)", re.IGNORECASE)
+
+
+def translate_tsql(sql: str, params: tuple):
+    """
+    Rewrite the T-SQL constructs used in db.py into SQLite syntax:
+    OUTPUT INSERTED.col -> RETURNING col, GETDATE() -> CURRENT_TIMESTAMP,
+    CAST(col AS DATE) -> DATE(col) and SELECT TOP (?) -> LIMIT ? (moving
+    the parameter to the end).
+    """
+    sql = sql.replace("GETDATE()", "CURRENT_TIMESTAMP")
+    sql = _CAST_DATE.sub(r"DATE(\1)", sql)
+
+    match = _OUTPUT_INSERTED.search(sql)
+    if match:
+        sql = _OUTPUT_INSERTED.sub("", sql).rstrip().rstrip(";") + f" RETURNING {match.group(1)}"
+
+    if _SELECT_TOP.match(sql):
+        sql = _SELECT_TOP.sub(r"\1", sql).rstrip().rstrip(";") + " LIMIT ?"
+        params = tuple(params[1:]) + (params[0],)
+
+    return sql, params
+
+
+class SQLiteCursor(sqlite3.Cursor):
+    """
+    Cursor that accepts the T-SQL statements written for SQL Server.
+    """
+
+    def execute(self, sql, params=()):
+        return super().execute(*translate_tsql(sql, tuple(params)))
+
+    def executemany(self, sql, seq_of_params):
+        translated, _ = translate_tsql(sql, ())
+        return super().executemany(translated, [tuple(params) for params in seq_of_params])
+
+
+class SQLiteConnection(sqlite3.Connection):
+    def cursor(self, factory=SQLiteCursor):
+        return super().cursor(factory)
+
+
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path,
+        timeout=30,
+        check_same_thread=False,  # pooled connections move between threads
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        factory=SQLiteConnection,
+    )
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
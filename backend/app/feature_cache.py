@@ -0,0 +1,87 @@
+import os
+import threading
+import uuid
+from typing import Dict, Optional
+
+import torch
+
+from app.cache import LRUCache, tensor_nbytes
+
+
+class FeatureCache:
+    """
+    Two-tier cache of projected image features keyed by image content hash.
+
+    The memory tier is an LRU bounded by bytes. When `disk_dir` is set,
+    every stored entry is also written there and memory misses fall back
+    to disk before recomputing.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None):
+        self.memory = LRUCache(max_bytes=max_bytes, size_of=tensor_nbytes)
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_writes = 0
+
+    def get(self, key: str, device: str = "cpu") -> Optional[torch.Tensor]:
+        features = self.memory.get(key)
+        if features is not None:
+            return features
+
+        path = self._disk_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            features = torch.load(path, map_location=device)
+        except Exception as e:
+            print(f"[WARNING] Could not read cached features {path}: {e}")
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+        self.memory.put(key, features)
+        return features
+
+    def put(self, key: str, features: torch.Tensor):
+        self.memory.put(key, features)
+
+        path = self._disk_path(key)
+        if path is None or os.path.exists(path):
+            return
+
+        try:
+            # Write then rename so readers never see a partial file; the temp
+            # name is unique so threads caching the same image do not collide
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            torch.save(features.detach().cpu(), tmp_path)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.disk_writes += 1
+        except Exception as e:
+            print(f"[WARNING] Could not write cached features {path}: {e}")
+
+    def __contains__(self, key: str) -> bool:
+        if key in self.memory:
+            return True
+        path = self._disk_path(key)
+        return path is not None and os.path.exists(path)
+
+    def stats(self) -> Dict:
+        stats = self.memory.stats()
+        with self._lock:
+            stats["disk_dir"] = self.disk_dir
+            stats["disk_hits"] = self.disk_hits
+            stats["disk_writes"] = self.disk_writes
+        # A disk hit still counts as a memory miss; report true misses too
+        stats["misses_uncached"] = stats["misses"] - stats["disk_hits"]
+        return stats
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, f"{key}.pt")
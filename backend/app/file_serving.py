@@ -0,0 +1,134 @@
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.cache import LRUCache
+
+# Seconds browsers and proxies may reuse a served file without revalidating
+FILE_CACHE_MAX_AGE = int(os.getenv("FILE_CACHE_MAX_AGE", "86400"))
+FILE_CHUNK_SIZE = 64 * 1024
+
+# File bytes never change for a given (path, mtime, size), so the digest
+# is computed once per file rather than on every request
+_etags = LRUCache(max_entries=int(os.getenv("FILE_ETAG_CACHE_SIZE", "10000")))
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """
+    Raised when a Range header lies entirely outside the file.
+    """
+
+    def __init__(self, file_size: int):
+        super().__init__(f"Range not satisfiable for {file_size} bytes")
+        self.file_size = file_size
+
+
+def content_type(file_path: str) -> str:
+    return mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+
+def file_etag(file_path: str) -> str:
+    """
+    Strong ETag for a file: the quoted SHA-256 of its bytes.
+    """
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+
+    etag = _etags.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(FILE_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        _etags.put(key, etag)
+    return etag
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches the ETag. Weak comparison, as
+    RFC 9110 requires for If-None-Match.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def parse_range(header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header.
+
+    Returns:
+        tuple: Inclusive (start, end) byte offsets, or None to send the
+               whole file (no header, or a form we do not support such as
+               multiple ranges)
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the file,
+                             or the file is empty
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or file_size == 0:
+            raise RangeNotSatisfiable(file_size)
+        return max(file_size - length, 0), file_size - 1
+
+    start = int(first)
+    end = int(last) if last else file_size - 1
+    if start >= file_size or end < start:
+        raise RangeNotSatisfiable(file_size)
+    return start, min(end, file_size - 1)
+
+
+def iter_file(file_path: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    Yield the bytes of a file from start to end inclusive, in chunks.
+    """
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def cache_headers(file_path: str, etag: str) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={FILE_CACHE_MAX_AGE}",
+        "Accept-Ranges": "bytes",
+        "Content-Type": content_type(file_path),
+    }
+
+
+def file_urls(kind: str, record_id: int, thumbnail_sizes: List[int]) -> Dict:
+    """
+    URLs of a stored image and its thumbnails for the gallery endpoints.
+    """
+    url = f"/files/{kind}/{record_id}"
+    return {
+        "image_url": url,
+        "thumbnail_urls": {str(size): f"{url}?size={size}" for size in thumbnail_sizes},
+    }
@@ -0,0 +1,173 @@
+"""
+Background worker for queued text-to-image jobs.
+
+Jobs are GeneratedImages rows with Status = 'queued' (see the job queue
+section of app/db.py). The API process runs GENERATION_QUEUE_WORKERS
+worker threads by default; set it to 0 there and run this module to do
+the generation in a separate process instead:
+
+    python -m app.generation_queue
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Worker threads started by the API process; 0 leaves the queue to a separate process
+GENERATION_QUEUE_WORKERS = int(os.getenv("GENERATION_QUEUE_WORKERS", "1"))
+# Seconds between polls of an empty queue. Jobs submitted in the same
+# process wake the workers immediately.
+GENERATION_QUEUE_POLL_INTERVAL = float(os.getenv("GENERATION_QUEUE_POLL_INTERVAL", "2"))
+# A job still processing after this many seconds is assumed lost with its worker and requeued
+GENERATION_JOB_TIMEOUT = float(os.getenv("GENERATION_JOB_TIMEOUT", "1800"))
+
+
+class GenerationQueueWorker:
+    """
+    Threads that drain the persistent text-to-image queue.
+
+    Each thread claims the oldest queued job with `claim_fn` and hands it
+    to `run_fn`, which generates the image and records the result. Jobs
+    that have been processing for longer than `job_timeout` are put back
+    in the queue with `requeue_fn` at startup and then once per timeout.
+
+    Args:
+        claim_fn: Returns the next job, or None if the queue is empty
+        run_fn: Generates a claimed job and stores its outcome
+        requeue_fn: Requeues jobs processing for longer than the given seconds
+        num_workers: Number of worker threads
+        poll_interval: Seconds to wait between polls of an empty queue
+        job_timeout: Seconds after which a processing job counts as stalled
+    """
+
+    def __init__(
+        self,
+        claim_fn: Callable[[], Optional[Dict]],
+        run_fn: Callable[[Dict], bool],
+        requeue_fn: Callable[[float], int],
+        num_workers: int = GENERATION_QUEUE_WORKERS,
+        poll_interval: float = GENERATION_QUEUE_POLL_INTERVAL,
+        job_timeout: float = GENERATION_JOB_TIMEOUT,
+    ):
+        self.claim_fn = claim_fn
+        self.run_fn = run_fn
+        self.requeue_fn = requeue_fn
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._next_requeue = 0.0
+
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+        self.last_job_time = None
+
+    def start(self):
+        with self._lock:
+            if self._threads or self.num_workers <= 0:
+                return
+            self._threads = [
+                threading.Thread(target=self._run, name=f"generation-queue-{i}", daemon=True)
+                for i in range(self.num_workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+        print(f"[INFO] Started {self.num_workers} text-to-image queue worker(s)")
+
+    def notify(self):
+        """
+        Wake an idle worker, e.g. right after a job was queued.
+        """
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop claiming jobs and wait for running ones to finish.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "busy": self.busy,
+                "completed": self.completed,
+                "failed": self.failed,
+                "requeued": self.requeued,
+                "last_job_time": self.last_job_time,
+                "poll_interval": self.poll_interval,
+                "job_timeout": self.job_timeout,
+            }
+
+    def _requeue_stale(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_requeue:
+                return
+            self._next_requeue = now + self.job_timeout
+        requeued = self.requeue_fn(self.job_timeout)
+        with self._lock:
+            self.requeued += requeued
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._requeue_stale()
+                job = self.claim_fn()
+            except Exception as e:
+                print(f"[ERROR] Could not read the text-to-image queue: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            with self._lock:
+                self.busy += 1
+            try:
+                succeeded = self.run_fn(job)
+            except Exception as e:
+                print(f"[ERROR] Text-to-image job {job.get('job_id')} crashed: {e}")
+                succeeded = False
+            with self._lock:
+                self.busy -= 1
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.last_job_time = time.time()
+
+
+def main():
+    from app import db
+    from app.text_to_image import run_generation_job
+
+    num_workers = max(1, int(os.getenv("GENERATION_QUEUE_PROCESS_WORKERS", "1")))
+    worker = GenerationQueueWorker(
+        db.claim_generation_job,
+        run_generation_job,
+        db.requeue_stale_generation_jobs,
+        num_workers=num_workers,
+    )
+    worker.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("[INFO] Stopping text-to-image queue worker, finishing current jobs...")
+        worker.stop()
+        db.pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Reconcile queries that may race with writes before new writes are held
+# back until the query is done
+RECONCILE_ATTEMPTS = 3
+# Seconds an attempt waits for the writes in progress to finish
+RECONCILE_QUIET_WAIT = 1.0
+
+
+class _Bucket:
+    __slots__ = ("count", "duration_sum", "duration_count", "storage")
+
+    def __init__(self):
+        self.count = 0
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        self.storage = 0
+
+    def add(self, sign: int, count: int, duration_sum: float, duration_count: int, storage: int):
+        self.count += sign * count
+        self.duration_sum += sign * duration_sum
+        self.duration_count += sign * duration_count
+        self.storage += sign * storage
+
+    def avg_duration(self) -> float:
+        return self.duration_sum / self.duration_count if self.duration_count else 0.0
+
+
+def _day(value) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10] if value else date.today().isoformat()
+
+
+class GenerationStats:
+    """
+    Running totals behind /generation-statistics/, overall and broken down
+    per day and per model.
+
+    Loaded once from a grouped query over GeneratedImages (`reconcile`),
+    then kept current by db.py on insert, status change, delete and
+    counter flush, so reads cost the same however many rows there are.
+    Totals are per process; with several workers each reconciles at
+    startup and only sees its own writes afterwards, unless db.py feeds it
+    the changes other processes made (see db.follow_external_writes).
+
+    Writers wrap each transaction and its record_* call in `writing()`,
+    which counts writes in progress and finished. The reconcile query runs
+    without the lock and its rows are only used if no write overlapped
+    it, so each change is counted either by the query or by record_*,
+    never by both.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._writes_changed = threading.Condition(self._lock)
+        self._active_writes = 0
+        # Bumped when a write finishes; a reconcile checks it did not move
+        self._write_seq = 0
+        self._writers_paused = False
+        self._reconcile_lock = threading.Lock()
+        self._reset()
+        self.loaded = False
+        self.reconciled_at: Optional[datetime] = None
+
+    @contextmanager
+    def writing(self):
+        """
+        Wrap a transaction that changes GeneratedImages together with its
+        record_* call. Only entering and leaving take the lock; the database
+        work runs outside it. Enter before checking out a connection: a
+        reconcile that has to hold writers back holds them here.
+        """
+        with self._lock:
+            while self._writers_paused:
+                self._writes_changed.wait()
+            self._active_writes += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active_writes -= 1
+                self._write_seq += 1
+                self._writes_changed.notify_all()
+
+    def reconcile(self, load_rows: Callable[[], Iterable[Tuple]],
+                  needed: Optional[Callable[[], bool]] = None):
+        """
+        Replace all totals from the grouped rows returned by `load_rows`:
+        (day, model, status, count, duration_sum, duration_count, storage, views, downloads).
+
+        A write that overlaps the query may or may not be in its rows, so
+        they are only used if no write was in progress or finished while it
+        ran. Otherwise the query is retried, and after RECONCILE_ATTEMPTS
+        new writes wait until it completes.
+
+        Args:
+            load_rows: Runs the grouped query
+            needed: Checked before reconciling; returning False skips it
+        """
+        with self._reconcile_lock:
+            if needed is not None and not needed():
+                return
+            try:
+                for attempt in range(RECONCILE_ATTEMPTS + 1):
+                    with self._lock:
+                        if attempt == RECONCILE_ATTEMPTS:
+                            self._writers_paused = True
+                            self._writes_changed.wait_for(lambda: not self._active_writes)
+                        else:
+                            self._writes_changed.wait_for(
+                                lambda: not self._active_writes, timeout=RECONCILE_QUIET_WAIT
+                            )
+                        seq = self._write_seq
+                    rows = load_rows()
+                    with self._lock:
+                        if self._write_seq == seq and not self._active_writes:
+                            self._install(rows)
+                            return
+            finally:
+                with self._lock:
+                    self._writers_paused = False
+                    self._writes_changed.notify_all()
+
+    def _install(self, rows: Iterable[Tuple]):
+        # Caller holds the lock
+        self._reset()
+        for day, model, status, count, duration_sum, duration_count, storage, views, downloads in rows:
+            self._apply(
+                1, _day(day), model, status,
+                count, float(duration_sum or 0), duration_count or 0, storage or 0
+            )
+            self.views += views or 0
+            self.downloads += downloads or 0
+        self.loaded = True
+        self.reconciled_at = datetime.now()
+
+    def ensure_loaded(self, load_rows: Callable[[], Iterable[Tuple]]):
+        """
+        Reconcile if the totals were never loaded, e.g. the startup
+        reconcile failed.
+        """
+        if not self.loaded:
+            self.reconcile(load_rows, needed=lambda: not self.loaded)
+
+    def record_insert(self, status: str, model: str, duration: Optional[float], file_size: Optional[int],
+                      generation_time=None):
+        with self._lock:
+            if self.loaded:
+                self._apply_row(1, status, model, duration, file_size, generation_time)
+
+    def record_delete(self, status: str, model: str, duration: Optional[float], file_size: Optional[int],
+                      generation_time, views: int, downloads: int):
+        with self._lock:
+            if self.loaded:
+                self._apply_row(-1, status, model, duration, file_size, generation_time)
+                self.views -= views or 0
+                self.downloads -= downloads or 0
+
+    def record_status_change(self, old_status: str, new_status: str, model: str,
+                             duration: Optional[float], file_size: Optional[int], generation_time=None,
+                             old_duration: Optional[float] = None, old_file_size: Optional[int] = None):
+        """
+        Move a row between statuses, e.g. when a queued generation completes.
+        """
+        with self._lock:
+            if self.loaded:
+                self._apply_row(-1, old_status, model, old_duration, old_file_size, generation_time)
+                self._apply_row(1, new_status, model, duration, file_size, generation_time)
+
+    def record_counts(self, views: int, downloads: int):
+        with self._lock:
+            if self.loaded:
+                self.views += views
+                self.downloads += downloads
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            completed = self._by_status.get("completed", _Bucket())
+            failed = self._by_status.get("failed", _Bucket())
+            total = _Bucket()
+            for bucket in self._by_status.values():
+                total.add(1, bucket.count, bucket.duration_sum, bucket.duration_count, bucket.storage)
+
+            by_day = [
+                {
+                    "date": day,
+                    "images_generated": bucket.count,
+                    "avg_duration_seconds": bucket.avg_duration(),
+                    "total_storage_bytes": bucket.storage,
+                }
+                for (day, status), bucket in sorted(self._by_day.items(), reverse=True)
+                if status == "completed" and bucket.count
+            ]
+
+            models = {}
+            for (model, status), bucket in self._by_model.items():
+                if not bucket.count:
+                    continue
+                entry = models.setdefault(model, {
+                    "model": model,
+                    "total_images": 0,
+                    "completed_images": 0,
+                    "failed_images": 0,
+                    "avg_duration_seconds": 0.0,
+                    "total_storage_bytes": 0,
+                })
+                entry["total_images"] += bucket.count
+                entry["total_storage_bytes"] += bucket.storage
+                if status == "completed":
+                    entry["completed_images"] = bucket.count
+                    entry["avg_duration_seconds"] = bucket.avg_duration()
+                elif status == "failed":
+                    entry["failed_images"] = bucket.count
+
+            return {
+                "total_images": total.count,
+                "completed_images": completed.count,
+                "failed_images": failed.count,
+                "avg_duration_seconds": completed.avg_duration(),
+                "total_storage_bytes": total.storage,
+                "total_views": self.views,
+                "total_downloads": self.downloads,
+                "by_day": by_day,
+                "by_model": sorted(models.values(), key=lambda entry: -entry["total_images"]),
+                "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+            }
+
+    def _reset(self):
+        self._by_status: Dict[str, _Bucket] = {}
+        self._by_day: Dict[Tuple[str, str], _Bucket] = {}
+        self._by_model: Dict[Tuple[str, str], _Bucket] = {}
+        self.views = 0
+        self.downloads = 0
+
+    def _apply_row(self, sign: int, status: str, model: str, duration: Optional[float],
+                   file_size: Optional[int], generation_time):
+        # Caller holds the lock; like AVG in the reconcile query, rows
+        # without a duration do not count towards the average
+        has_duration = duration is not None
+        self._apply(
+            sign, _day(generation_time), model, status,
+            1, float(duration or 0), 1 if has_duration else 0, file_size or 0
+        )
+
+    def _apply(self, sign: int, day: str, model: str, status: str,
+               count: int, duration_sum: float, duration_count: int, storage: int):
+        # Caller holds the lock
+        for buckets, key in (
+            (self._by_status, status),
+            (self._by_day, (day, status)),
+            (self._by_model, (model, status)),
+        ):
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = _Bucket()
+            bucket.add(sign, count, duration_sum, duration_count, storage)
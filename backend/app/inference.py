@@ -0,0 +1,140 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+
+class QueueFullError(Exception):
+    """
+    Raised when an inference executor has no room for another request.
+
+    Attributes:
+        retry_after: Suggested number of seconds to wait before retrying
+    """
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} inference queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Thread pool for blocking model calls, with a bounded queue.
+
+    Blocking inference runs here instead of on the event loop, so cheap
+    endpoints stay responsive while models are busy. At most
+    `max_workers` calls run at once and at most `max_queue` more wait;
+    anything beyond that is rejected with QueueFullError.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-inference")
+        self._lock = threading.Lock()
+
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue a blocking call.
+
+        Returns:
+            Future: resolves to (result, wait_seconds), where wait_seconds
+                    is how long the call sat in the queue
+
+        Raises:
+            QueueFullError: If the queue is already full
+        """
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise QueueFullError(self.name, self._retry_after())
+            self._queued += 1
+
+        submitted_at = time.monotonic()
+
+        def run():
+            started_at = time.monotonic()
+            wait = started_at - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+                    self._total_run += time.monotonic() - started_at
+
+            return result, wait
+
+        def release_if_cancelled(future: Future):
+            # A future cancelled before it started never runs, so give back its queue slot here
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+                    self._cancelled += 1
+
+        future = self._pool.submit(run)
+        future.add_done_callback(release_if_cancelled)
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Tuple[Any, float]:
+        """
+        Run a blocking call on the pool and await it.
+
+        Returns:
+            tuple: (result, wait_seconds)
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            finished = self._completed + self._failed
+            started = finished + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "avg_run_ms": round(self._total_run / finished * 1000, 2) if finished else 0.0,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _retry_after(self) -> int:
+        # Caller holds the lock. Estimate how long until a slot frees up.
+        finished = self._completed + self._failed
+        if not finished:
+            return 1
+        avg_run = self._total_run / finished
+        return max(1, math.ceil(avg_run * (self._queued + 1) / self.max_workers))
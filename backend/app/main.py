@@ -1,18 +1,45 @@
-from fastapi import FastAPI, UploadFile, Form, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, Form, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from PIL import Image
 from pydantic import BaseModel
 from typing import Optional
-import pyodbc
+import asyncio
 import base64
+import functools
 import io
+import json
 import os
-
-from app import db, vqa_model
-from app.text_to_image import generate_image, image_to_base64, record_download
-from app.models import TextToImageRequest, TextToImageResponse
-from app.db import (
+import threading
+import uuid
+
+from app import db, db_async, text_to_image, vqa_model
+from app.text_to_image import (
+    GenerationCancelled,
+    TEXT_TO_IMAGE_PREVIEW_EVERY,
+    generate_image,
+    image_to_base64,
+    record_download,
+    run_generation_job,
+    submit_generation_job
+)
+from app.models import TextToImageRequest, TextToImageResponse, TextToImageJobResponse
+from app.generation_queue import GenerationQueueWorker
+from app.inference import InferenceExecutor, QueueFullError
+from app.model_registry import registry, PRELOAD_MODELS
+from app.answer_cache import answer_cache
+from app.utils import content_hash
+from app.thumbnails import THUMBNAIL_SIZES, THUMBNAIL_DEFAULT_SIZE, thumbnail_data_uri, ensure_thumbnail
+from app.file_serving import (
+    RangeNotSatisfiable,
+    cache_headers,
+    etag_matches,
+    file_etag,
+    file_urls,
+    iter_file,
+    parse_range
+)
+from app.db_async import (
     get_recent_generated_images,
     get_generated_image_by_id,
     search_generated_images,
@@ -37,49 +64,143 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Content-Range", "X-Run-Id"],
+)
+
+# Blocking model calls run on dedicated pools instead of the event loop.
+# VQA workers mostly wait on the batching scheduler, so allow enough of
+# them to fill a batch.
+vqa_executor = InferenceExecutor(
+    "vqa",
+    max_workers=int(os.getenv("VQA_WORKERS", str(vqa_model.VQA_MAX_BATCH_SIZE))),
+    max_queue=int(os.getenv("VQA_QUEUE_SIZE", "32")),
 )
+image_executor = InferenceExecutor(
+    "text-to-image",
+    max_workers=int(os.getenv("TEXT_TO_IMAGE_WORKERS", "1")),
+    max_queue=int(os.getenv("TEXT_TO_IMAGE_QUEUE_SIZE", "8")),
+)
+
+# Drains jobs submitted to /text-to-image/jobs/. Set GENERATION_QUEUE_WORKERS=0
+# and run `python -m app.generation_queue` to generate in a separate process;
+# search and statistics then catch up with its results from the table.
+generation_worker = GenerationQueueWorker(
+    db.claim_generation_job,
+    run_generation_job,
+    db.requeue_stale_generation_jobs,
+)
+
+
+def queue_full_exception(e: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def _encode_gallery_image(file_path: str, full: bool, thumbnail_size: int, mime: str) -> Optional[str]:
+    if not full:
+        return thumbnail_data_uri(file_path, thumbnail_size)
+
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, "rb") as f:
+        img_bytes = f.read()
+    encoded_image = base64.b64encode(img_bytes).decode("utf-8")
+    return f"data:{mime};base64,{encoded_image}"
 
-# Direct connection parameters
-DB_SERVER = r"(localdb)\MSSQLLocalDB"
-DB_DATABASE = "VQA_DB"
 
-try:
-    conn = pyodbc.connect(
-        f'DRIVER={{ODBC Driver 17 for SQL Server}};'
-        f'SERVER={DB_SERVER};'
-        f'DATABASE={DB_DATABASE};'
-        f'Trusted_Connection=yes;'
+async def encode_gallery_image(
+    file_path: str, full: bool, thumbnail_size: int, mime: str, include_data: bool = True
+) -> Optional[str]:
+    """
+    Data URI for a gallery entry: the thumbnail by default, the original
+    file when full resolution was requested. None if the file is missing
+    or the client asked for URLs only.
+
+    The file reads, and creating a thumbnail the backfill has not reached
+    yet, run on the default thread pool instead of the event loop.
+    """
+    if not include_data:
+        return None
+    if not full and thumbnail_size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"thumbnail_size must be one of {THUMBNAIL_SIZES}"
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(_encode_gallery_image, file_path, full, thumbnail_size, mime)
     )
-    print("[SUCCESS] Connected to SQL Server successfully!")
-    cursor = conn.cursor()
-except pyodbc.Error as e:
-    conn = None
-    print("[ERROR] Failed to connect to SQL Server")
-    print(e)
+
+
+@app.on_event("startup")
+def preload_models():
+    # Models load on first use unless listed in PRELOAD_MODELS
+    if PRELOAD_MODELS:
+        registry.preload(PRELOAD_MODELS)
+    if generation_worker.num_workers <= 0:
+        db.follow_external_writes()
+    try:
+        db.reconcile_generation_statistics()
+    except Exception as e:
+        # Retried on the first /generation-statistics/ request
+        print(f"[WARNING] Could not load generation statistics: {e}")
+    db.warm_search_index()
+    generation_worker.start()
+
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    # Lets a running job finish; jobs still queued stay in the table
+    generation_worker.stop()
+    vqa_executor.shutdown()
+    image_executor.shutdown()
+    db_async.shutdown()
+    # Write buffered view/download counts before the pool goes away
+    db.counter_buffer.close()
+    db.pool.close_all()
 
 # =============================================================================
 # VQA ENDPOINTS
 # =============================================================================
 
 @app.post("/vqa/")
-async def vqa(image: UploadFile, question: str = Form(...)):
+async def vqa(response: Response, image: UploadFile, question: str = Form(...)):
     """
     Visual Question Answering endpoint.
     Accepts an image and a question, returns an AI-generated answer.
     """
     img_bytes = await image.read()
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    image_hash = content_hash(img_bytes)
 
-    try:
+    # Hot repeated questions are answered from memory without touching the DB
+    cached = answer_cache.get(image_hash, question)
+    if cached is not None:
+        answer, confidence = cached
+        return {
+            "answer": answer,
+            "confidence": confidence,
+            "from_cache": True
+        }
+
+    def answer_question():
+        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
         image_id = db.insert_image(image.filename, img_bytes)
 
         def generate_answer_fn():
             return vqa_model.ask_vqa(img, question)
 
-        question_id, answer, confidence, existed = db.get_or_create_answer(
-            image_id, question, generate_answer_fn
-        )
+        return db.get_or_create_answer(image_id, question, generate_answer_fn)
 
+    try:
+        (question_id, answer, confidence, existed), wait = await vqa_executor.run(answer_question)
+        response.headers["X-Queue-Wait-Ms"] = f"{wait * 1000:.1f}"
+        answer_cache.put(image_hash, question, answer, confidence)
+
+    except QueueFullError as e:
+        raise queue_full_exception(e)
     except Exception as e:
         print(f"[ERROR] DB error: {e}")
         answer = "Error occurred"
@@ -93,45 +214,167 @@ async def vqa(image: UploadFile, question: str = Form(...)):
     }
 
 
+@app.post("/vqa/stream")
+async def vqa_stream(image: UploadFile, question: str = Form(...)):
+    """
+    Streaming Visual Question Answering endpoint.
+    Sends the answer as Server-Sent Events while it is decoded:
+      - "token" events carry each new piece of text
+      - a final "answer" event carries the full answer and confidence
+        (sent on its own when the answer was already cached)
+      - an "error" event is sent instead if anything fails
+    """
+    img_bytes = await image.read()
+    image_hash = content_hash(img_bytes)
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(event, data):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    async def event_stream():
+        while True:
+            event, data = await events.get()
+            if event is None:
+                break
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def streaming_response():
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    cached = answer_cache.get(image_hash, question)
+    if cached is not None:
+        answer, confidence = cached
+        events.put_nowait(("answer", {"answer": answer, "confidence": confidence, "from_cache": True}))
+        events.put_nowait((None, None))
+        return streaming_response()
+
+    def run():
+        try:
+            img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+            image_id = db.insert_image(image.filename, img_bytes)
+
+            def generate_answer_fn():
+                return vqa_model.ask_vqa_stream(
+                    img, question, lambda text: emit("token", {"text": text})
+                )
+
+            question_id, answer, confidence, existed = db.get_or_create_answer(
+                image_id, question, generate_answer_fn
+            )
+            answer_cache.put(image_hash, question, answer, confidence)
+            emit("answer", {
+                "answer": answer,
+                "confidence": confidence,
+                "from_cache": existed
+            })
+        except Exception as e:
+            print(f"[ERROR] Streaming VQA failed: {e}")
+            emit("error", {"detail": str(e)})
+        finally:
+            emit(None, None)
+
+    try:
+        vqa_executor.submit(run)
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+
+    return streaming_response()
+
+
+@app.get("/vqa/stats/")
+async def vqa_stats():
+    """
+    Get VQA batching and cache statistics.
+    """
+    stats = vqa_model.get_stats()
+    stats["answer_cache"] = answer_cache.stats()
+    stats["answer_flights"] = db.answer_flight_stats()
+    return stats
+
+
+@app.get("/text-to-image/stats/")
+async def text_to_image_stats():
+    """
+    Get text-to-image cache statistics.
+    """
+    return text_to_image.get_stats()
+
+
+@app.get("/inference/stats/")
+async def inference_stats():
+    """
+    Get queue depth, wait times and rejections for the inference pools.
+    """
+    return {
+        "vqa": vqa_executor.stats(),
+        "text_to_image": image_executor.stats(),
+        "text_to_image_jobs": {
+            **generation_worker.stats(),
+            **await db_async.get_generation_queue_counts()
+        }
+    }
+
+
+@app.get("/models/stats/")
+async def model_stats():
+    """
+    Get load state, load time and memory use for each registered model.
+    """
+    return registry.stats()
+
+
+@app.get("/db/stats/")
+async def db_stats():
+    """
+    Get connection pool usage, buffered counter flushes and search index size.
+    """
+    return {
+        "pool": db.pool.stats(),
+        "counters": db.counter_buffer.stats(),
+        "search_index": db.search_index.stats()
+    }
+
+
 @app.get("/images/")
-async def get_images():
+async def get_images(
+    cursor: Optional[int] = Query(None, description="ImageID from the previous page's X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=200, description="Number of images to return"),
+    full: bool = Query(False, description="Return full-resolution images instead of thumbnails"),
+    thumbnail_size: int = Query(THUMBNAIL_DEFAULT_SIZE, description="Thumbnail longest edge in pixels"),
+    include_data: bool = Query(True, description="Inline base64 image_data; false returns only file URLs")
+):
     """
-    Fetch all VQA images with their question statistics.
+    Fetch one page of VQA images with their question statistics, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
     try:
-        cursor.execute("""
-            SELECT i.ImageID, i.FileName, i.FilePath
-            FROM Images i
-        """)
-        rows = cursor.fetchall()
+        rows, next_cursor = await db_async.get_images_page(after_id=cursor, limit=limit)
 
         images = []
-        for image_id, filename, filepath in rows:
-            # Read image bytes from disk
-            if os.path.exists(filepath):
-                with open(filepath, "rb") as f:
-                    img_bytes = f.read()
-                encoded_image = base64.b64encode(img_bytes).decode("utf-8")
-            else:
+        for row in rows:
+            filepath = row["file_path"]
+            image_data = await encode_gallery_image(filepath, full, thumbnail_size, "image/jpeg", include_data)
+            if include_data and image_data is None:
                 print(f"[WARNING] File not found: {filepath}")
-                encoded_image = None
-
-            # Count questions for this image
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM Questions 
-                WHERE ImageID = ?
-            """, image_id)
-            questions_count = cursor.fetchone()[0]
 
             images.append({
-                "image_id": image_id,
-                "filename": filename,
-                "questions_count": questions_count,
-                "image_data": f"data:image/jpeg;base64,{encoded_image}" if encoded_image else None
+                "image_id": row["image_id"],
+                "filename": row["file_name"],
+                "questions_count": row["questions_count"],
+                "image_data": image_data,
+                **file_urls("uploads", row["image_id"], THUMBNAIL_SIZES)
             })
 
-        return JSONResponse(content=images)
+        headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+        return JSONResponse(content=images, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] DB error: {e}")
         return JSONResponse(content=[], status_code=500)
@@ -143,13 +386,7 @@ async def get_image_questions(image_id: int):
     Fetch questions & answers for a single image.
     """
     try:
-        cursor.execute("""
-            SELECT q.QuestionID, q.QuestionText, a.AnswerText
-            FROM Questions q
-            LEFT JOIN Answers a ON q.QuestionID = a.QuestionID
-            WHERE q.ImageID = ?
-        """, image_id)
-        rows = cursor.fetchall()
+        rows = await db_async.get_image_questions(image_id)
         result = [
             {"question_id": qid, "question": qt, "answer": ans or ""}
             for qid, qt, ans in rows
@@ -165,28 +402,32 @@ async def get_image_questions(image_id: int):
 # =============================================================================
 
 @app.post("/text-to-image/", response_model=TextToImageResponse)
-async def text_to_image_endpoint(request: TextToImageRequest):
+async def text_to_image_endpoint(request: TextToImageRequest, response: Response):
     """
     Generate an image from a text prompt using Stable Diffusion.
     Saves the image to disk and stores metadata in the database.
     """
     try:
         print(f"[INFO] Received text-to-image request: {request.prompt[:50]}...")
-        
-        # Generate image (will automatically save to DB)
-        image, seed, file_path, db_id = generate_image(
-            prompt=request.prompt,
-            negative_prompt=request.negative_prompt,
-            num_inference_steps=request.num_inference_steps,
-            guidance_scale=request.guidance_scale,
-            width=request.width,
-            height=request.height,
-            seed=request.seed,
-            save_to_db=True  # Always save to database
-        )
-        
-        # Convert to base64 for response
-        image_data = image_to_base64(image)
+
+        def run_generation():
+            # Generate image (will automatically save to DB)
+            image, seed, file_path, db_id = generate_image(
+                prompt=request.prompt,
+                negative_prompt=request.negative_prompt,
+                num_inference_steps=request.num_inference_steps,
+                guidance_scale=request.guidance_scale,
+                width=request.width,
+                height=request.height,
+                seed=request.seed,
+                save_to_db=True  # Always save to database
+            )
+
+            # Convert to base64 for response
+            return image_to_base64(image), seed, file_path, db_id
+
+        (image_data, seed, file_path, db_id), wait = await image_executor.run(run_generation)
+        response.headers["X-Queue-Wait-Ms"] = f"{wait * 1000:.1f}"
         
         print(f"[SUCCESS] Image generated with DB ID: {db_id}")
         
@@ -198,6 +439,8 @@ async def text_to_image_endpoint(request: TextToImageRequest):
             db_id=db_id  # Include database ID in response
         )
         
+    except QueueFullError as e:
+        raise queue_full_exception(e)
     except Exception as e:
         print(f"[ERROR] Text-to-image generation failed: {e}")
         import traceback
@@ -205,17 +448,197 @@ async def text_to_image_endpoint(request: TextToImageRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Cancel events of running /text-to-image/stream requests, by run ID
+_preview_runs = {}
+_preview_runs_lock = threading.Lock()
+
+
+@app.post("/text-to-image/stream")
+async def text_to_image_stream(
+    request: TextToImageRequest,
+    preview_every: int = Query(TEXT_TO_IMAGE_PREVIEW_EVERY, ge=1, description="Denoising steps between previews")
+):
+    """
+    Streaming text-to-image endpoint.
+    Sends Server-Sent Events while the image is generated:
+      - a "started" event carries the run_id (also in the X-Run-Id header)
+      - "preview" events carry a low-resolution approximation of the image
+        every preview_every steps
+      - a final "image" event carries the same fields as /text-to-image/
+      - "cancelled" or "error" is sent instead if the run stops early
+    Closing the connection, or DELETE /text-to-image/stream/{run_id},
+    cancels the run and frees the worker after the current step.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    run_id = uuid.uuid4().hex
+    cancel_event = threading.Event()
+
+    def emit(event, data):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    def on_preview(step, total_steps, preview):
+        emit("preview", {"step": step, "total_steps": total_steps, "image_data": image_to_base64(preview)})
+
+    def run():
+        try:
+            if cancel_event.is_set():
+                raise GenerationCancelled("Generation cancelled")
+            image, seed, file_path, db_id = generate_image(
+                prompt=request.prompt,
+                negative_prompt=request.negative_prompt,
+                num_inference_steps=request.num_inference_steps,
+                guidance_scale=request.guidance_scale,
+                width=request.width,
+                height=request.height,
+                seed=request.seed,
+                save_to_db=True,
+                on_preview=on_preview,
+                preview_every=preview_every,
+                cancel_event=cancel_event
+            )
+            emit("image", {
+                "image_data": image_to_base64(image),
+                "seed": seed,
+                "prompt": request.prompt,
+                "file_path": file_path,
+                "db_id": db_id
+            })
+        except GenerationCancelled:
+            emit("cancelled", {"run_id": run_id})
+        except Exception as e:
+            print(f"[ERROR] Streaming text-to-image failed: {e}")
+            emit("error", {"detail": str(e)})
+        finally:
+            emit(None, None)
+
+    async def event_stream():
+        try:
+            yield f"event: started\ndata: {json.dumps({'run_id': run_id})}\n\n"
+            while True:
+                event, data = await events.get()
+                if event is None:
+                    break
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # Runs when the client disconnects too
+            cancel_event.set()
+            with _preview_runs_lock:
+                _preview_runs.pop(run_id, None)
+
+    with _preview_runs_lock:
+        _preview_runs[run_id] = cancel_event
+    try:
+        image_executor.submit(run)
+    except QueueFullError as e:
+        with _preview_runs_lock:
+            _preview_runs.pop(run_id, None)
+        raise queue_full_exception(e)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Run-Id": run_id}
+    )
+
+
+@app.delete("/text-to-image/stream/{run_id}")
+async def cancel_text_to_image_stream(run_id: str):
+    """
+    Cancel a running /text-to-image/stream generation.
+    """
+    with _preview_runs_lock:
+        cancel_event = _preview_runs.get(run_id)
+    if cancel_event is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    cancel_event.set()
+    return {"message": "Cancellation requested", "run_id": run_id}
+
+
+@app.post("/text-to-image/jobs/", response_model=TextToImageJobResponse, status_code=202)
+async def submit_text_to_image_job(request: TextToImageRequest):
+    """
+    Queue a text-to-image generation and return its job ID right away.
+    Poll /text-to-image/jobs/{job_id} for the result. Seeded requests
+    identical to an earlier job get that job back.
+    """
+    try:
+        job_id, seed, status = await db_async.run(
+            submit_generation_job,
+            prompt=request.prompt,
+            negative_prompt=request.negative_prompt,
+            num_inference_steps=request.num_inference_steps,
+            guidance_scale=request.guidance_scale,
+            width=request.width,
+            height=request.height,
+            seed=request.seed
+        )
+    except Exception as e:
+        print(f"[ERROR] Could not queue text-to-image job: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if status == "queued":
+        generation_worker.notify()
+    return TextToImageJobResponse(
+        job_id=job_id,
+        status=status,
+        seed=seed,
+        status_url=f"/text-to-image/jobs/{job_id}"
+    )
+
+
+@app.get("/text-to-image/jobs/{job_id}")
+async def get_text_to_image_job(
+    job_id: int,
+    include_data: bool = Query(False, description="Inline the finished image as base64 image_data")
+):
+    """
+    Get the status of a queued text-to-image job, and its image once completed.
+    """
+    job = await db_async.get_generation_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    result = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "queue_position": job["queue_position"],
+        "error_message": job["error_message"],
+        "prompt": job["prompt"],
+        "negative_prompt": job["negative_prompt"],
+        "seed": job["seed"],
+        "num_inference_steps": job["num_inference_steps"],
+        "guidance_scale": job["guidance_scale"],
+        "width": job["width"],
+        "height": job["height"],
+        "submitted_at": job["submitted_at"].isoformat() if job["submitted_at"] else None,
+        "started_at": job["started_at"].isoformat() if job["started_at"] else None,
+        "generation_duration": job["generation_duration"],
+    }
+    if job["status"] == "completed":
+        result.update(
+            db_id=job["job_id"],
+            file_path=job["file_path"],
+            image_data=await encode_gallery_image(job["file_path"], True, THUMBNAIL_DEFAULT_SIZE, "image/png", include_data),
+            **file_urls("generated", job_id, THUMBNAIL_SIZES)
+        )
+    return result
+
+
 @app.get("/generated-images/")
 async def get_generated_images(
-    limit: int = Query(50, ge=1, le=100, description="Number of images to return")
+    limit: int = Query(50, ge=1, le=100, description="Number of images to return"),
+    full: bool = Query(False, description="Return full-resolution images instead of thumbnails"),
+    thumbnail_size: int = Query(THUMBNAIL_DEFAULT_SIZE, description="Thumbnail longest edge in pixels"),
+    include_data: bool = Query(True, description="Inline base64 image_data; false returns only file URLs")
 ):
     """
     Fetch recent generated images from the database.
-    Images are loaded from disk based on file paths stored in DB.
+    Thumbnails are returned unless full=true.
     """
     try:
         # Get recent images from database
-        images_data = get_recent_generated_images(limit=limit)
+        images_data = await get_recent_generated_images(limit=limit)
         
         result = []
         for img_data in images_data:
@@ -224,14 +647,13 @@ async def get_generated_images(
             # Read image from disk
             if os.path.exists(file_path):
                 try:
-                    with open(file_path, "rb") as f:
-                        img_bytes = f.read()
-                    encoded_image = base64.b64encode(img_bytes).decode("utf-8")
+                    image_data = await encode_gallery_image(file_path, full, thumbnail_size, "image/png", include_data)
                     
                     result.append({
                         "generated_image_id": img_data['generated_image_id'],
                         "filename": img_data['file_name'],
-                        "image_data": f"data:image/png;base64,{encoded_image}",
+                        **file_urls("generated", img_data['generated_image_id'], THUMBNAIL_SIZES),
+                        "image_data": image_data,
                         "prompt": img_data['prompt'],
                         "negative_prompt": img_data.get('negative_prompt', ''),
                         "seed": img_data['seed'],
@@ -241,6 +663,8 @@ async def get_generated_images(
                         "view_count": img_data['view_count'],
                         "download_count": img_data['download_count']
                     })
+                except HTTPException:
+                    raise
                 except Exception as e:
                     print(f"[WARNING] Could not load image {file_path}: {e}")
             else:
@@ -248,6 +672,8 @@ async def get_generated_images(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Failed to fetch generated images: {e}")
         return JSONResponse(content=[], status_code=500)
@@ -260,32 +686,26 @@ async def get_generated_image_details(image_id: int):
     """
     try:
         # Get image data from database
-        img_data = get_generated_image_by_id(image_id)
+        img_data = await get_generated_image_by_id(image_id)
         
         if not img_data:
             raise HTTPException(status_code=404, detail="Image not found")
         
         # Increment view count
-        increment_view_count(image_id)
+        await increment_view_count(image_id)
         
         # Load image from disk
-        file_path = img_data['file_path']
-        image_data = None
-        
-        if os.path.exists(file_path):
-            with open(file_path, "rb") as f:
-                img_bytes = f.read()
-            encoded_image = base64.b64encode(img_bytes).decode("utf-8")
-            image_data = f"data:image/png;base64,{encoded_image}"
+        image_data = await encode_gallery_image(img_data['file_path'], True, THUMBNAIL_DEFAULT_SIZE, "image/png")
         
         # Get tags for this image
-        tags = get_tags_for_image(image_id)
+        tags = await get_tags_for_image(image_id)
         
         return {
             "generated_image_id": img_data['generated_image_id'],
             "prompt": img_data['prompt'],
             "negative_prompt": img_data['negative_prompt'],
             "image_data": image_data,
+            **file_urls("generated", image_id, THUMBNAIL_SIZES),
             "seed": img_data['seed'],
             "num_inference_steps": img_data['num_inference_steps'],
             "guidance_scale": img_data['guidance_scale'],
@@ -313,7 +733,7 @@ async def record_image_download(image_id: int):
     Record that an image was downloaded.
     """
     try:
-        success = record_download(image_id)
+        success = await db_async.run(record_download, image_id)
         
         if not success:
             raise HTTPException(status_code=404, detail="Image not found")
@@ -329,60 +749,68 @@ async def record_image_download(image_id: int):
 
 @app.get("/generated-images/search/")
 async def search_images(
-    q: str = Query(..., min_length=1, description="Search term for prompts")
+    q: str = Query(..., min_length=1, description="Search term for prompts"),
+    limit: int = Query(50, ge=1, le=100, description="Number of images to return"),
+    offset: int = Query(0, ge=0, description="Number of ranked results to skip"),
+    full: bool = Query(False, description="Return full-resolution images instead of thumbnails"),
+    thumbnail_size: int = Query(THUMBNAIL_DEFAULT_SIZE, description="Thumbnail longest edge in pixels"),
+    include_data: bool = Query(True, description="Inline base64 image_data; false returns only file URLs")
 ):
     """
-    Search generated images by prompt text.
+    Search generated images by prompt text, best matches first.
+    The total number of matches is returned in the X-Total-Count header.
     """
     try:
-        images_data = search_generated_images(q)
+        images_data, total = await search_generated_images(q, limit=limit, offset=offset)
         
         result = []
         for img_data in images_data:
             file_path = img_data['file_path']
             
             if os.path.exists(file_path):
-                with open(file_path, "rb") as f:
-                    img_bytes = f.read()
-                encoded_image = base64.b64encode(img_bytes).decode("utf-8")
-                
                 result.append({
                     "generated_image_id": img_data['generated_image_id'],
                     "filename": img_data['file_name'],
-                    "image_data": f"data:image/png;base64,{encoded_image}",
+                    **file_urls("generated", img_data['generated_image_id'], THUMBNAIL_SIZES),
+                    "image_data": await encode_gallery_image(file_path, full, thumbnail_size, "image/png", include_data),
                     "prompt": img_data['prompt'],
                     "seed": img_data['seed'],
+                    "score": round(img_data['score'], 4),
                     "created_at": img_data['generation_time'].isoformat() if img_data['generation_time'] else None
                 })
         
-        return result
+        return JSONResponse(content=result, headers={"X-Total-Count": str(total)})
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Search failed: {e}")
         return JSONResponse(content=[], status_code=500)
 
 
 @app.get("/generated-images/seed/{seed}")
-async def get_images_by_seed_endpoint(seed: int):
+async def get_images_by_seed_endpoint(
+    seed: int,
+    full: bool = Query(False, description="Return full-resolution images instead of thumbnails"),
+    thumbnail_size: int = Query(THUMBNAIL_DEFAULT_SIZE, description="Thumbnail longest edge in pixels"),
+    include_data: bool = Query(True, description="Inline base64 image_data; false returns only file URLs")
+):
     """
     Get all images generated with a specific seed.
     """
     try:
-        images_data = get_images_by_seed(seed)
+        images_data = await get_images_by_seed(seed)
         
         result = []
         for img_data in images_data:
             file_path = img_data['file_path']
             
             if os.path.exists(file_path):
-                with open(file_path, "rb") as f:
-                    img_bytes = f.read()
-                encoded_image = base64.b64encode(img_bytes).decode("utf-8")
-                
                 result.append({
                     "generated_image_id": img_data['generated_image_id'],
                     "filename": img_data['file_name'],
-                    "image_data": f"data:image/png;base64,{encoded_image}",
+                    **file_urls("generated", img_data['generated_image_id'], THUMBNAIL_SIZES),
+                    "image_data": await encode_gallery_image(file_path, full, thumbnail_size, "image/png", include_data),
                     "prompt": img_data['prompt'],
                     "seed": img_data['seed'],
                     "width": img_data['image_width'],
@@ -392,6 +820,8 @@ async def get_images_by_seed_endpoint(seed: int):
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Failed to get images by seed: {e}")
         return JSONResponse(content=[], status_code=500)
@@ -406,7 +836,7 @@ async def delete_image(
     Delete a generated image from the database and optionally from disk.
     """
     try:
-        success = delete_generated_image(image_id, delete_file=delete_file)
+        success = await delete_generated_image(image_id, delete_file=delete_file)
         
         if not success:
             raise HTTPException(status_code=404, detail="Image not found or could not be deleted")
@@ -426,7 +856,7 @@ async def get_statistics():
     Get overall statistics about image generation.
     """
     try:
-        stats = get_generation_statistics()
+        stats = await get_generation_statistics()
         
         # Convert bytes to MB for readability
         if 'total_storage_bytes' in stats:
@@ -445,7 +875,7 @@ async def add_tag_to_image(image_id: int, tag: str = Query(..., min_length=1)):
     Add a tag to a generated image.
     """
     try:
-        success = add_prompt_tag(image_id, tag)
+        success = await add_prompt_tag(image_id, tag)
         
         if not success:
             raise HTTPException(status_code=400, detail="Could not add tag")
@@ -465,7 +895,7 @@ async def get_image_tags(image_id: int):
     Get all tags for a specific image.
     """
     try:
-        tags = get_tags_for_image(image_id)
+        tags = await get_tags_for_image(image_id)
         return {"image_id": image_id, "tags": tags}
         
     except Exception as e:
@@ -473,6 +903,69 @@ async def get_image_tags(image_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# =============================================================================
+# FILE ENDPOINTS
+# =============================================================================
+
+# Plain def: FastAPI runs it on its thread pool, so hashing and disk reads
+# do not block the event loop.
+@app.api_route("/files/{kind}/{file_id}", methods=["GET", "HEAD"])
+def serve_file(
+    kind: str,
+    file_id: int,
+    request: Request,
+    size: Optional[int] = Query(None, description="Serve the thumbnail with this longest edge instead")
+):
+    """
+    Stream an uploaded ("uploads") or generated ("generated") image as raw bytes.
+    Supports strong ETags, conditional GET (304) and single byte ranges.
+    """
+    if kind not in db.FILE_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown file kind '{kind}'")
+
+    file_path = db.get_file_path(kind, file_id)
+    if size is not None and file_path:
+        if size not in THUMBNAIL_SIZES:
+            raise HTTPException(status_code=400, detail=f"size must be one of {THUMBNAIL_SIZES}")
+        file_path = ensure_thumbnail(file_path, size)
+    if not file_path or not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = file_etag(file_path)
+    headers = cache_headers(file_path, etag)
+    media_type = headers.pop("Content-Type")
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    file_size = os.path.getsize(file_path)
+    range_header = request.headers.get("range")
+    # A range is only valid against the representation the client already has
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, file_size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+
+    start, end = byte_range or (0, file_size - 1)
+    status_code = 206 if byte_range else 200
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        iter_file(file_path, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type
+    )
+
+
 # =============================================================================
 # HEALTH CHECK
 # =============================================================================
@@ -487,9 +980,13 @@ async def root():
         "message": "VisionFusion AI API",
         "endpoints": {
             "vqa": "/vqa/",
+            "vqa_stream": "/vqa/stream",
             "images": "/images/",
             "text_to_image": "/text-to-image/",
+            "text_to_image_stream": "/text-to-image/stream",
+            "text_to_image_jobs": "/text-to-image/jobs/",
             "generated_images": "/generated-images/",
+            "files": "/files/{kind}/{id}",
             "statistics": "/generation-statistics/"
         }
     }
\ No newline at end of file
@@ -0,0 +1,235 @@
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import torch
+
+# Unload a model after this many idle seconds (0 keeps models loaded)
+MODEL_IDLE_TIMEOUT = float(os.getenv("MODEL_IDLE_TIMEOUT", "0"))
+
+# Comma-separated model names to load at startup, e.g. "vqa,text_to_image"
+PRELOAD_MODELS = [name.strip() for name in os.getenv("PRELOAD_MODELS", "").split(",") if name.strip()]
+
+
+def current_rss() -> Optional[int]:
+    """
+    Resident set size of this process in bytes, or None if unavailable.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def model_nbytes(obj: Any) -> int:
+    """
+    Bytes held by the parameters and buffers of every torch module reachable
+    from obj (a module, a diffusers pipeline, or a tuple/namespace of them).
+    """
+    seen = set()
+
+    def visit(value) -> int:
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+
+        if isinstance(value, torch.nn.Module):
+            tensors = list(value.parameters()) + list(value.buffers())
+            return sum(t.element_size() * t.nelement() for t in tensors)
+        if isinstance(value, (list, tuple)):
+            return sum(visit(item) for item in value)
+        if isinstance(value, dict):
+            return sum(visit(item) for item in value.values())
+        if hasattr(value, "components"):  # diffusers pipelines
+            return visit(dict(value.components))
+        if isinstance(value, SimpleNamespace):
+            return sum(visit(item) for item in vars(value).values())
+        return 0
+
+    return visit(obj)
+
+
+class _ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any], on_unload: Optional[Callable[[], None]],
+                 exclusive: bool):
+        self.name = name
+        self.loader = loader
+        self.on_unload = on_unload
+        self.lock = threading.Lock()
+        # Held for the whole `use` block of models that cannot run concurrently
+        self.run_lock = threading.Lock() if exclusive else None
+
+        self.model = None
+        self.in_use = 0
+        self.last_used = 0.0
+        self.load_count = 0
+        self.load_seconds = None
+        self.memory_bytes = None
+        self.rss_delta_bytes = None
+
+
+class ModelRegistry:
+    """
+    Loads models on first use and unloads them after an idle period.
+
+    Models are registered with a loader function. `use(name)` loads the
+    model if needed and holds it for the duration of the `with` block, so
+    the idle reaper never unloads a model that is in the middle of a call.
+    Models registered as exclusive are also used by one block at a time.
+    """
+
+    def __init__(self, idle_timeout: float = 0):
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._reaper = None
+        self._reaper_lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any], on_unload: Optional[Callable[[], None]] = None,
+                 exclusive: bool = False):
+        """
+        Register a model loader. Nothing is loaded until first use.
+
+        Args:
+            name: Name used with use(), preload() and unload()
+            loader: Function that loads and returns the model
+            on_unload: Optional function called after the model is unloaded,
+                       e.g. to drop caches derived from it
+            exclusive: Serialize use() blocks, for models that keep per-call
+                       state (e.g. a diffusers scheduler)
+        """
+        if name in self._entries:
+            raise ValueError(f"Model '{name}' is already registered")
+        self._entries[name] = _ModelEntry(name, loader, on_unload, exclusive)
+
+    @contextmanager
+    def use(self, name: str):
+        """
+        Load the model if needed and keep it loaded while the block runs.
+        """
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.model is None:
+                self._load(entry)
+            entry.in_use += 1
+            model = entry.model
+
+        self._ensure_reaper()
+        try:
+            if entry.run_lock is None:
+                yield model
+            else:
+                with entry.run_lock:
+                    yield model
+        finally:
+            with entry.lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def preload(self, names: Iterable[str]):
+        for name in names:
+            entry = self._entry(name)
+            with entry.lock:
+                if entry.model is None:
+                    self._load(entry)
+                entry.last_used = time.monotonic()
+        self._ensure_reaper()
+
+    def unload(self, name: str, min_idle: float = 0) -> bool:
+        """
+        Unload a model unless it is in use.
+
+        Args:
+            name: Registered model name
+            min_idle: Only unload if the model has been idle this many seconds
+
+        Returns:
+            bool: True if the model was unloaded
+        """
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.model is None or entry.in_use:
+                return False
+            if time.monotonic() - entry.last_used < min_idle:
+                return False
+            entry.model = None
+
+        if entry.on_unload is not None:
+            entry.on_unload()
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        print(f"[INFO] Unloaded model '{name}'")
+        return True
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entry(name).model is not None
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        stats = {}
+        for name, entry in self._entries.items():
+            with entry.lock:
+                loaded = entry.model is not None
+                stats[name] = {
+                    "loaded": loaded,
+                    "in_use": entry.in_use,
+                    "load_count": entry.load_count,
+                    "load_seconds": entry.load_seconds,
+                    "memory_bytes": entry.memory_bytes if loaded else 0,
+                    "rss_delta_bytes": entry.rss_delta_bytes if loaded else 0,
+                    "idle_seconds": round(now - entry.last_used, 1) if loaded else None,
+                }
+        return {"idle_timeout": self.idle_timeout, "models": stats}
+
+    def _entry(self, name: str) -> _ModelEntry:
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise KeyError(f"Unknown model '{name}'") from None
+
+    def _load(self, entry: _ModelEntry):
+        # Caller holds entry.lock
+        print(f"[INFO] Loading model '{entry.name}'...")
+        rss_before = current_rss()
+        start_time = time.time()
+
+        entry.model = entry.loader()
+
+        entry.load_seconds = round(time.time() - start_time, 2)
+        entry.memory_bytes = model_nbytes(entry.model)
+        rss_after = current_rss()
+        entry.rss_delta_bytes = (
+            rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        )
+        entry.load_count += 1
+        entry.last_used = time.monotonic()
+        print(f"[SUCCESS] Loaded model '{entry.name}' in {entry.load_seconds}s")
+
+    def _ensure_reaper(self):
+        if self.idle_timeout <= 0:
+            return
+        with self._reaper_lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_forever, name="model-reaper", daemon=True)
+                self._reaper.start()
+
+    def _reap_forever(self):
+        interval = max(1.0, min(self.idle_timeout / 4, 30.0))
+        while True:
+            time.sleep(interval)
+            for name in list(self._entries):
+                self.unload(name, min_idle=self.idle_timeout)
+
+
+registry = ModelRegistry(idle_timeout=MODEL_IDLE_TIMEOUT)
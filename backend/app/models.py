@@ -22,4 +22,10 @@ class TextToImageResponse(BaseModel):
     seed: int
     prompt: str
     file_path: str
-    db_id: Optional[int] = None  # Add this field
\ No newline at end of file
+    db_id: Optional[int] = None  # Add this field
+
+class TextToImageJobResponse(BaseModel):
+    job_id: int
+    status: str
+    seed: int
+    status_url: str
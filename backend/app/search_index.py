@@ -0,0 +1,271 @@
+import bisect
+import heapq
+import itertools
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# BM25 parameters
+SEARCH_K1 = float(os.getenv("SEARCH_K1", "1.2"))
+SEARCH_B = float(os.getenv("SEARCH_B", "0.75"))
+# Negative prompts are searched too, as before, but count for less than the prompt
+NEGATIVE_PROMPT_WEIGHT = float(os.getenv("SEARCH_NEGATIVE_PROMPT_WEIGHT", "0.25"))
+# The last query term also matches words it is a prefix of (search-as-you-type),
+# expanded to at most this many vocabulary terms
+SEARCH_PREFIX_EXPANSION = int(os.getenv("SEARCH_PREFIX_EXPANSION", "50"))
+# Query terms found in more than this fraction of images are skipped when the
+# query has more selective terms: they add little to the ranking and their
+# postings are most of the scoring work
+SEARCH_MAX_DF_RATIO = float(os.getenv("SEARCH_MAX_DF_RATIO", "0.2"))
+# Below this many images every term is scored
+SEARCH_PRUNE_MIN_DOCS = int(os.getenv("SEARCH_PRUNE_MIN_DOCS", "1000"))
+# A query with only stopwords and common terms scores this many of the
+# newest images containing its rarest term
+SEARCH_COMMON_TERM_POSTINGS = int(os.getenv("SEARCH_COMMON_TERM_POSTINGS", "10000"))
+
+# Skipped in queries that contain other terms
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or the to with".split()
+)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class _FieldIndex:
+    """
+    Postings (term -> {doc_id: (term frequency, document length)}) and
+    lengths for one text field. The length is kept in the posting so a
+    copy of a term's postings is all that is needed to score it.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def add(self, doc_id: int, tokens: List[str]):
+        length = len(tokens)
+        for token, tf in Counter(tokens).items():
+            self.postings.setdefault(token, {})[doc_id] = (tf, length)
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id: int, tokens: List[str]):
+        for token in set(tokens):
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[token]
+        self.total_length -= self.doc_lengths.pop(doc_id, 0)
+
+    def snapshot(
+        self, terms: Iterable[str], newest: Optional[int] = None
+    ) -> Tuple[float, List[Dict[int, Tuple[int, int]]]]:
+        """
+        Average document length and copies of the postings of `terms`, for
+        scoring without holding the index lock. With `newest`, only that
+        many of the most recently added postings of each term are copied.
+        """
+        avg_length = self.total_length / len(self.doc_lengths) if self.doc_lengths else 1.0
+        term_postings = []
+        for term in terms:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            if newest is not None and len(docs) > newest:
+                docs = itertools.islice(reversed(docs.items()), newest)
+            term_postings.append(dict(docs))
+        return avg_length, term_postings
+
+
+def _score(snapshot, num_docs: int, scores: Dict[int, float], weight: float):
+    avg_length, term_postings = snapshot
+    for docs in term_postings:
+        idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+        for doc_id, (tf, length) in docs.items():
+            norm = SEARCH_K1 * (1 - SEARCH_B + SEARCH_B * length / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * idf * tf * (SEARCH_K1 + 1) / (tf + norm)
+
+
+class PromptIndex:
+    """
+    In-memory inverted index over generated-image prompts with BM25 ranking.
+
+    Only the candidate documents containing a query term are scored, so a
+    query costs time proportional to the postings it touches rather than
+    to the number of rows. Stopwords and terms common to a large share of
+    the images are left out of queries that have more selective terms, and
+    scoring runs on a copy of the postings outside the lock. db.py keeps
+    the index in step with inserts and deletes and loads it at startup.
+    """
+
+    def __init__(self):
+        self.prompt = _FieldIndex()
+        self.negative = _FieldIndex()
+        self._docs: Dict[int, Tuple[List[str], List[str]]] = {}
+        # Sorted terms of both fields, for prefix expansion
+        self._vocabulary: List[str] = []
+        self._lock = threading.RLock()
+        # Changes made while load() builds the index from the table
+        self._changes_during_load: Optional[List[Tuple]] = None
+        self.loaded = False
+
+    def add(self, doc_id: int, prompt: Optional[str], negative_prompt: Optional[str] = None):
+        prompt_tokens = tokenize(prompt)
+        negative_tokens = tokenize(negative_prompt)
+        with self._lock:
+            self._add(doc_id, prompt_tokens, negative_tokens)
+            if self._changes_during_load is not None:
+                self._changes_during_load.append((doc_id, prompt_tokens, negative_tokens))
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            self._remove(doc_id)
+            if self._changes_during_load is not None:
+                self._changes_during_load.append((doc_id, None, None))
+
+    def load(self, rows: Iterable[Tuple[int, Optional[str], Optional[str]]]):
+        """
+        Replace the index contents with (doc_id, prompt, negative_prompt) rows.
+
+        The new index is built without holding the lock, so searches and
+        inserts carry on against the old one meanwhile. Adds and removes
+        made during the build are replayed on the new index before it is
+        swapped in.
+        """
+        with self._lock:
+            self._changes_during_load = []
+
+        prompt, negative = _FieldIndex(), _FieldIndex()
+        docs = {}
+        try:
+            for doc_id, prompt_text, negative_text in rows:
+                tokens = (tokenize(prompt_text), tokenize(negative_text))
+                docs[doc_id] = tokens
+                prompt.add(doc_id, tokens[0])
+                negative.add(doc_id, tokens[1])
+        except BaseException:
+            with self._lock:
+                self._changes_during_load = None
+            raise
+
+        with self._lock:
+            self.prompt, self.negative, self._docs = prompt, negative, docs
+            self._vocabulary = sorted(set(prompt.postings) | set(negative.postings))
+            for doc_id, prompt_tokens, negative_tokens in self._changes_during_load:
+                if prompt_tokens is None:
+                    self._remove(doc_id)
+                else:
+                    self._add(doc_id, prompt_tokens, negative_tokens)
+            self._changes_during_load = None
+            self.loaded = True
+
+    def search(self, query: str, limit: int = 50, offset: int = 0) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Rank documents matching any query term.
+
+        A query made only of stopwords and common terms is answered from
+        the newest images containing its rarest term; its total is that
+        term's document count.
+
+        Returns:
+            tuple: ([(doc_id, score)] for the requested page, total number of matches)
+        """
+        terms = tokenize(query)
+        if not terms:
+            return [], 0
+
+        with self._lock:
+            # Treat the last term as a prefix unless the query ends in a separator
+            if query[-1:].isalnum() or query[-1:] == "_":
+                terms = terms[:-1] + self._expand_prefix(terms[-1])
+
+            terms, newest = self._selective_terms(terms)
+            num_docs = len(self._docs)
+            prompt_snapshot = self.prompt.snapshot(terms, newest)
+            negative_snapshot = self.negative.snapshot(terms, newest)
+            total = self._document_frequency(terms[0]) if newest is not None else None
+
+        scores: Dict[int, float] = {}
+        _score(prompt_snapshot, num_docs, scores, 1.0)
+        _score(negative_snapshot, num_docs, scores, NEGATIVE_PROMPT_WEIGHT)
+
+        # Ties go to the newest image
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return top[offset:], total if total is not None else len(scores)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "terms": len(self._vocabulary),
+                "loaded": self.loaded,
+            }
+
+    def _add(self, doc_id: int, prompt_tokens: List[str], negative_tokens: List[str]):
+        # Caller holds the lock
+        if doc_id in self._docs:
+            self._remove(doc_id)
+        for token in set(prompt_tokens) | set(negative_tokens):
+            if token not in self.prompt.postings and token not in self.negative.postings:
+                bisect.insort(self._vocabulary, token)
+        self._docs[doc_id] = (prompt_tokens, negative_tokens)
+        self.prompt.add(doc_id, prompt_tokens)
+        self.negative.add(doc_id, negative_tokens)
+
+    def _remove(self, doc_id: int):
+        # Caller holds the lock
+        tokens = self._docs.pop(doc_id, None)
+        if tokens is None:
+            return
+        self.prompt.remove(doc_id, tokens[0])
+        self.negative.remove(doc_id, tokens[1])
+        for token in set(tokens[0]) | set(tokens[1]):
+            if token not in self.prompt.postings and token not in self.negative.postings:
+                i = bisect.bisect_left(self._vocabulary, token)
+                if i < len(self._vocabulary) and self._vocabulary[i] == token:
+                    del self._vocabulary[i]
+
+    def _document_frequency(self, term: str) -> int:
+        # Caller holds the lock
+        return max(len(self.prompt.postings.get(term, ())), len(self.negative.postings.get(term, ())))
+
+    def _selective_terms(self, terms: List[str]) -> Tuple[List[str], Optional[int]]:
+        # Caller holds the lock. Returns the terms to score and, when every
+        # term is a stopword or too common, falls back to the rarest term
+        # with a cap on how many of its newest postings to score.
+        num_docs = len(self._docs)
+        if num_docs < SEARCH_PRUNE_MIN_DOCS:
+            return [term for term in terms if term not in STOPWORDS] or terms, None
+
+        max_df = int(SEARCH_MAX_DF_RATIO * num_docs)
+        selective = [
+            term for term in terms
+            if term not in STOPWORDS and self._document_frequency(term) <= max_df
+        ]
+        if selective:
+            return selective, None
+        rarest = min(terms, key=self._document_frequency)
+        return [rarest], SEARCH_COMMON_TERM_POSTINGS
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        # Caller holds the lock
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + SEARCH_PREFIX_EXPANSION]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms or [prefix]
+
+
+search_index = PromptIndex()
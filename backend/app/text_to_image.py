@@ -6,43 +6,270 @@ import os
 import base64
 from io import BytesIO
 from datetime import datetime
+import threading
 import time
-from typing import Tuple, Optional
+import uuid
+from typing import Callable, List, Tuple, Optional
 
 # Import database functions
-from app.db import insert_generated_image, increment_download_count
+from app.db import (
+    complete_generation_job,
+    fail_generation_job,
+    find_generated_image,
+    insert_generated_image,
+    insert_generated_images_bulk,
+    increment_download_count
+)
+from app.cache import LRUCache, tensor_nbytes
+from app.inflight import SingleFlight
+from app.model_registry import registry
+from app.thumbnails import create_thumbnails, delete_thumbnails
 
 # Configuration
 GENERATED_IMAGES_DIR = r"C:\Users\ADMIN\Downloads\multimodal_lab\VQA\generated_images"
 os.makedirs(GENERATED_IMAGES_DIR, exist_ok=True)
 
-# Initialize the Stable Diffusion pipeline
+# Stable Diffusion pipeline configuration
 device = "cuda" if torch.cuda.is_available() else "cpu"
 model_id = "runwayml/stable-diffusion-v1-5"
 
-print(f"[INFO] Loading Stable Diffusion model on {device}...")
+# Most prompts batch_generate_images() sends through the pipeline in one call.
+# Each extra image adds its latents and two UNet rows per step (prompt and
+# negative prompt), so lower this on small GPUs; 1 generates one at a time.
+TEXT_TO_IMAGE_MAX_BATCH_SIZE = int(os.getenv("TEXT_TO_IMAGE_MAX_BATCH_SIZE", "4"))
+
+# Text encoder outputs for recently used prompts and negative prompts.
+# One SD 1.5 embedding (77x768) is about 118 KB in fp16; 0 disables the cache.
+TEXT_TO_IMAGE_EMBED_CACHE_MB = int(os.getenv("TEXT_TO_IMAGE_EMBED_CACHE_MB", "64"))
+
+prompt_embed_cache = LRUCache(max_bytes=TEXT_TO_IMAGE_EMBED_CACHE_MB * 1024 * 1024, size_of=tensor_nbytes)
+
+# Default number of denoising steps between live previews on /text-to-image/stream
+TEXT_TO_IMAGE_PREVIEW_EVERY = int(os.getenv("TEXT_TO_IMAGE_PREVIEW_EVERY", "5"))
+
+# Linear map from the 4 SD 1.x latent channels to approximate RGB. Previews
+# use it instead of the VAE decoder: one small matmul per step gives a
+# 1/8-resolution image (64x64 for 512x512) that shows composition and colour.
+LATENT_RGB_FACTORS = [
+    #   R       G       B
+    [0.298, 0.207, 0.208],
+    [0.187, 0.286, 0.173],
+    [-0.158, 0.189, 0.264],
+    [-0.184, -0.271, -0.473],
+]
+
+# Identical seeded requests running at the same time share one generation
+# (or one queued job)
+_generation_flights = SingleFlight()
+_job_flights = SingleFlight()
+
+# Seeded requests answered from an existing GeneratedImages row
+_result_cache_lock = threading.Lock()
+_result_cache_counts = {"hits": 0, "misses": 0}
+
+
+def _load_pipeline() -> StableDiffusionPipeline:
+    """
+    Load the Stable Diffusion pipeline. Called by the model registry on
+    first use rather than at import time.
+    """
+    print(f"[INFO] Loading Stable Diffusion model on {device}...")
+
+    # Load pipeline with optimizations
+    pipe = StableDiffusionPipeline.from_pretrained(
+        model_id,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+        safety_checker=None,
+        requires_safety_checker=False
+    )
+
+    # Use DPM++ scheduler for better quality and faster generation
+    pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
+
+    # Move to device
+    pipe = pipe.to(device)
+
+    # Enable memory optimizations if on CUDA
+    if device == "cuda":
+        pipe.enable_attention_slicing()
+        # Uncomment if you have limited VRAM (< 8GB)
+        # pipe.enable_sequential_cpu_offload()
+
+    print("[SUCCESS] Stable Diffusion model loaded successfully!")
+    return pipe
+
+
+# The pipeline's scheduler keeps the timesteps and step index of the run in
+# progress, so the API handlers and the queue workers take turns
+registry.register("text_to_image", _load_pipeline, exclusive=True)
+
+
+def _random_seed() -> int:
+    return torch.randint(0, 2**32 - 1, (1,)).item()
+
+
+def _encode_text(pipe: StableDiffusionPipeline, text: str) -> torch.Tensor:
+    """
+    CLIP text embedding for one prompt, from the cache when possible.
+    """
+    key = (model_id, text)
+    embeds = prompt_embed_cache.get(key)
+    if embeds is None:
+        # Without classifier-free guidance encode_prompt encodes just this
+        # text, the same way it encodes a negative prompt
+        embeds, _ = pipe.encode_prompt(
+            text, device=pipe.device, num_images_per_prompt=1, do_classifier_free_guidance=False
+        )
+        prompt_embed_cache.put(key, embeds)
+    return embeds
+
+
+def _prompt_embeddings(pipe: StableDiffusionPipeline, prompts: List[str],
+                       negative_prompts: List[Optional[str]]) -> dict:
+    """
+    Precomputed prompt_embeds/negative_prompt_embeds for a pipeline call,
+    so repeated prompts (above all the default negative prompt) skip the
+    text encoder.
+    """
+    return {
+        "prompt_embeds": torch.cat([_encode_text(pipe, prompt) for prompt in prompts]),
+        # The pipeline treats a missing negative prompt as ""
+        "negative_prompt_embeds": torch.cat([_encode_text(pipe, text or "") for text in negative_prompts]),
+    }
+
+
+def _result_key(params: dict) -> tuple:
+    return (
+        model_id,
+        params["prompt"],
+        # The pipeline treats a missing negative prompt as ""
+        params["negative_prompt"] or "",
+        params["seed"],
+        params["num_inference_steps"],
+        float(params["guidance_scale"]),
+        params["width"],
+        params["height"],
+    )
+
+
+def _find_existing_result(params: dict, statuses: Tuple[str, ...] = ("completed",)) -> Optional[dict]:
+    """
+    Row already generated (or queued) with the same parameters and seed,
+    or None. A completed row only counts if its file is still on disk.
+    """
+    try:
+        existing = find_generated_image(
+            prompt=params["prompt"],
+            negative_prompt=params["negative_prompt"],
+            seed=params["seed"],
+            num_inference_steps=params["num_inference_steps"],
+            guidance_scale=params["guidance_scale"],
+            image_width=params["width"],
+            image_height=params["height"],
+            model_used=model_id,
+            statuses=statuses,
+        )
+    except Exception as e:
+        print(f"[WARNING] Could not look up previous results: {e}")
+        return None
+
+    if existing and existing["status"] == "completed" and not os.path.exists(existing["file_path"]):
+        return None
+    with _result_cache_lock:
+        _result_cache_counts["hits" if existing else "misses"] += 1
+    return existing
 
-# Load pipeline with optimizations
-pipe = StableDiffusionPipeline.from_pretrained(
-    model_id,
-    torch_dtype=torch.float16 if device == "cuda" else torch.float32,
-    safety_checker=None,
-    requires_safety_checker=False
-)
 
-# Use DPM++ scheduler for better quality and faster generation
-pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
+def _reuse_existing(params: dict) -> Optional[Tuple[Image.Image, int, str, Optional[int]]]:
+    existing = _find_existing_result(params)
+    if existing is None:
+        return None
 
-# Move to device
-pipe = pipe.to(device)
+    print(f"[INFO] Reusing generated image {existing['generated_image_id']} for identical request")
+    with Image.open(existing["file_path"]) as stored:
+        image = stored.convert("RGB")
+    return image, params["seed"], existing["file_path"], existing["generated_image_id"]
 
-# Enable memory optimizations if on CUDA
-if device == "cuda":
-    pipe.enable_attention_slicing()
-    # Uncomment if you have limited VRAM (< 8GB)
-    # pipe.enable_sequential_cpu_offload()
 
-print("[SUCCESS] Stable Diffusion model loaded successfully!")
+def _reuse_or_generate(params: dict) -> Tuple[Image.Image, int, str, Optional[int]]:
+    return _reuse_existing(params) or generate_image(**params, save_to_db=True, use_cache=False)
+
+
+class GenerationCancelled(Exception):
+    """
+    Raised inside the pipeline when the caller cancels a generation.
+    """
+
+
+def latents_to_preview(latents: torch.Tensor) -> Image.Image:
+    """
+    Approximate image for the first latent in a batch, without the VAE.
+    
+    Args:
+        latents: Latents of shape (batch, 4, height / 8, width / 8)
+    
+    Returns:
+        PIL.Image: RGB preview at 1/8 of the output resolution
+    """
+    factors = torch.tensor(LATENT_RGB_FACTORS, dtype=latents.dtype, device=latents.device)
+    rgb = torch.einsum("chw,cr->hwr", latents[0], factors)
+    rgb = ((rgb + 1) / 2).clamp(0, 1).mul(255).to(torch.uint8)
+    return Image.fromarray(rgb.cpu().numpy())
+
+
+def _step_callback(
+    num_inference_steps: int,
+    on_preview: Optional[Callable[[int, int, Image.Image], None]],
+    preview_every: int,
+    cancel_event: Optional[threading.Event],
+):
+    """
+    callback_on_step_end for the pipeline: sends a preview every
+    preview_every steps and stops the run as soon as cancel_event is set.
+    """
+    def callback(pipe, step, timestep, callback_kwargs):
+        if cancel_event is not None and cancel_event.is_set():
+            raise GenerationCancelled("Generation cancelled")
+        done = step + 1
+        # The last step is followed by the full decode, so skip its preview
+        if on_preview is not None and done % preview_every == 0 and done < num_inference_steps:
+            try:
+                on_preview(done, num_inference_steps, latents_to_preview(callback_kwargs["latents"]))
+            except Exception as e:
+                print(f"[WARNING] Could not send preview: {e}")
+        return callback_kwargs
+
+    return callback
+
+
+def _save_generated_image(image: Image.Image, prompt: str, seed: int,
+                          index: Optional[int] = None) -> Tuple[str, str, int]:
+    """
+    Save a generated image and its thumbnails.
+
+    Args:
+        index: Position in a batch, added to the filename so images saved
+               in the same second with the same prompt and seed stay apart
+
+    Returns:
+        tuple: (file_path, filename, file_size)
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_prompt = prompt[:50].replace(" ", "_").replace("/", "_").replace("\\", "_")
+    suffix = f"_{index}" if index is not None else ""
+    filename = f"generated_{timestamp}_{safe_prompt}_seed{seed}{suffix}.png"
+    file_path = os.path.join(GENERATED_IMAGES_DIR, filename)
+
+    image.save(file_path)
+    print(f"[SUCCESS] Image saved to: {file_path}")
+
+    try:
+        create_thumbnails(file_path, image)
+    except Exception as e:
+        # The gallery creates missing thumbnails on demand
+        print(f"[WARNING] Could not create thumbnails: {e}")
+
+    return file_path, filename, os.path.getsize(file_path)
 
 
 def generate_image(
@@ -54,10 +281,20 @@ def generate_image(
     height: int = 512,
     seed: int = None,
     save_to_db: bool = True,
+    use_cache: bool = True,
+    on_preview: Optional[Callable[[int, int, Image.Image], None]] = None,
+    preview_every: int = TEXT_TO_IMAGE_PREVIEW_EVERY,
+    cancel_event: Optional[threading.Event] = None,
 ) -> Tuple[Image.Image, int, str, Optional[int]]:
     """
     Generate an image from a text prompt using Stable Diffusion.
     
+    With a fixed seed the output only depends on the arguments, so when
+    saving to the database an existing image generated with the same
+    parameters is returned instead of generating it again, and identical
+    calls that overlap share a single generation (except cancellable ones,
+    which always run on their own).
+    
     Args:
         prompt: Text description of the desired image
         negative_prompt: What to avoid in the image
@@ -67,14 +304,40 @@ def generate_image(
         height: Image height (must be multiple of 8)
         seed: Random seed for reproducibility
         save_to_db: Whether to save metadata to database
+        use_cache: Whether a seeded call may reuse an earlier identical result
+        on_preview: Called with (step, num_inference_steps, preview image)
+                    every preview_every steps
+        preview_every: Steps between previews
+        cancel_event: Set it to stop the run after the current step
     
     Returns:
         tuple: (PIL.Image, seed, file_path, db_id)
+    
+    Raises:
+        GenerationCancelled: If cancel_event was set (nothing is saved)
     """
     
+    if use_cache and save_to_db and seed is not None:
+        params = {
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "num_inference_steps": num_inference_steps,
+            "guidance_scale": guidance_scale,
+            "width": width,
+            "height": height,
+            "seed": seed,
+        }
+        if on_preview is None and cancel_event is None:
+            result, _ = _generation_flights.do(_result_key(params), lambda: _reuse_or_generate(params))
+            return result
+        # Another caller's cancel must not cancel this run, so do not share it
+        reused = _reuse_existing(params)
+        if reused is not None:
+            return reused
+    
     # Set random seed for reproducibility
     if seed is None:
-        seed = torch.randint(0, 2**32 - 1, (1,)).item()
+        seed = _random_seed()
     
     generator = torch.Generator(device=device).manual_seed(seed)
     
@@ -86,15 +349,18 @@ def generate_image(
     
     try:
         # Generate image
-        with torch.no_grad():
+        with registry.use("text_to_image") as pipe, torch.no_grad():
             result = pipe(
-                prompt=prompt,
-                negative_prompt=negative_prompt,
+                **_prompt_embeddings(pipe, [prompt], [negative_prompt]),
                 num_inference_steps=num_inference_steps,
                 guidance_scale=guidance_scale,
                 width=width,
                 height=height,
                 generator=generator,
+                callback_on_step_end=(
+                    _step_callback(num_inference_steps, on_preview, max(1, preview_every), cancel_event)
+                    if on_preview is not None or cancel_event is not None else None
+                ),
             )
         
         image = result.images[0]
@@ -103,16 +369,7 @@ def generate_image(
         generation_duration = time.time() - start_time
         
         # Save image to disk
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_prompt = prompt[:50].replace(" ", "_").replace("/", "_").replace("\\", "_")
-        filename = f"generated_{timestamp}_{safe_prompt}_seed{seed}.png"
-        file_path = os.path.join(GENERATED_IMAGES_DIR, filename)
-        
-        image.save(file_path)
-        print(f"[SUCCESS] Image saved to: {file_path}")
-        
-        # Get file size
-        file_size = os.path.getsize(file_path)
+        file_path, filename, file_size = _save_generated_image(image, prompt, seed)
         
         # Save to database
         db_id = None
@@ -140,6 +397,10 @@ def generate_image(
         return image, seed, file_path, db_id
         
     except Exception as e:
+        if isinstance(e, GenerationCancelled):
+            print(f"[INFO] Image generation cancelled after {time.time() - start_time:.1f}s")
+            raise
+        
         # Log failure to database
         error_message = str(e)
         print(f"[ERROR] Image generation failed: {error_message}")
@@ -189,6 +450,59 @@ def image_to_base64(image: Image.Image) -> str:
     return f"data:image/png;base64,{img_base64}"
 
 
+def _run_batch(jobs: List[dict]) -> List[Image.Image]:
+    """
+    Generate a group of jobs that share size, steps and guidance scale in
+    one pipeline call.
+
+    Each job gets its own generator, so its starting latents (and hence its
+    image) depend only on its own seed, not on its place in the batch.
+    """
+    first = jobs[0]
+    generators = [torch.Generator(device=device).manual_seed(job["seed"]) for job in jobs]
+
+    with registry.use("text_to_image") as pipe, torch.no_grad():
+        result = pipe(
+            **_prompt_embeddings(
+                pipe,
+                [job["prompt"] for job in jobs],
+                [job["negative_prompt"] for job in jobs],
+            ),
+            num_inference_steps=first["num_inference_steps"],
+            guidance_scale=first["guidance_scale"],
+            width=first["width"],
+            height=first["height"],
+            generator=generators,
+        )
+    return result.images
+
+
+def _generate_group(jobs: List[dict]) -> List[Tuple[Optional[Image.Image], float, Optional[str]]]:
+    """
+    Run one batch, falling back to one prompt per call if it fails so a
+    single bad prompt (or a batch too large for memory) only fails itself.
+
+    Returns:
+        list: (image or None, generation_duration, error_message) per job
+    """
+    start_time = time.time()
+    try:
+        images = _run_batch(jobs)
+        duration = (time.time() - start_time) / len(jobs)
+        return [(image, duration, None) for image in images]
+    except Exception as e:
+        if device == "cuda":
+            torch.cuda.empty_cache()
+        if len(jobs) == 1:
+            return [(None, time.time() - start_time, str(e))]
+        print(f"[WARNING] Batch of {len(jobs)} failed ({e}), retrying one prompt at a time")
+
+    outcomes = []
+    for job in jobs:
+        outcomes.extend(_generate_group([job]))
+    return outcomes
+
+
 def batch_generate_images(
     prompts: list,
     negative_prompt: str = "blurry, bad quality, distorted, ugly, low resolution",
@@ -198,47 +512,260 @@ def batch_generate_images(
     height: int = 512,
     seed: int = None,
     save_to_db: bool = True,
+    tags: Optional[List[str]] = None,
+    max_batch_size: int = TEXT_TO_IMAGE_MAX_BATCH_SIZE,
 ):
     """
     Generate multiple images from a list of prompts.
     
+    Prompts with the same width, height, steps and guidance scale are run
+    through the pipeline together, up to max_batch_size per call, so the
+    UNet denoises several images per step instead of one. Every image is
+    seeded from its own generator and comes out the same as generate_image()
+    with that seed would give it (up to floating-point noise from batched
+    kernels).
+    
+    Database rows for the whole batch (including failures and tags) are
+    written together in one transaction once generation finishes, rather
+    than with one INSERT and commit per image.
+    
     Args:
-        prompts: List of text descriptions
+        prompts: List of text descriptions, or dicts with a "prompt" key and
+                 any of negative_prompt, num_inference_steps, guidance_scale,
+                 width, height and seed to override the shared arguments
+        tags: Tags to attach to every image in the batch
+        max_batch_size: Most images per pipeline call
         Other args same as generate_image()
     
     Returns:
-        list: List of tuples (PIL.Image, seed, file_path, db_id)
+        list: List of tuples (PIL.Image, seed, file_path, db_id) for the
+              images that were generated, in prompt order
     """
+    jobs = []
+    for i, item in enumerate(prompts):
+        job = {
+            "prompt": item,
+            "negative_prompt": negative_prompt,
+            "num_inference_steps": num_inference_steps,
+            "guidance_scale": guidance_scale,
+            "width": width,
+            "height": height,
+            # Use different seed for each image if not specified
+            "seed": seed + i if seed is not None else None,
+        }
+        if isinstance(item, dict):
+            job.update(item)
+        if job["seed"] is None:
+            job["seed"] = _random_seed()
+        jobs.append(job)
+    
+    # Group compatible prompts, keeping first-seen order
+    groups = {}
+    for i, job in enumerate(jobs):
+        key = (job["width"], job["height"], job["num_inference_steps"], job["guidance_scale"])
+        groups.setdefault(key, []).append(i)
+    
+    batch_size = max(1, max_batch_size)
+    outcomes = [None] * len(jobs)
+    done = 0
+    for indices in groups.values():
+        for offset in range(0, len(indices), batch_size):
+            chunk = indices[offset:offset + batch_size]
+            print(f"[INFO] Generating images {done + 1}-{done + len(chunk)}/{len(jobs)}")
+            for i, outcome in zip(chunk, _generate_group([jobs[i] for i in chunk])):
+                outcomes[i] = outcome
+            done += len(chunk)
+    
     results = []
+    records = []
     
-    for i, prompt in enumerate(prompts):
-        print(f"[INFO] Generating image {i+1}/{len(prompts)}")
+    for i, (job, (image, generation_duration, error_message)) in enumerate(zip(jobs, outcomes)):
+        record = {
+            "prompt": job["prompt"],
+            "negative_prompt": job["negative_prompt"],
+            "num_inference_steps": job["num_inference_steps"],
+            "guidance_scale": job["guidance_scale"],
+            "image_width": job["width"],
+            "image_height": job["height"],
+            "seed": job["seed"],
+            "generation_duration": generation_duration,
+            "model_used": model_id,
+        }
         
-        # Use different seed for each image if not specified
-        current_seed = seed + i if seed is not None else None
+        if image is not None:
+            try:
+                file_path, filename, file_size = _save_generated_image(image, job["prompt"], job["seed"], index=i)
+                results.append((image, job["seed"], file_path, None))
+                record.update(
+                    file_path=file_path,
+                    file_name=filename,
+                    file_size=file_size,
+                    status="completed",
+                    tags=tags,
+                )
+                records.append(record)
+                continue
+            except Exception as e:
+                error_message = f"Could not save image: {e}"
         
+        print(f"[ERROR] Failed to generate image {i+1}: {error_message}")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"failed_{timestamp}_{i}.png"
+        record.update(
+            file_path=os.path.join(GENERATED_IMAGES_DIR, filename),
+            file_name=filename,
+            status="failed",
+            error_message=error_message,
+        )
+        records.append(record)
+    
+    if save_to_db and records:
         try:
-            image, used_seed, file_path, db_id = generate_image(
-                prompt=prompt,
-                negative_prompt=negative_prompt,
-                num_inference_steps=num_inference_steps,
-                guidance_scale=guidance_scale,
-                width=width,
-                height=height,
-                seed=current_seed,
-                save_to_db=save_to_db,
-            )
-            
-            results.append((image, used_seed, file_path, db_id))
-            
+            db_ids = insert_generated_images_bulk(records)
+            ids_by_path = {
+                record["file_path"]: db_id
+                for record, db_id in zip(records, db_ids)
+                if record["status"] == "completed"
+            }
+            results = [
+                (image, used_seed, file_path, ids_by_path.get(file_path))
+                for image, used_seed, file_path, _ in results
+            ]
         except Exception as e:
-            print(f"[ERROR] Failed to generate image {i+1}: {e}")
-            # Continue with next image
-            continue
+            print(f"[WARNING] Could not save batch to database: {e}")
     
     return results
 
 
+def submit_generation_job(
+    prompt: str,
+    negative_prompt: str = "blurry, bad quality, distorted, ugly, low resolution",
+    num_inference_steps: int = 30,
+    guidance_scale: float = 7.5,
+    width: int = 512,
+    height: int = 512,
+    seed: int = None,
+) -> Tuple[int, int, str]:
+    """
+    Queue a generation for the background worker instead of running it now.
+    
+    The job is a GeneratedImages row with Status 'queued'; its ID is the
+    job ID and becomes the image's ID once it completes. The seed is fixed
+    here so the result is reproducible however long the job waits.
+    
+    A seeded request identical to one already completed, queued or
+    processing returns that job instead of queueing another.
+    
+    Args:
+        Same as generate_image()
+    
+    Returns:
+        tuple: (job_id, seed, status)
+    """
+    params = {
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "num_inference_steps": num_inference_steps,
+        "guidance_scale": guidance_scale,
+        "width": width,
+        "height": height,
+        "seed": seed,
+    }
+    if seed is None:
+        params["seed"] = _random_seed()
+        return _queue_job(params)
+    
+    result, _ = _job_flights.do(_result_key(params), lambda: _reuse_or_queue(params))
+    return result
+
+
+def _reuse_or_queue(params: dict) -> Tuple[int, int, str]:
+    existing = _find_existing_result(params, statuses=("queued", "processing", "completed"))
+    if existing is None:
+        return _queue_job(params)
+    print(f"[INFO] Reusing text-to-image job {existing['generated_image_id']} for identical request")
+    return existing["generated_image_id"], params["seed"], existing["status"]
+
+
+def _queue_job(params: dict) -> Tuple[int, int, str]:
+    # Replaced by the real file once the job completes
+    filename = f"queued_{uuid.uuid4().hex}.png"
+    job_id = insert_generated_image(
+        prompt=params["prompt"],
+        file_path=os.path.join(GENERATED_IMAGES_DIR, filename),
+        file_name=filename,
+        seed=params["seed"],
+        negative_prompt=params["negative_prompt"],
+        num_inference_steps=params["num_inference_steps"],
+        guidance_scale=params["guidance_scale"],
+        image_width=params["width"],
+        image_height=params["height"],
+        model_used=model_id,
+        status="queued"
+    )
+    print(f"[INFO] Queued text-to-image job {job_id}")
+    return job_id, params["seed"], "queued"
+
+
+def run_generation_job(job: dict) -> bool:
+    """
+    Generate a job claimed from the queue and record the outcome on its row.
+    
+    Args:
+        job: Job returned by db.claim_generation_job()
+    
+    Returns:
+        bool: True if the image was generated and stored
+    """
+    print(f"[INFO] Running text-to-image job {job['job_id']}")
+    start_time = time.time()
+    
+    try:
+        _, _, file_path, _ = generate_image(
+            prompt=job["prompt"],
+            negative_prompt=job["negative_prompt"],
+            num_inference_steps=job["num_inference_steps"],
+            guidance_scale=job["guidance_scale"],
+            width=job["width"],
+            height=job["height"],
+            seed=job["seed"],
+            save_to_db=False,
+        )
+    except Exception as e:
+        fail_generation_job(job, str(e), time.time() - start_time)
+        return False
+    
+    stored = complete_generation_job(
+        job,
+        file_path=file_path,
+        file_name=os.path.basename(file_path),
+        generation_duration=time.time() - start_time,
+        file_size=os.path.getsize(file_path),
+    )
+    if not stored:
+        # The job was deleted (or given to another worker) meanwhile
+        print(f"[WARNING] Text-to-image job {job['job_id']} is no longer processing, discarding its image")
+        os.remove(file_path)
+        delete_thumbnails(file_path)
+    return stored
+
+
+def get_stats() -> dict:
+    """
+    Get cache statistics for text-to-image generation.
+    """
+    with _result_cache_lock:
+        result_cache = dict(_result_cache_counts)
+    lookups = result_cache["hits"] + result_cache["misses"]
+    result_cache["hit_rate"] = result_cache["hits"] / lookups if lookups else 0.0
+    result_cache["generation_flights"] = _generation_flights.stats()
+    result_cache["job_flights"] = _job_flights.stats()
+    return {
+        "prompt_embed_cache": prompt_embed_cache.stats(),
+        "result_cache": result_cache,
+    }
+
+
 def record_download(db_id: int) -> bool:
     """
     Record that an image was downloaded.
@@ -0,0 +1,109 @@
+import base64
+import os
+import uuid
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+# Longest-edge sizes (px) of the thumbnails created for every stored image
+THUMBNAIL_SIZES = sorted(
+    int(size) for size in os.getenv("THUMBNAIL_SIZES", "128,256,512").split(",") if size.strip()
+)
+# Size returned by the gallery endpoints unless another is requested
+THUMBNAIL_DEFAULT_SIZE = int(os.getenv("THUMBNAIL_DEFAULT_SIZE", "256"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "85"))
+
+# Thumbnails live in a subdirectory next to the original file
+THUMBNAIL_SUBDIR = "thumbnails"
+
+
+def thumbnail_path(file_path: str, size: int) -> str:
+    """
+    Location of the thumbnail of `file_path` at the given size.
+    """
+    directory, filename = os.path.split(file_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, THUMBNAIL_SUBDIR, f"{stem}_{size}.jpg")
+
+
+def create_thumbnails(file_path: str, image: Optional[Image.Image] = None) -> Dict[int, str]:
+    """
+    Write a JPEG thumbnail of an image at every size in THUMBNAIL_SIZES.
+
+    Args:
+        file_path: Path of the original image on disk
+        image: The image already in memory, to avoid reading the file back
+
+    Returns:
+        dict: Size -> thumbnail path
+    """
+    os.makedirs(os.path.join(os.path.dirname(file_path), THUMBNAIL_SUBDIR), exist_ok=True)
+
+    if image is None:
+        image = Image.open(file_path)
+        # Let the JPEG decoder skip detail the largest thumbnail does not need
+        image.draft("RGB", (THUMBNAIL_SIZES[-1], THUMBNAIL_SIZES[-1]))
+    thumb = image.convert("RGB")
+
+    paths = {}
+    # Largest first so each smaller size is resampled from the previous one
+    for size in reversed(THUMBNAIL_SIZES):
+        thumb = thumb.copy()
+        thumb.thumbnail((size, size), Image.LANCZOS)
+
+        path = thumbnail_path(file_path, size)
+        # Unique per call: concurrent requests may build the same missing thumbnail
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        thumb.save(tmp_path, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+        os.replace(tmp_path, path)
+        paths[size] = path
+
+    return paths
+
+
+def delete_thumbnails(file_path: str):
+    for size in THUMBNAIL_SIZES:
+        path = thumbnail_path(file_path, size)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def ensure_thumbnail(file_path: str, size: int) -> Optional[str]:
+    """
+    Path of a thumbnail, created on the spot if the backfill has not
+    reached this file yet. None if the original file is missing.
+    """
+    path = thumbnail_path(file_path, size)
+    if not os.path.exists(path):
+        if not os.path.exists(file_path):
+            return None
+        create_thumbnails(file_path)
+    return path
+
+
+def thumbnail_data_uri(file_path: str, size: int = THUMBNAIL_DEFAULT_SIZE) -> Optional[str]:
+    """
+    Base64 data URI of a thumbnail (see ensure_thumbnail).
+
+    Returns:
+        str: data:image/jpeg URI, or None if the original file is missing
+    """
+    path = ensure_thumbnail(file_path, size)
+    if path is None:
+        return None
+
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("utf-8")
+    return f"data:image/jpeg;base64,{encoded}"
+
+
+def missing_thumbnails(file_paths: List[str]) -> List[str]:
+    """
+    Filter to the files that exist on disk but lack at least one thumbnail.
+    """
+    return [
+        file_path for file_path in file_paths
+        if file_path and os.path.exists(file_path) and not all(
+            os.path.exists(thumbnail_path(file_path, size)) for size in THUMBNAIL_SIZES
+        )
+    ]
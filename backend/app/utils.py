@@ -1,4 +1,5 @@
 from PIL import Image
+import hashlib
 import io
 
 def load_image_from_bytes(file_bytes: bytes) -> Image.Image:
@@ -13,3 +14,18 @@ def format_prompt(question: str) -> str:
     """
     return f"USER: <image>\n{question} ASSISTANT:"
 
+def content_hash(data: bytes) -> str:
+    """
+    SHA-256 hex digest of raw file bytes, used as the storage key for uploads.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+def image_content_hash(image: Image.Image) -> str:
+    """
+    SHA-256 of the decoded pixels, so the same picture hashes the same
+    regardless of file name or container format.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
@@ -1,19 +1,137 @@
+import os
+import threading
 import torch
-from transformers import AutoProcessor, LlavaForConditionalGeneration
+from transformers import (
+    AutoProcessor,
+    DynamicCache,
+    LlavaForConditionalGeneration,
+    LogitsProcessorList,
+    TextStreamer,
+)
 from PIL import Image
-from .utils import format_prompt  # your helper to format prompts
+from types import SimpleNamespace
+from typing import Callable, List, Tuple
+from .utils import format_prompt, image_content_hash  # your helper to format prompts
+from .batching import VQABatchScheduler
+from .cache import LRUCache, tensor_nbytes
+from .confidence import CONFIDENCE_MODES, ConfidenceTracker
+from .feature_cache import FeatureCache
+from .model_registry import registry
+
+# Micro-batching configuration
+VQA_MAX_BATCH_SIZE = int(os.getenv("VQA_MAX_BATCH_SIZE", "8"))
+VQA_BATCH_WINDOW_MS = float(os.getenv("VQA_BATCH_WINDOW_MS", "25"))
+VQA_MAX_NEW_TOKENS = 500
+
+# How answer confidence is scored: last_token, mean_logprob or min_prob
+VQA_CONFIDENCE_MODE = os.getenv("VQA_CONFIDENCE_MODE", "last_token")
+if VQA_CONFIDENCE_MODE not in CONFIDENCE_MODES:
+    raise ValueError(f"VQA_CONFIDENCE_MODE must be one of {CONFIDENCE_MODES}")
+
+# Image feature cache configuration (set VQA_FEATURE_CACHE_DIR to enable the disk tier)
+VQA_FEATURE_CACHE_MB = int(os.getenv("VQA_FEATURE_CACHE_MB", "512"))
+VQA_FEATURE_CACHE_DIR = os.getenv("VQA_FEATURE_CACHE_DIR") or None
 
-# Load once
+# Image-prefix KV cache configuration (0 disables prefix reuse)
+VQA_PREFIX_CACHE_MB = int(os.getenv("VQA_PREFIX_CACHE_MB", "2048"))
+
+# Model configuration
 device = "cuda" if torch.cuda.is_available() else "cpu"
 model_name = "llava-hf/llava-1.5-7b-hf"
 
-processor = AutoProcessor.from_pretrained(model_name, use_fast=True)
-model = LlavaForConditionalGeneration.from_pretrained(
-    model_name, 
-    torch_dtype=torch.float16 if device=="cuda" else torch.float32
+# Weight precision: fp32, fp16, bf16, int8 (dynamic quantization of the
+# linear layers, CPU only) or int4 (weight-only, needs optimum-quanto)
+VQA_PRECISIONS = ("fp32", "fp16", "bf16", "int8", "int4")
+VQA_PRECISION = os.getenv("VQA_PRECISION", "fp16" if device == "cuda" else "fp32")
+if VQA_PRECISION not in VQA_PRECISIONS:
+    raise ValueError(f"VQA_PRECISION must be one of {VQA_PRECISIONS}")
+
+
+def _quantize(model: LlavaForConditionalGeneration, precision: str) -> LlavaForConditionalGeneration:
+    if precision == "int8":
+        if device != "cpu":
+            raise ValueError("VQA_PRECISION=int8 uses dynamic quantization, which only runs on CPU")
+        # Weights are stored as int8; activations are quantized on the fly
+        return torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+
+    if precision == "int4":
+        try:
+            from optimum.quanto import freeze, qint4, quantize
+        except ImportError:
+            raise ImportError("VQA_PRECISION=int4 requires optimum-quanto (pip install optimum-quanto)")
+        # Only the language model: it dominates the weights and the decode time
+        quantize(model.language_model, weights=qint4)
+        freeze(model.language_model)
+
+    return model
+
+
+def _load_model(precision: str = None) -> SimpleNamespace:
+    """
+    Load the LLaVA processor and model. Called by the model registry on
+    first use rather than at import time.
+
+    Args:
+        precision: One of VQA_PRECISIONS (defaults to VQA_PRECISION)
+    """
+    precision = precision or VQA_PRECISION
+    torch_dtype = {"fp16": torch.float16, "bf16": torch.bfloat16}.get(precision, torch.float32)
+
+    processor = AutoProcessor.from_pretrained(model_name, use_fast=True)
+    model = LlavaForConditionalGeneration.from_pretrained(
+        model_name, 
+        torch_dtype=torch_dtype,
+        low_cpu_mem_usage=True
+    )
+    model.to(device)
+    model.eval()
+    model = _quantize(model, precision)
+
+    # Batched generation with a decoder-only model needs left padding so every
+    # prompt ends right where generation starts
+    processor.tokenizer.padding_side = "left"
+
+    image_token_id = getattr(model.config, "image_token_id", None)
+    if image_token_id is None:
+        image_token_id = model.config.image_token_index
+
+    return SimpleNamespace(
+        processor=processor,
+        model=model,
+        precision=precision,
+        image_token=getattr(processor, "image_token", "<image>"),
+        image_token_id=image_token_id,
+    )
+
+
+# Projected image features keyed by image content hash, so follow-up
+# questions on the same image skip the vision tower entirely
+feature_cache = FeatureCache(
+    max_bytes=VQA_FEATURE_CACHE_MB * 1024 * 1024,
+    disk_dir=(
+        os.path.join(VQA_FEATURE_CACHE_DIR, f"{model_name.replace('/', '--')}-{VQA_PRECISION}")
+        if VQA_FEATURE_CACHE_DIR else None
+    ),
+)
+
+# Past key/values for "USER: <image>" keyed by image content hash. Each
+# entry is (prefix_ids, past_key_values, nbytes, lock); the lock is held
+# while a generate call is extending the cache in place.
+prefix_cache = LRUCache(
+    max_bytes=VQA_PREFIX_CACHE_MB * 1024 * 1024,
+    size_of=lambda entry: entry[2],
 )
-model.to(device)
-model.eval()
+
+
+def _drop_caches():
+    # Free the in-memory caches along with the model; disk features are kept
+    feature_cache.memory.clear()
+    prefix_cache.clear()
+
+
+registry.register("vqa", _load_model, on_unload=_drop_caches)
 
 # def ask_vqa(image: Image.Image, question: str):
 #     """
@@ -42,44 +160,317 @@ model.eval()
 #         confidence = 1.0  # fallback
 
 #     return answer, confidence
+def _extract_answer(full_text: str) -> str:
+    # Strip the prompt to keep only the model's response
+    if "ASSISTANT:" in full_text:
+        return full_text.split("ASSISTANT:")[-1].strip()
+    return full_text.strip()
+
+
+def _last_step_index(llava: SimpleNamespace, generated_ids: torch.Tensor) -> int:
+    """
+    Index of the decoding step that produced this row's final token.
+    Rows that hit EOS early are padded for the rest of the batch, so the
+    last step of the batch is not necessarily the last step of the row.
+    """
+    eos_ids = llava.model.generation_config.eos_token_id
+    if eos_ids is None:
+        return generated_ids.shape[0] - 1
+    if isinstance(eos_ids, int):
+        eos_ids = [eos_ids]
+
+    is_eos = torch.isin(generated_ids, torch.tensor(eos_ids, device=generated_ids.device))
+    eos_positions = is_eos.nonzero()
+    if eos_positions.numel() > 0:
+        return eos_positions[0].item()
+    return generated_ids.shape[0] - 1
+
+
+def _project_image_features(llava: SimpleNamespace, images: List[Image.Image]) -> torch.Tensor:
+    """
+    Run the vision tower and projector on a list of images.
+    Returns:
+        tensor of shape (num_images, num_image_tokens, hidden_size)
+    """
+    pixel_values = llava.processor.image_processor(images, return_tensors="pt")["pixel_values"]
+    pixel_values = pixel_values.to(device=device, dtype=llava.model.dtype)
+
+    with torch.no_grad():
+        features = llava.model.get_image_features(
+            pixel_values=pixel_values,
+            vision_feature_layer=llava.model.config.vision_feature_layer,
+            vision_feature_select_strategy=llava.model.config.vision_feature_select_strategy,
+        )
+
+    # Newer transformers return one tensor per image
+    if isinstance(features, (list, tuple)):
+        features = torch.stack(list(features))
+    return features
+
+
+def get_image_features(
+    llava: SimpleNamespace, images: List[Image.Image], keys: List[str] = None
+) -> List[torch.Tensor]:
+    """
+    Get projected features for each image, from the feature cache when
+    possible. Misses are computed together in one vision tower call.
+    Args:
+        llava: Loaded model bundle from the registry
+        images: Images to encode
+        keys: Precomputed image content hashes (computed if omitted)
+    Returns:
+        list of tensors of shape (num_image_tokens, hidden_size)
+    """
+    if keys is None:
+        keys = [image_content_hash(image) for image in images]
+    features = {}
+    missing = {}
+
+    for key, image in zip(keys, images):
+        if key in features or key in missing:
+            continue
+        cached = feature_cache.get(key, device=device)
+        if cached is not None:
+            features[key] = cached
+        else:
+            missing[key] = image
+
+    if missing:
+        computed = _project_image_features(llava, list(missing.values()))
+        for key, image_features in zip(missing.keys(), computed):
+            image_features = image_features.contiguous()
+            feature_cache.put(key, image_features)
+            features[key] = image_features
+
+    return [features[key] for key in keys]
+
+
+def _build_inputs(llava: SimpleNamespace, image_features: List[torch.Tensor], questions: List[str]) -> dict:
+    """
+    Tokenize the prompts and splice the image features into their embeddings,
+    so generate() only has to run the language model.
+    """
+    # Expand the <image> placeholder to one token per image feature
+    prompts = [
+        format_prompt(question).replace(llava.image_token, llava.image_token * features.shape[0])
+        for features, question in zip(image_features, questions)
+    ]
+
+    # Prompts of different length are left-padded
+    inputs = llava.processor.tokenizer(prompts, padding=True, return_tensors="pt").to(device)
+    input_ids = inputs["input_ids"]
+
+    with torch.no_grad():
+        inputs_embeds = llava.model.get_input_embeddings()(input_ids)
+        image_mask = (input_ids == llava.image_token_id).unsqueeze(-1).expand_as(inputs_embeds)
+        stacked = torch.cat(image_features).to(device=device, dtype=inputs_embeds.dtype)
+        inputs_embeds = inputs_embeds.masked_scatter(image_mask, stacked)
+
+    return {
+        "input_ids": input_ids,
+        "attention_mask": inputs["attention_mask"],
+        "inputs_embeds": inputs_embeds,
+    }
+
+
+def _confidence(
+    llava: SimpleNamespace, tracker: ConfidenceTracker, generated_ids: torch.Tensor, row: int
+) -> float:
+    # Estimate confidence from the per-step probabilities recorded during decoding
+    return tracker.confidence(row, _last_step_index(llava, generated_ids), VQA_CONFIDENCE_MODE)
+
+
+def _kv_cache_nbytes(past_key_values) -> int:
+    if hasattr(past_key_values, "layers"):
+        tensors = [
+            tensor
+            for layer in past_key_values.layers
+            for tensor in (layer.keys, layer.values)
+            if tensor is not None
+        ]
+    else:
+        tensors = list(past_key_values.key_cache) + list(past_key_values.value_cache)
+    return sum(tensor_nbytes(tensor) for tensor in tensors)
+
+
+def _get_prefix(llava: SimpleNamespace, key: str, input_ids: torch.Tensor, inputs_embeds: torch.Tensor):
+    """
+    Get the cached past key/values for the image prefix of a prompt,
+    prefilling and caching it on a miss.
+    Returns:
+        (prefix_len, past_key_values, lock)
+    """
+    # The prefix runs through the last image token; everything after it
+    # depends on the question
+    image_positions = (input_ids[0] == llava.image_token_id).nonzero()
+    prefix_len = image_positions[-1].item() + 1
+    prefix_ids = input_ids[:, :prefix_len]
+
+    entry = prefix_cache.get(key)
+    if entry is not None and torch.equal(entry[0], prefix_ids):
+        return prefix_len, entry[1], entry[3]
+
+    with torch.no_grad():
+        outputs = llava.model(
+            inputs_embeds=inputs_embeds[:, :prefix_len],
+            attention_mask=torch.ones_like(prefix_ids),
+            use_cache=True,
+        )
+
+    past_key_values = outputs.past_key_values
+    if isinstance(past_key_values, tuple):
+        past_key_values = DynamicCache.from_legacy_cache(past_key_values)
+
+    lock = threading.Lock()
+    if not prefix_cache.put(key, (prefix_ids, past_key_values, _kv_cache_nbytes(past_key_values), lock)):
+        print("[WARNING] Image prefix is larger than VQA_PREFIX_CACHE_MB, not caching it")
+    return prefix_len, past_key_values, lock
+
+
+def _ask_vqa_single(
+    llava: SimpleNamespace, key: str, image: Image.Image, question: str, streamer=None
+) -> Tuple[str, float]:
+    """
+    Perform VQA on one image and question, starting from the cached image
+    prefix (when enabled) so only the question tokens need prefilling.
+    """
+    features = get_image_features(llava, [image], keys=[key])
+    inputs = _build_inputs(llava, features, [question])
+
+    generate_inputs = inputs
+    prefix_len = past_key_values = lock = None
+    if VQA_PREFIX_CACHE_MB > 0:
+        prefix_len, past_key_values, lock = _get_prefix(llava, key, inputs["input_ids"], inputs["inputs_embeds"])
+        # generate() appends to the cache in place, so only one call may use
+        # it at a time; a concurrent question on the same image prefills in full
+        if lock.acquire(blocking=False):
+            generate_inputs = {
+                "input_ids": inputs["input_ids"],
+                "attention_mask": inputs["attention_mask"],
+                "past_key_values": past_key_values,
+            }
+        else:
+            lock = None
+
+    tracker = ConfidenceTracker()
+    try:
+        with torch.no_grad():
+            outputs = llava.model.generate(
+                **generate_inputs,
+                max_new_tokens=VQA_MAX_NEW_TOKENS,
+                logits_processor=LogitsProcessorList([tracker]),
+                return_dict_in_generate=True,
+                do_sample=False,
+                streamer=streamer
+            )
+    finally:
+        if lock is not None:
+            # Drop this question's tokens so the cache holds just the prefix again
+            past_key_values.crop(prefix_len)
+            lock.release()
+
+    generated = outputs.sequences[:, inputs["input_ids"].shape[1]:]
+    answer = _extract_answer(llava.processor.batch_decode(generated, skip_special_tokens=True)[0])
+    return answer, _confidence(llava, tracker, generated[0], 0)
+
+
+def ask_vqa_batch(images: List[Image.Image], questions: List[str]) -> List[Tuple[str, float]]:
+    """
+    Perform VQA on a batch of images and questions.
+    A lone question starts from its image's cached prefix; larger batches
+    share one generate call (reusing cached image features), since rows
+    with different images cannot share a prefix.
+    Returns:
+        list of (answer, confidence) tuples, one per input pair
+    """
+    keys = [image_content_hash(image) for image in images]
+
+    with registry.use("vqa") as llava:
+        if len(images) == 1 and VQA_PREFIX_CACHE_MB > 0:
+            return [_ask_vqa_single(llava, keys[0], images[0], questions[0])]
+
+        # Preprocess inputs, reusing cached image features
+        inputs = _build_inputs(llava, get_image_features(llava, images, keys=keys), questions)
+
+        # Generate tokens
+        tracker = ConfidenceTracker()
+        with torch.no_grad():
+            outputs = llava.model.generate(
+                **inputs,
+                max_new_tokens=VQA_MAX_NEW_TOKENS,
+                logits_processor=LogitsProcessorList([tracker]),
+                return_dict_in_generate=True,
+                do_sample=False
+            )
+
+        # Decode answer text (only the newly generated tokens)
+        generated = outputs.sequences[:, inputs["input_ids"].shape[1]:]
+        full_texts = llava.processor.batch_decode(generated, skip_special_tokens=True)
+
+        return [
+            (_extract_answer(full_text), _confidence(llava, tracker, generated[i], i))
+            for i, full_text in enumerate(full_texts)
+        ]
+
+
+# Concurrent ask_vqa calls are grouped into one generate call per window
+scheduler = VQABatchScheduler(
+    ask_vqa_batch,
+    max_batch_size=VQA_MAX_BATCH_SIZE,
+    window_ms=VQA_BATCH_WINDOW_MS,
+)
+
+
 def ask_vqa(image: Image.Image, question: str):
     """
     Perform VQA on a single image and question.
+    The request is queued on the batching scheduler and may share a
+    generate call with other concurrent requests.
     Returns:
         answer (str)
         confidence (float) approximate
     """
-    # Format prompt
-    prompt = format_prompt(question)
+    return scheduler.submit(image, question).result()
 
-    # Preprocess inputs
-    inputs = processor(images=image, text=prompt, return_tensors="pt").to(device)
 
-    # Generate tokens
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=500,
-            output_scores=True,
-            return_dict_in_generate=True,
-            do_sample=False
-        )
+class _CallbackStreamer(TextStreamer):
+    """
+    Streamer that hands each finalized piece of decoded text to a callback.
+    """
 
-    # Decode answer text
-    full_text = processor.batch_decode(outputs.sequences, skip_special_tokens=True)[0]
+    def __init__(self, tokenizer, on_text: Callable[[str], None]):
+        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.on_text = on_text
 
-    # Strip the prompt to keep only the model's response
-    if "ASSISTANT:" in full_text:
-        answer = full_text.split("ASSISTANT:")[-1].strip()
-    else:
-        answer = full_text.strip()
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if text:
+            self.on_text(text)
 
-    # Estimate confidence: softmax over logits of last token
-    if outputs.scores is not None:
-        last_token_logits = outputs.scores[-1].squeeze(0)
-        probs = torch.softmax(last_token_logits, dim=-1)
-        confidence = probs.max().item()
-    else:
-        confidence = 1.0  # fallback
 
-    return answer, confidence
+def ask_vqa_stream(image: Image.Image, question: str, on_text: Callable[[str], None]):
+    """
+    Perform VQA on a single image and question, calling on_text with each
+    piece of the answer as it is decoded. Bypasses the batching scheduler.
+    Returns:
+        answer (str)
+        confidence (float) approximate
+    """
+    with registry.use("vqa") as llava:
+        return _ask_vqa_single(
+            llava,
+            image_content_hash(image),
+            image,
+            question,
+            streamer=_CallbackStreamer(llava.processor.tokenizer, on_text),
+        )
+
+
+def get_stats() -> dict:
+    """
+    Get batching and cache statistics for the VQA model.
+    """
+    return {
+        "batching": scheduler.stats(),
+        "feature_cache": feature_cache.stats(),
+        "prefix_cache": prefix_cache.stats(),
+    }
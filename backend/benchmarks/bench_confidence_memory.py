@@ -0,0 +1,123 @@
+"""
+Peak memory benchmark for VQA confidence scoring.
+
+Compares generate(output_scores=True), which keeps a full-vocabulary
+logits tensor for every decoding step, against ConfidenceTracker, which
+keeps one log-probability per row per step. Each mode runs in a fresh
+subprocess so peak RSS is measured independently. Uses a tiny
+random-weight LLaVA model with a full-size vocabulary. Linux/macOS only
+(uses the resource module).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_confidence_memory --batch-size 8 --max-new-tokens 500
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import torch
+from transformers import LogitsProcessorList
+
+from app.confidence import CONFIDENCE_MODES, ConfidenceTracker
+from app.model_registry import current_rss
+from benchmarks.tiny_llava import build_inputs, build_model
+
+MODES = ("output_scores", "tracker")
+
+
+def peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_mode(mode: str, batch_size: int, max_new_tokens: int) -> dict:
+    """
+    Run one generate call in the current process and measure it.
+    """
+    model = build_model()
+    inputs = build_inputs(model, [12] * batch_size)
+    baseline = current_rss()
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        if mode == "output_scores":
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                min_new_tokens=max_new_tokens,
+                output_scores=True,
+                return_dict_in_generate=True,
+                do_sample=False,
+            )
+            probs = torch.softmax(outputs.scores[-1].float(), dim=-1).max(dim=-1).values
+            confidences = {"last_token": probs.tolist()}
+        else:
+            tracker = ConfidenceTracker()
+            model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                min_new_tokens=max_new_tokens,
+                logits_processor=LogitsProcessorList([tracker]),
+                return_dict_in_generate=True,
+                do_sample=False,
+            )
+            confidences = {
+                confidence_mode: [
+                    tracker.confidence(row, max_new_tokens - 1, confidence_mode)
+                    for row in range(batch_size)
+                ]
+                for confidence_mode in CONFIDENCE_MODES
+            }
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "seconds": elapsed,
+        "baseline_rss": baseline,
+        "peak_rss": peak_rss(),
+        "confidences": confidences,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-new-tokens", type=int, default=500)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.batch_size, args.max_new_tokens)))
+        return
+
+    results = {}
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_confidence_memory",
+             "--child", mode,
+             "--batch-size", str(args.batch_size),
+             "--max-new-tokens", str(args.max_new_tokens)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    mb = 1024 * 1024
+    print(f"Batch size: {args.batch_size}, new tokens: {args.max_new_tokens}")
+    print(f"{'mode':<16}{'seconds':>10}{'peak RSS MB':>14}{'growth MB':>12}")
+    for mode, result in results.items():
+        growth = result["peak_rss"] - (result["baseline_rss"] or 0)
+        print(f"{mode:<16}{result['seconds']:>10.2f}{result['peak_rss'] / mb:>14.1f}{growth / mb:>12.1f}")
+
+    # Both paths must agree on the original last-token confidence
+    before = results["output_scores"]["confidences"]["last_token"]
+    after = results["tracker"]["confidences"]["last_token"]
+    max_diff = max(abs(a - b) for a, b in zip(before, after))
+    print(f"max last_token confidence difference: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Throughput benchmark for batched Stable Diffusion generation.
+
+Generates the same prompts and seeds twice: once with one pipeline call
+per prompt (the old batch_generate_images loop) and once in batched calls
+with one generator per image, as batch_generate_images now does. Reports
+images/minute for both and how far each batched image is from the one
+generated alone with the same seed.
+
+By default a tiny random-weight pipeline is built so the benchmark runs on
+CPU without a download; pass --model-id to measure a real checkpoint.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_text_to_image_batching --prompts 16 --max-batch-size 4
+    python -m benchmarks.bench_text_to_image_batching --model-id runwayml/stable-diffusion-v1-5 --size 512 --steps 20
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+from diffusers import AutoencoderKL, DPMSolverMultistepScheduler, StableDiffusionPipeline, UNet2DConditionModel
+
+TINY_EMBED_DIM = 32
+TOKENS = 77
+
+
+def build_tiny_pipeline(seed: int = 0) -> StableDiffusionPipeline:
+    """
+    Build a small SD-1.5-shaped pipeline with random weights and no text
+    encoder; prompts are fed in as random embeddings instead.
+    """
+    torch.manual_seed(seed)
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=2,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=TINY_EMBED_DIM,
+    )
+    vae = AutoencoderKL(
+        block_out_channels=[32, 64],
+        in_channels=3,
+        out_channels=3,
+        down_block_types=["DownEncoderBlock2D", "DownEncoderBlock2D"],
+        up_block_types=["UpDecoderBlock2D", "UpDecoderBlock2D"],
+        latent_channels=4,
+    )
+    return StableDiffusionPipeline(
+        vae=vae,
+        text_encoder=None,
+        tokenizer=None,
+        unet=unet,
+        scheduler=DPMSolverMultistepScheduler(),
+        safety_checker=None,
+        feature_extractor=None,
+        requires_safety_checker=False,
+    )
+
+
+def build_real_pipeline(model_id: str, device: str) -> StableDiffusionPipeline:
+    """
+    Load a checkpoint the same way app.text_to_image does.
+    """
+    pipe = StableDiffusionPipeline.from_pretrained(
+        model_id,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+        safety_checker=None,
+        requires_safety_checker=False,
+    )
+    pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
+    pipe = pipe.to(device)
+    if device == "cuda":
+        pipe.enable_attention_slicing()
+    return pipe
+
+
+def make_prompts(count: int, tiny: bool):
+    """
+    Text prompts for a real model, or one random embedding per prompt for
+    the tiny one.
+    """
+    if not tiny:
+        subjects = ["a cat", "a lighthouse", "a forest", "a city at night", "a mountain lake"]
+        styles = ["digital art", "oil painting", "photograph", "watercolor"]
+        return [f"{subjects[i % len(subjects)]}, {styles[i % len(styles)]}, #{i}" for i in range(count)]
+    generator = torch.Generator().manual_seed(1)
+    return [torch.randn(1, TOKENS, TINY_EMBED_DIM, generator=generator) for _ in range(count)]
+
+
+def generate(pipe, prompts, seeds, args) -> np.ndarray:
+    """
+    One pipeline call for a list of prompts, one generator per image.
+    """
+    generators = [torch.Generator(device=args.device).manual_seed(seed) for seed in seeds]
+    if isinstance(prompts[0], str):
+        inputs = {"prompt": prompts, "negative_prompt": ["blurry, bad quality"] * len(prompts)}
+    else:
+        embeds = torch.cat(prompts).to(args.device)
+        inputs = {"prompt_embeds": embeds, "negative_prompt_embeds": torch.zeros_like(embeds)}
+
+    with torch.no_grad():
+        result = pipe(
+            **inputs,
+            num_inference_steps=args.steps,
+            guidance_scale=7.5,
+            width=args.size,
+            height=args.size,
+            generator=generators,
+            output_type="np",
+        )
+    return result.images
+
+
+def run(pipe, prompts, seeds, batch_size: int, args):
+    """
+    Generate every prompt in calls of at most batch_size images.
+
+    Returns:
+        tuple: (elapsed seconds, images as one array)
+    """
+    images = []
+    if args.device == "cuda":
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for offset in range(0, len(prompts), batch_size):
+        images.append(generate(pipe, prompts[offset:offset + batch_size], seeds[offset:offset + batch_size], args))
+    if args.device == "cuda":
+        torch.cuda.synchronize()
+    return time.perf_counter() - start, np.concatenate(images)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=16, help="Number of images to generate")
+    parser.add_argument("--max-batch-size", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--size", type=int, default=64, help="Image width and height")
+    parser.add_argument("--model-id", default=None, help="Real checkpoint instead of the tiny random pipeline")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    tiny = args.model_id is None
+    pipe = build_tiny_pipeline() if tiny else build_real_pipeline(args.model_id, args.device)
+    pipe = pipe.to(args.device)
+    pipe.set_progress_bar_config(disable=True)
+
+    prompts = make_prompts(args.prompts, tiny)
+    seeds = [1000 + i for i in range(args.prompts)]
+
+    # Warm up kernels and allocator so neither run pays first-call costs
+    generate(pipe, prompts[:2], seeds[:2], args)
+
+    print(f"Images: {args.prompts}, steps: {args.steps}, size: {args.size}, device: {args.device}")
+    print(f"{'mode':<12}{'seconds':>10}{'images/min':>12}")
+
+    outputs = {}
+    for label, batch_size in (("loop", 1), ("batched", args.max_batch_size)):
+        elapsed, outputs[label] = run(pipe, prompts, seeds, batch_size, args)
+        print(f"{label:<12}{elapsed:>10.2f}{args.prompts * 60 / elapsed:>12.1f}")
+
+    # Same seed, same image: pixel values are in [0, 1]
+    diff = np.abs(outputs["loop"] - outputs["batched"]).reshape(args.prompts, -1).max(axis=1)
+    print(f"Max per-image pixel difference, batched vs loop: {diff.max():.4f}")
+
+
+if __name__ == "__main__":
+    main()
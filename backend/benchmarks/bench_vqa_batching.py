@@ -0,0 +1,113 @@
+"""
+Throughput benchmark for the VQA micro-batching scheduler.
+
+Runs the same set of concurrent requests through VQABatchScheduler twice,
+once with max_batch_size=1 (one generate call per request, like the old
+ask_vqa) and once with batching enabled, against a tiny random-weight
+LLaVA model on CPU.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_vqa_batching --requests 32 --max-batch-size 8
+"""
+import argparse
+import random
+import threading
+import time
+
+import torch
+from transformers import LogitsProcessorList
+
+from app.batching import VQABatchScheduler
+from app.confidence import ConfidenceTracker
+from benchmarks.tiny_llava import build_inputs, build_model
+
+
+def make_run_batch(model, max_new_tokens: int):
+    """
+    Build a run_batch function that mirrors vqa_model.ask_vqa_batch for the
+    tiny model. Questions are token counts because there is no tokenizer.
+    """
+    def run_batch(images, questions):
+        inputs = build_inputs(model, questions)
+        tracker = ConfidenceTracker()
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                min_new_tokens=max_new_tokens,  # random weights: keep the workload fixed
+                logits_processor=LogitsProcessorList([tracker]),
+                return_dict_in_generate=True,
+                do_sample=False,
+            )
+        generated = outputs.sequences[:, inputs["input_ids"].shape[1]:]
+        return [
+            (
+                " ".join(str(t) for t in generated[row].tolist()),
+                tracker.confidence(row, max_new_tokens - 1),
+            )
+            for row in range(len(questions))
+        ]
+
+    return run_batch
+
+
+def run_load(scheduler: VQABatchScheduler, question_lengths: list) -> float:
+    """
+    Submit every request from its own thread and wait for all answers.
+
+    Returns:
+        float: Wall-clock seconds for the whole load
+    """
+    results = [None] * len(question_lengths)
+
+    def client(i):
+        results[i] = scheduler.submit(None, question_lengths[i]).result()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(len(question_lengths))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    assert all(result is not None for result in results)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32, help="Number of concurrent requests")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--window-ms", type=float, default=25.0)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model = build_model()
+    run_batch = make_run_batch(model, args.max_new_tokens)
+
+    rng = random.Random(0)
+    question_lengths = [rng.randint(6, 24) for _ in range(args.requests)]
+
+    # Warm up kernels and allocator so neither run pays first-call costs
+    run_batch([None, None], question_lengths[:2])
+
+    print(f"Requests: {args.requests}, max_new_tokens: {args.max_new_tokens}")
+    print(f"{'mode':<12}{'seconds':>10}{'answers/s':>12}{'avg batch':>12}")
+
+    for label, max_batch_size in (("sequential", 1), ("batched", args.max_batch_size)):
+        scheduler = VQABatchScheduler(run_batch, max_batch_size=max_batch_size, window_ms=args.window_ms)
+        elapsed = run_load(scheduler, question_lengths)
+        stats = scheduler.stats()
+        print(
+            f"{label:<12}{elapsed:>10.2f}{args.requests / elapsed:>12.2f}"
+            f"{stats['avg_batch_size']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Speed, memory and answer-agreement benchmark for VQA precision modes.
+
+Runs a fixed local question set through llava-1.5-7b once per precision
+mode, each in a fresh subprocess, and reports decode tokens/sec, peak RSS
+and how often each mode's answer matches the fp32 answer.
+
+The question set is a JSON file listing image/question pairs; image
+paths are relative to the JSON file:
+    [
+        {"image": "images/car.jpg", "question": "What color is the car?"},
+        ...
+    ]
+
+Usage (from the backend directory; Linux/macOS only):
+    python -m benchmarks.bench_vqa_precision questions.json --precisions fp32,bf16,int8
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from PIL import Image
+
+
+def peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def normalize(answer: str) -> str:
+    return " ".join(answer.lower().strip(" .").split())
+
+
+def run_precision(question_file: str, precision: str, max_new_tokens: int) -> dict:
+    """
+    Answer every question with one precision mode in this process.
+    """
+    from app import vqa_model
+    from app.utils import image_content_hash
+
+    # Measure the model itself, not the caches
+    vqa_model.VQA_MAX_NEW_TOKENS = max_new_tokens
+    vqa_model.VQA_PREFIX_CACHE_MB = 0
+
+    with open(question_file) as f:
+        questions = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(question_file))
+
+    load_start = time.perf_counter()
+    llava = vqa_model._load_model(precision)
+    load_seconds = time.perf_counter() - load_start
+
+    answers = []
+    total_tokens = 0
+    total_seconds = 0.0
+    for item in questions:
+        image = Image.open(os.path.join(base_dir, item["image"])).convert("RGB")
+        vqa_model.feature_cache.memory.clear()
+
+        start = time.perf_counter()
+        answer, confidence = vqa_model._ask_vqa_single(
+            llava, image_content_hash(image), image, item["question"]
+        )
+        total_seconds += time.perf_counter() - start
+
+        total_tokens += len(llava.processor.tokenizer(answer, add_special_tokens=False)["input_ids"])
+        answers.append({"answer": answer, "confidence": confidence})
+
+    return {
+        "precision": precision,
+        "load_seconds": load_seconds,
+        "tokens": total_tokens,
+        "seconds": total_seconds,
+        "peak_rss": peak_rss(),
+        "answers": answers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="JSON file of image/question pairs")
+    parser.add_argument("--precisions", default="fp32,bf16,int8", help="Comma-separated precision modes")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_precision(args.questions, args.child, args.max_new_tokens)))
+        return
+
+    precisions = [p.strip() for p in args.precisions.split(",") if p.strip()]
+    if "fp32" not in precisions:
+        precisions.insert(0, "fp32")  # reference for agreement
+
+    results = {}
+    for precision in precisions:
+        print(f"[INFO] Running {precision}...", file=sys.stderr)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_vqa_precision", args.questions,
+             "--child", precision, "--max-new-tokens", str(args.max_new_tokens)],
+            check=True, stdout=subprocess.PIPE, text=True,
+        ).stdout
+        results[precision] = json.loads(output.strip().splitlines()[-1])
+
+    reference = [normalize(a["answer"]) for a in results["fp32"]["answers"]]
+
+    gb = 1024 ** 3
+    print(f"{'precision':<10}{'load s':>9}{'tokens/s':>10}{'peak RSS GB':>13}{'agreement':>11}{'mean |dconf|':>14}")
+    for precision, result in results.items():
+        answers = result["answers"]
+        agreement = sum(normalize(a["answer"]) == ref for a, ref in zip(answers, reference)) / len(reference)
+        conf_diff = sum(
+            abs(a["confidence"] - b["confidence"]) for a, b in zip(answers, results["fp32"]["answers"])
+        ) / len(reference)
+        tokens_per_second = result["tokens"] / result["seconds"] if result["seconds"] else 0.0
+        print(
+            f"{precision:<10}{result['load_seconds']:>9.1f}{tokens_per_second:>10.2f}"
+            f"{result['peak_rss'] / gb:>13.2f}{agreement:>11.0%}{conf_diff:>14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
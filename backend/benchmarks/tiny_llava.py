@@ -0,0 +1,107 @@
+"""
+Tiny random-weight LLaVA model shared by the benchmark scripts.
+
+The model has the same architecture as llava-1.5 (CLIP vision tower,
+projector, Llama language model) but only a few small layers, so it
+builds in a second on CPU and needs no download. Inputs are built
+directly as token ids because there is no tokenizer for random weights.
+"""
+import torch
+from transformers import CLIPVisionConfig, LlamaConfig, LlavaConfig, LlavaForConditionalGeneration
+
+PAD_TOKEN_ID = 0
+BOS_TOKEN_ID = 1
+EOS_TOKEN_ID = 2
+IMAGE_TOKEN_ID = 31999
+VOCAB_SIZE = 32000
+
+IMAGE_SIZE = 112
+PATCH_SIZE = 14
+# "default" feature selection drops the CLS token
+NUM_IMAGE_TOKENS = (IMAGE_SIZE // PATCH_SIZE) ** 2
+
+
+def build_model(
+    hidden_size: int = 256,
+    num_layers: int = 4,
+    vocab_size: int = VOCAB_SIZE,
+    seed: int = 0,
+) -> LlavaForConditionalGeneration:
+    """
+    Build a tiny LLaVA model with random weights.
+    """
+    torch.manual_seed(seed)
+
+    vision_config = CLIPVisionConfig(
+        hidden_size=64,
+        intermediate_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        image_size=IMAGE_SIZE,
+        patch_size=PATCH_SIZE,
+    )
+    text_config = LlamaConfig(
+        vocab_size=vocab_size,
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 2,
+        num_hidden_layers=num_layers,
+        num_attention_heads=4,
+        num_key_value_heads=4,
+        max_position_embeddings=2048,
+        pad_token_id=PAD_TOKEN_ID,
+        bos_token_id=BOS_TOKEN_ID,
+        eos_token_id=EOS_TOKEN_ID,
+    )
+    config = LlavaConfig(
+        vision_config=vision_config,
+        text_config=text_config,
+        image_token_index=min(IMAGE_TOKEN_ID, vocab_size - 1),
+        vision_feature_layer=-2,
+        vision_feature_select_strategy="default",
+    )
+
+    model = LlavaForConditionalGeneration(config)
+    model.eval()
+    return model
+
+
+def build_inputs(model: LlavaForConditionalGeneration, question_lengths: list, seed: int = 0) -> dict:
+    """
+    Build a left-padded batch of "<bos> <image>... question" prompts.
+
+    Args:
+        model: Model returned by build_model()
+        question_lengths: Number of question tokens for each row
+
+    Returns:
+        dict: input_ids, attention_mask and pixel_values for generate()
+    """
+    generator = torch.Generator().manual_seed(seed)
+    image_token_id = model.config.image_token_index
+    vocab_size = model.config.text_config.vocab_size
+
+    rows = []
+    for length in question_lengths:
+        question = torch.randint(3, min(image_token_id, vocab_size) - 1, (length,), generator=generator)
+        rows.append(torch.cat([
+            torch.tensor([BOS_TOKEN_ID]),
+            torch.full((NUM_IMAGE_TOKENS,), image_token_id),
+            question,
+        ]))
+
+    width = max(row.shape[0] for row in rows)
+    input_ids = torch.full((len(rows), width), PAD_TOKEN_ID)
+    attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+    for i, row in enumerate(rows):
+        input_ids[i, width - row.shape[0]:] = row
+        attention_mask[i, width - row.shape[0]:] = 1
+
+    pixel_values = torch.randn(
+        (len(rows), 3, IMAGE_SIZE, IMAGE_SIZE), generator=generator
+    )
+
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "pixel_values": pixel_values,
+    }
@@ -0,0 +1,93 @@
+import threading
+
+from app.counters import CounterBuffer
+
+
+class FakeTable:
+    """
+    View counts of a GeneratedImages-like table plus the running total that
+    generation_stats keeps: flushed deltas are added to it, deleted rows
+    subtract the count they held.
+    """
+
+    def __init__(self, image_ids):
+        self.views = {image_id: 0 for image_id in image_ids}
+        self.total_views = 0
+        self.flushing = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def flush(self, deltas):
+        self.flushing.set()
+        self.release.wait(5)
+        for image_id, (views, _) in deltas.items():
+            # An UPDATE of a deleted row matches nothing
+            if image_id in self.views:
+                self.views[image_id] += views
+        self.total_views += sum(views for views, _ in deltas.values())
+
+    def delete(self, buffer, image_id):
+        buffer.discard(image_id)
+        self.total_views -= self.views.pop(image_id)
+
+
+def make_buffer(table):
+    # Long interval so only explicit flushes run
+    return CounterBuffer(table.flush, flush_interval=3600, flush_events=10 ** 6)
+
+
+def test_discard_drops_pending_increments():
+    table = FakeTable([1, 2])
+    buffer = make_buffer(table)
+    buffer.increment(1, "views", 3)
+    buffer.increment(2, "views", 2)
+
+    table.delete(buffer, 1)
+    buffer.flush()
+
+    assert buffer.pending(1) == (0, 0)
+    assert table.views == {2: 2}
+    assert table.total_views == sum(table.views.values())
+    buffer.close()
+
+
+def test_increments_after_discard_are_ignored():
+    table = FakeTable([1])
+    buffer = make_buffer(table)
+    table.delete(buffer, 1)
+
+    buffer.increment(1, "views")
+    buffer.increment(1, "downloads")
+
+    assert buffer.pending(1) == (0, 0)
+    assert buffer.stats()["pending_events"] == 0
+    assert buffer.flush() == 0
+    buffer.close()
+
+
+def test_delete_during_flush():
+    table = FakeTable([1, 2])
+    buffer = make_buffer(table)
+    buffer.increment(1, "views", 5)
+    buffer.increment(2, "views", 1)
+
+    # Hold the flush after it has taken the batch, then delete image 1
+    table.release.clear()
+    flusher = threading.Thread(target=buffer.flush)
+    flusher.start()
+    assert table.flushing.wait(5)
+
+    deleter = threading.Thread(target=table.delete, args=(buffer, 1))
+    deleter.start()
+    deleter.join(0.1)
+    assert deleter.is_alive(), "discard must wait for the in-flight batch"
+
+    table.release.set()
+    flusher.join(5)
+    deleter.join(5)
+    buffer.increment(1, "views")
+    buffer.flush()
+
+    assert table.views == {2: 1}
+    assert table.total_views == sum(table.views.values())
+    buffer.close()
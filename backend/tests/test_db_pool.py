@@ -0,0 +1,69 @@
+from app.db_pool import connect_sqlite, translate_tsql
+
+
+def normalize(sql):
+    return " ".join(sql.split())
+
+
+def test_output_inserted_becomes_returning():
+    sql, params = translate_tsql(
+        "INSERT INTO Images (Name) OUTPUT INSERTED.ImageID VALUES (?);", ("a",)
+    )
+    assert normalize(sql) == "INSERT INTO Images (Name) VALUES (?) RETURNING ImageID"
+    assert params == ("a",)
+
+
+def test_getdate_and_cast_as_date():
+    sql, _ = translate_tsql(
+        "SELECT CAST(GenerationTime AS DATE), COUNT(*) FROM Images "
+        "WHERE GenerationTime <= GETDATE() GROUP BY CAST( GenerationTime as date )",
+        ()
+    )
+    assert normalize(sql) == (
+        "SELECT DATE(GenerationTime), COUNT(*) FROM Images "
+        "WHERE GenerationTime <= CURRENT_TIMESTAMP GROUP BY DATE(GenerationTime)"
+    )
+
+
+def test_select_top_moves_its_parameter_to_limit():
+    sql, params = translate_tsql(
+        "\n    SELECT TOP (?) ImageID FROM Images WHERE ImageID < ? ORDER BY ImageID DESC\n    ", (10, 500)
+    )
+    assert normalize(sql) == "SELECT ImageID FROM Images WHERE ImageID < ? ORDER BY ImageID DESC LIMIT ?"
+    assert params == (500, 10)
+
+
+def test_top_inside_a_statement_is_left_alone():
+    original = "UPDATE Jobs SET Status = 'processing' WHERE JobID = (SELECT TOP (?) JobID FROM Jobs)"
+    assert translate_tsql(original, (1,)) == (original, (1,))
+
+
+def test_plain_statements_are_unchanged():
+    original = "SELECT ImageID FROM Images WHERE Name = ?"
+    assert translate_tsql(original, ("a",)) == (original, ("a",))
+
+
+def test_sqlite_cursor_runs_translated_statements():
+    conn = connect_sqlite(":memory:")
+    conn.execute(
+        "CREATE TABLE Images (ImageID INTEGER PRIMARY KEY AUTOINCREMENT, Name TEXT, "
+        "CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    )
+    cursor = conn.cursor()
+
+    ids = []
+    for name in ["a", "b", "c"]:
+        cursor.execute("INSERT INTO Images (Name) OUTPUT INSERTED.ImageID VALUES (?)", (name,))
+        ids.append(cursor.fetchone()[0])
+    assert ids == [1, 2, 3]
+
+    cursor.execute("SELECT TOP (?) Name FROM Images WHERE ImageID > ? ORDER BY ImageID", (1, 1))
+    assert cursor.fetchall() == [("b",)]
+
+    cursor.execute("SELECT COUNT(*) FROM Images WHERE CAST(CreatedAt AS DATE) <= GETDATE()")
+    assert cursor.fetchone()[0] == 3
+
+    cursor.executemany("UPDATE Images SET Name = ? WHERE ImageID = ?", [("x", 1), ("y", 2)])
+    cursor.execute("SELECT Name FROM Images ORDER BY ImageID")
+    assert cursor.fetchall() == [("x",), ("y",), ("c",)]
+    conn.close()
@@ -0,0 +1,56 @@
+import pytest
+
+from app.file_serving import RangeNotSatisfiable, etag_matches, parse_range
+
+ETAG = '"abc123"'
+
+
+def test_no_range_sends_whole_file():
+    assert parse_range(None, 100) is None
+    assert parse_range("", 100) is None
+
+
+def test_unsupported_forms_send_whole_file():
+    assert parse_range("bytes=0-9,20-29", 100) is None
+    assert parse_range("items=0-9", 100) is None
+    assert parse_range("bytes=-", 100) is None
+
+
+def test_closed_and_open_ranges():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    # An end past the file is clamped to the last byte
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+
+
+def test_suffix_range():
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=200-300", "bytes=9-5", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable) as excinfo:
+        parse_range(header, 100)
+    assert excinfo.value.file_size == 100
+
+
+@pytest.mark.parametrize("header", ["bytes=-5", "bytes=0-", "bytes=0-0"])
+def test_no_range_of_an_empty_file_is_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 0)
+
+
+def test_etag_matches():
+    assert etag_matches(ETAG, ETAG)
+    assert etag_matches(f'"other", {ETAG}', ETAG)
+    assert etag_matches("*", ETAG)
+    # If-None-Match uses weak comparison
+    assert etag_matches(f"W/{ETAG}", ETAG)
+
+
+def test_etag_does_not_match():
+    assert not etag_matches(None, ETAG)
+    assert not etag_matches("", ETAG)
+    assert not etag_matches('"other"', ETAG)
+    assert not etag_matches('"abc"', ETAG)
@@ -0,0 +1,84 @@
+import threading
+
+from app import generation_stats
+from app.generation_stats import GenerationStats
+
+
+def rows_for(count):
+    return [("2026-10-17", "sd", "completed", count, 0, 0, 0, 0, 0)] if count else []
+
+
+def test_write_overlapping_reconcile_is_counted_once(monkeypatch):
+    monkeypatch.setattr(generation_stats, "RECONCILE_QUIET_WAIT", 0.01)
+    stats = GenerationStats()
+    stats.reconcile(lambda: [])
+    table = []
+    queried = threading.Event()
+    committed = threading.Event()
+
+    def load_rows():
+        count = len(table)
+        if not queried.is_set():
+            queried.set()
+            # A write commits while the first query is still running
+            committed.wait(5)
+        return rows_for(count)
+
+    def insert():
+        queried.wait(5)
+        with stats.writing():
+            table.append(1)
+            stats.record_insert("completed", "sd", None, None)
+        committed.set()
+
+    writer = threading.Thread(target=insert)
+    writer.start()
+    stats.reconcile(load_rows)
+    writer.join(5)
+
+    assert stats.snapshot()["total_images"] == 1
+
+
+def test_reconcile_holds_back_writers_after_retries(monkeypatch):
+    monkeypatch.setattr(generation_stats, "RECONCILE_ATTEMPTS", 0)
+    stats = GenerationStats()
+    querying = threading.Event()
+    release = threading.Event()
+
+    def load_rows():
+        querying.set()
+        release.wait(5)
+        return rows_for(2)
+
+    reconciler = threading.Thread(target=stats.reconcile, args=(load_rows,))
+    reconciler.start()
+    assert querying.wait(5)
+
+    entered = threading.Event()
+
+    def insert():
+        with stats.writing():
+            entered.set()
+            stats.record_insert("completed", "sd", None, None)
+
+    writer = threading.Thread(target=insert)
+    writer.start()
+    assert not entered.wait(0.1), "writers wait while the last attempt runs"
+
+    release.set()
+    reconciler.join(5)
+    writer.join(5)
+    assert stats.snapshot()["total_images"] == 3
+
+
+def test_ensure_loaded_skips_when_already_loaded():
+    stats = GenerationStats()
+    calls = []
+
+    def load_rows():
+        calls.append(1)
+        return rows_for(1)
+
+    stats.ensure_loaded(load_rows)
+    stats.ensure_loaded(load_rows)
+    assert len(calls) == 1
@@ -0,0 +1,151 @@
+from app import search_index as search_index_module
+from app.search_index import PromptIndex
+
+
+def make_index(rows):
+    index = PromptIndex()
+    index.load(rows)
+    return index
+
+
+def doc_ids(results):
+    return [doc_id for doc_id, _ in results]
+
+
+def test_rare_terms_and_repeats_rank_higher():
+    index = make_index([
+        (1, "a red castle on a hill", None),
+        (2, "a red red red castle", None),
+        (3, "a blue castle", None),
+        (4, "a red barn", None),
+    ])
+
+    results, total = index.search("red castle ")
+    assert total == 4
+    # 2 and 1 match both terms; 2 repeats "red" in a shorter prompt
+    assert doc_ids(results)[:2] == [2, 1]
+    scores = dict(results)
+    assert scores[2] > scores[1] > max(scores[3], scores[4])
+
+
+def test_shorter_prompts_rank_higher():
+    index = make_index([
+        (1, "castle", None),
+        (2, "castle in the mountains at dawn with fog", None),
+    ])
+    assert doc_ids(index.search("castle ")[0]) == [1, 2]
+
+
+def test_negative_prompts_count_for_less():
+    index = make_index([
+        (1, "portrait", "blurry"),
+        (2, "blurry portrait", None),
+    ])
+    results, total = index.search("blurry ")
+    assert total == 2
+    assert doc_ids(results) == [2, 1]
+
+
+def test_ties_go_to_the_newest_image():
+    index = make_index([(1, "cat", None), (2, "cat", None), (3, "cat", None)])
+    assert doc_ids(index.search("cat ")[0]) == [3, 2, 1]
+
+
+def test_paging():
+    index = make_index([(doc_id, "cat", None) for doc_id in range(1, 6)])
+    results, total = index.search("cat ", limit=2, offset=2)
+    assert doc_ids(results) == [3, 2]
+    assert total == 5
+
+
+def test_last_term_is_a_prefix():
+    index = make_index([
+        (1, "castle", None),
+        (2, "cast iron pan", None),
+        (3, "cat", None),
+    ])
+    assert sorted(doc_ids(index.search("cas")[0])) == [1, 2]
+    # A trailing separator ends the word
+    assert index.search("cas ")[0] == []
+    # Only the last term is expanded
+    assert index.search("cas tle")[0] == []
+
+
+def test_prefix_expansion_is_capped(monkeypatch):
+    monkeypatch.setattr(search_index_module, "SEARCH_PREFIX_EXPANSION", 2)
+    index = make_index([(1, "cab", None), (2, "cad", None), (3, "cafe", None)])
+    assert sorted(doc_ids(index.search("ca")[0])) == [1, 2]
+
+
+def test_stopwords_are_skipped_unless_alone():
+    index = make_index([(1, "the castle", None), (2, "the barn", None)])
+    assert doc_ids(index.search("the castle ")[0]) == [1]
+    assert sorted(doc_ids(index.search("the ")[0])) == [1, 2]
+
+
+def test_common_terms_fall_back_to_newest_postings(monkeypatch):
+    monkeypatch.setattr(search_index_module, "SEARCH_PRUNE_MIN_DOCS", 1)
+    monkeypatch.setattr(search_index_module, "SEARCH_COMMON_TERM_POSTINGS", 2)
+    index = make_index([(doc_id, "landscape photo", None) for doc_id in range(1, 11)])
+
+    results, total = index.search("landscape ")
+    assert doc_ids(results) == [10, 9]
+    assert total == 10
+
+
+def test_remove():
+    index = make_index([(1, "red castle", None), (2, "blue castle", None)])
+    index.remove(1)
+    index.remove(99)
+
+    assert doc_ids(index.search("castle ")[0]) == [2]
+    assert index.search("red ")[0] == []
+    # "red" left the vocabulary with its last document
+    assert index.search("re")[0] == []
+    assert index.stats() == {"documents": 1, "terms": 2, "loaded": True}
+
+
+def test_add_replaces_a_document():
+    index = make_index([(1, "red castle", None)])
+    index.add(1, "green meadow")
+
+    assert index.search("castle ")[0] == []
+    assert doc_ids(index.search("meadow ")[0]) == [1]
+    assert index.stats()["documents"] == 1
+
+
+def test_changes_during_load_are_replayed():
+    index = make_index([(1, "old castle", None)])
+
+    def rows():
+        yield 1, "old castle", None
+        yield 2, "stone bridge", None
+        # Written by other requests while the table is being read
+        index.add(3, "wooden bridge")
+        index.remove(2)
+        index.add(1, "new castle")
+        yield 4, "iron bridge", None
+
+    index.load(rows())
+
+    assert sorted(doc_ids(index.search("bridge ")[0])) == [3, 4]
+    assert doc_ids(index.search("new ")[0]) == [1]
+    assert index.search("old ")[0] == []
+    assert index.stats()["documents"] == 3
+
+
+def test_failed_load_keeps_the_old_index():
+    index = make_index([(1, "castle", None)])
+
+    def rows():
+        yield 2, "bridge", None
+        raise RuntimeError("connection lost")
+
+    try:
+        index.load(rows())
+    except RuntimeError:
+        pass
+    index.add(3, "castle")
+
+    assert sorted(doc_ids(index.search("castle ")[0])) == [1, 3]
+    assert index.search("bridge ")[0] == []
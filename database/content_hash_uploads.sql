@@ -0,0 +1,18 @@
+-- Content-addressed upload storage
+-- Run this once on an existing database created before ContentHash was added to init_db.sql
+
+USE VQA_DB;
+GO
+
+-- SHA-256 of the uploaded file bytes; NULL for rows not backfilled yet
+ALTER TABLE Images ADD ContentHash CHAR(64) NULL;
+GO
+
+-- Uploads are deduplicated on content, not file name
+CREATE UNIQUE INDEX UX_Images_ContentHash
+    ON Images (ContentHash)
+    WHERE ContentHash IS NOT NULL;
+GO
+
+-- Existing rows can then be hashed from their files with:
+--   python -c "from app import db; print(db.backfill_image_hashes())"
@@ -0,0 +1,13 @@
+-- Column and index used by the text-to-image job queue (app/generation_queue.py)
+-- Run this once on an existing database created before they were added to init_db.sql
+
+USE VQA_DB;
+GO
+
+-- Set when a worker claims a queued job, so jobs left behind by a crashed worker can be requeued
+ALTER TABLE GeneratedImages ADD StartedAt DATETIME NULL;
+GO
+
+-- Workers claim the oldest row with Status = 'queued'
+CREATE INDEX IX_GeneratedImages_Status ON GeneratedImages (Status, GeneratedImageID);
+GO
@@ -0,0 +1,9 @@
+-- Index backing the paginated /images/ listing
+-- Run this once on an existing database created before the index was added to init_db.sql
+
+USE VQA_DB;
+GO
+
+-- The listing counts questions per image with a single grouped join
+CREATE INDEX IX_Questions_ImageID ON Questions (ImageID);
+GO
@@ -8,16 +8,30 @@ CREATE TABLE Images (
     FileName NVARCHAR(255),
     FilePath NVARCHAR(500),
     FileData VARBINARY(MAX),
+    ContentHash CHAR(64) NULL, -- SHA-256 of the file bytes, used for dedup
     UploadTime DATETIME DEFAULT GETDATE()
 );
 
+CREATE UNIQUE INDEX UX_Images_ContentHash
+    ON Images (ContentHash)
+    WHERE ContentHash IS NOT NULL;
+
 CREATE TABLE Questions (
     QuestionID INT PRIMARY KEY IDENTITY(1,1),
     ImageID INT FOREIGN KEY REFERENCES Images(ImageID),
     QuestionText NVARCHAR(MAX),
+    QuestionHash CHAR(64) NULL, -- SHA-256 of QuestionText (UTF-16LE), since NVARCHAR(MAX) cannot be indexed
     AskedTime DATETIME DEFAULT GETDATE()
 );
 
+-- Per-image question counts for the paginated /images/ listing
+CREATE INDEX IX_Questions_ImageID ON Questions (ImageID);
+
+-- One row per question per image; get_or_create_answer upserts on this
+CREATE UNIQUE INDEX UX_Questions_ImageID_QuestionHash
+    ON Questions (ImageID, QuestionHash)
+    WHERE QuestionHash IS NOT NULL;
+
 CREATE TABLE Answers (
     AnswerID INT PRIMARY KEY IDENTITY(1,1),
     QuestionID INT FOREIGN KEY REFERENCES Questions(QuestionID),
@@ -26,6 +40,8 @@ CREATE TABLE Answers (
     AnswerTime DATETIME DEFAULT GETDATE()
 );
 
+CREATE INDEX IX_Answers_QuestionID ON Answers (QuestionID);
+
 -- Table to store generated images with prompts and metadata
 CREATE TABLE GeneratedImages (
     GeneratedImageID INT PRIMARY KEY IDENTITY(1,1),
@@ -50,8 +66,9 @@ CREATE TABLE GeneratedImages (
     UserID INT NULL,
     
     -- Status tracking
-    Status NVARCHAR(50) DEFAULT 'completed', -- completed, failed, processing
+    Status NVARCHAR(50) DEFAULT 'completed', -- completed, failed, queued, processing
     ErrorMessage NVARCHAR(MAX) NULL,
+    StartedAt DATETIME NULL, -- when a queue worker claimed the job
     
     -- File info
     FileSize BIGINT, -- in bytes
@@ -62,7 +79,8 @@ CREATE TABLE GeneratedImages (
     
     -- Indexing for faster queries
     INDEX IX_GeneratedImages_GenerationTime (GenerationTime DESC),
-    INDEX IX_GeneratedImages_Seed (Seed)
+    INDEX IX_GeneratedImages_Seed (Seed),
+    INDEX IX_GeneratedImages_Status (Status, GeneratedImageID) -- job queue claims the oldest queued row
 );
 GO
 
@@ -0,0 +1,32 @@
+-- Indexed question lookup for get_or_create_answer
+-- Run this once on an existing database created before QuestionHash was added to init_db.sql
+
+USE VQA_DB;
+GO
+
+-- SHA-256 of QuestionText as UTF-16LE, i.e. HASHBYTES on the NVARCHAR value
+ALTER TABLE Questions ADD QuestionHash CHAR(64) NULL;
+GO
+
+-- Backfill the earliest row of each (ImageID, question); later duplicates
+-- created by the old racy insert stay NULL so the unique index can be built
+UPDATE q
+SET QuestionHash = h.QuestionHash
+FROM Questions q
+JOIN (
+    SELECT
+        MIN(QuestionID) AS QuestionID,
+        LOWER(CONVERT(CHAR(64), HASHBYTES('SHA2_256', QuestionText), 2)) AS QuestionHash
+    FROM Questions
+    WHERE QuestionText IS NOT NULL
+    GROUP BY ImageID, HASHBYTES('SHA2_256', QuestionText)
+) h ON q.QuestionID = h.QuestionID;
+GO
+
+CREATE UNIQUE INDEX UX_Questions_ImageID_QuestionHash
+    ON Questions (ImageID, QuestionHash)
+    WHERE QuestionHash IS NOT NULL;
+GO
+
+CREATE INDEX IX_Answers_QuestionID ON Answers (QuestionID);
+GO
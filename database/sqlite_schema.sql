@@ -0,0 +1,103 @@
+-- SQLite version of the schema for local load testing (DB_BACKEND=sqlite)
+-- Applied automatically by app/db.py each time a pooled connection is opened
+
+CREATE TABLE IF NOT EXISTS Images (
+    ImageID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FileName TEXT,
+    FilePath TEXT,
+    FileData BLOB,
+    ContentHash CHAR(64) NULL, -- SHA-256 of the file bytes, used for dedup
+    UploadTime DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Images_ContentHash
+    ON Images (ContentHash)
+    WHERE ContentHash IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS Questions (
+    QuestionID INTEGER PRIMARY KEY AUTOINCREMENT,
+    ImageID INT REFERENCES Images(ImageID),
+    QuestionText TEXT,
+    QuestionHash CHAR(64) NULL,
+    AskedTime DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS IX_Questions_ImageID ON Questions (ImageID);
+
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Questions_ImageID_QuestionHash
+    ON Questions (ImageID, QuestionHash)
+    WHERE QuestionHash IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS Answers (
+    AnswerID INTEGER PRIMARY KEY AUTOINCREMENT,
+    QuestionID INT REFERENCES Questions(QuestionID),
+    AnswerText TEXT,
+    ConfidenceScore FLOAT,
+    AnswerTime DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS IX_Answers_QuestionID ON Answers (QuestionID);
+
+CREATE TABLE IF NOT EXISTS GeneratedImages (
+    GeneratedImageID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Prompt TEXT NOT NULL,
+    NegativePrompt TEXT,
+    FilePath TEXT NOT NULL,
+    FileName TEXT NOT NULL,
+
+    -- Generation parameters
+    Seed INT,
+    NumInferenceSteps INT DEFAULT 30,
+    GuidanceScale FLOAT DEFAULT 7.5,
+    ImageWidth INT DEFAULT 512,
+    ImageHeight INT DEFAULT 512,
+
+    -- Metadata
+    GenerationTime DATETIME DEFAULT CURRENT_TIMESTAMP,
+    GenerationDuration FLOAT,
+    ModelUsed TEXT DEFAULT 'stable-diffusion-2-1',
+    UserID INT NULL,
+
+    -- Status tracking
+    Status TEXT DEFAULT 'completed',
+    ErrorMessage TEXT NULL,
+    StartedAt DATETIME NULL,
+
+    -- File info
+    FileSize BIGINT,
+
+    -- Engagement tracking
+    ViewCount INT DEFAULT 0,
+    DownloadCount INT DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS IX_GeneratedImages_GenerationTime ON GeneratedImages (GenerationTime DESC);
+CREATE INDEX IF NOT EXISTS IX_GeneratedImages_Seed ON GeneratedImages (Seed);
+CREATE INDEX IF NOT EXISTS IX_GeneratedImages_Status ON GeneratedImages (Status, GeneratedImageID);
+
+CREATE TABLE IF NOT EXISTS ImageFavorites (
+    FavoriteID INTEGER PRIMARY KEY AUTOINCREMENT,
+    GeneratedImageID INT REFERENCES GeneratedImages(GeneratedImageID) ON DELETE CASCADE,
+    UserID INT NULL,
+    FavoritedAt DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS IX_ImageFavorites_GeneratedImageID ON ImageFavorites (GeneratedImageID);
+
+CREATE TABLE IF NOT EXISTS ImageVariations (
+    VariationID INTEGER PRIMARY KEY AUTOINCREMENT,
+    OriginalImageID INT REFERENCES GeneratedImages(GeneratedImageID),
+    VariationImageID INT REFERENCES GeneratedImages(GeneratedImageID),
+    VariationType TEXT,
+    CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS PromptTags (
+    TagID INTEGER PRIMARY KEY AUTOINCREMENT,
+    GeneratedImageID INT REFERENCES GeneratedImages(GeneratedImageID) ON DELETE CASCADE,
+    TagName TEXT NOT NULL,
+    CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS IX_PromptTags_TagName ON PromptTags (TagName);
+CREATE INDEX IF NOT EXISTS IX_PromptTags_GeneratedImageID ON PromptTags (GeneratedImageID);
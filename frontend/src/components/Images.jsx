@@ -3,6 +3,8 @@ import React, { useEffect, useState } from "react";
 
 const Images = () => {
   const [vqaImages, setVqaImages] = useState([]);
+  const [vqaNextCursor, setVqaNextCursor] = useState(null);
+  const [loadingMoreVQA, setLoadingMoreVQA] = useState(false);
   const [generatedImages, setGeneratedImages] = useState([]);
   const [loadingVQA, setLoadingVQA] = useState(true);
   const [loadingGenerated, setLoadingGenerated] = useState(true);
@@ -17,16 +19,23 @@ const Images = () => {
     fetchGeneratedImages();
   }, []);
 
-  const fetchVQAImages = async () => {
+  // /images/ is paged; X-Next-Cursor is absent on the last page
+  const fetchVQAImages = async (cursor = null) => {
+    if (cursor !== null) setLoadingMoreVQA(true);
     try {
-      const res = await fetch("http://localhost:8000/images/");
+      const url = cursor !== null
+        ? `http://localhost:8000/images/?cursor=${cursor}`
+        : "http://localhost:8000/images/";
+      const res = await fetch(url);
       if (!res.ok) throw new Error("Failed to fetch VQA images");
       const data = await res.json();
-      setVqaImages(data);
+      setVqaImages((prev) => (cursor !== null ? [...prev, ...data] : data));
+      setVqaNextCursor(res.headers.get("X-Next-Cursor"));
     } catch (err) {
       console.error(err);
     } finally {
       setLoadingVQA(false);
+      setLoadingMoreVQA(false);
     }
   };
 
@@ -73,13 +82,25 @@ const Images = () => {
     setImageQuestions([]);
   };
 
-  const handleDownload = (imageData, filename) => {
-    const link = document.createElement("a");
-    link.href = imageData;
-    link.download = filename;
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
+  // List entries carry thumbnails; the original file is served from image_url
+  const fullImageUrl = (image) => `http://localhost:8000${image.image_url}`;
+
+  const handleDownload = async (imageUrl, filename) => {
+    try {
+      // The download attribute is ignored for cross-origin links, so go through a blob
+      const res = await fetch(imageUrl);
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const objectUrl = URL.createObjectURL(await res.blob());
+      const link = document.createElement("a");
+      link.href = objectUrl;
+      link.download = filename;
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      URL.revokeObjectURL(objectUrl);
+    } catch (err) {
+      console.error("Error downloading image:", err);
+    }
   };
 
   const LoadingSpinner = () => (
@@ -252,6 +273,27 @@ const Images = () => {
               ))}
             </div>
           )}
+          {!loadingVQA && vqaNextCursor && (
+            <div style={{ display: "flex", justifyContent: "center", marginTop: "2rem" }}>
+              <button
+                onClick={() => fetchVQAImages(vqaNextCursor)}
+                disabled={loadingMoreVQA}
+                style={{
+                  padding: "0.875rem 2rem",
+                  fontSize: "1rem",
+                  fontWeight: "600",
+                  border: "none",
+                  borderRadius: "12px",
+                  cursor: loadingMoreVQA ? "wait" : "pointer",
+                  background: "linear-gradient(135deg, #6366f1 0%, #4f46e5 100%)",
+                  color: "white",
+                  opacity: loadingMoreVQA ? 0.7 : 1
+                }}
+              >
+                {loadingMoreVQA ? "Loading..." : "Load more"}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
@@ -373,7 +415,7 @@ const Images = () => {
               <div style={{ textAlign: "center", marginBottom: "2rem" }}>
                 {selectedImage.image_data && (
                   <img
-                    src={selectedImage.image_data}
+                    src={fullImageUrl(selectedImage)}
                     alt={selectedImage.filename}
                     style={{
                       maxWidth: "100%",
@@ -533,7 +575,7 @@ const Images = () => {
             <div style={{ padding: "2rem" }}>
               <div style={{ textAlign: "center", marginBottom: "1.5rem" }}>
                 <img
-                  src={selectedGenerated.image_data}
+                  src={fullImageUrl(selectedGenerated)}
                   alt={selectedGenerated.prompt}
                   style={{
                     maxWidth: "100%",
@@ -634,7 +676,7 @@ const Images = () => {
               </div>
 
               <button
-                onClick={() => handleDownload(selectedGenerated.image_data, selectedGenerated.filename)}
+                onClick={() => handleDownload(fullImageUrl(selectedGenerated), selectedGenerated.filename)}
                 style={{
                   width: "100%",
                   padding: "0.875rem",
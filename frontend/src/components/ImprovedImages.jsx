@@ -2,6 +2,8 @@ import React, { useEffect, useState } from "react";
 
 const ImprovedImages = () => {
   const [vqaImages, setVqaImages] = useState([]);
+  const [vqaNextCursor, setVqaNextCursor] = useState(null);
+  const [loadingMoreVQA, setLoadingMoreVQA] = useState(false);
   const [generatedImages, setGeneratedImages] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedImage, setSelectedImage] = useState(null);
@@ -24,6 +26,7 @@ const ImprovedImages = () => {
       if (vqaRes.ok) {
         const vqaData = await vqaRes.json();
         setVqaImages(vqaData);
+        setVqaNextCursor(vqaRes.headers.get("X-Next-Cursor"));
       }
 
       if (genRes.ok) {
@@ -37,6 +40,22 @@ const ImprovedImages = () => {
     }
   };
 
+  // /images/ is paged; X-Next-Cursor is absent on the last page
+  const fetchMoreVQAImages = async () => {
+    setLoadingMoreVQA(true);
+    try {
+      const res = await fetch(`http://localhost:8000/images/?cursor=${vqaNextCursor}`);
+      if (!res.ok) throw new Error("Failed to fetch VQA images");
+      const data = await res.json();
+      setVqaImages((prev) => [...prev, ...data]);
+      setVqaNextCursor(res.headers.get("X-Next-Cursor"));
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMoreVQA(false);
+    }
+  };
+
   const fetchImageQuestions = async (imageId) => {
     setLoadingQuestions(true);
     try {
@@ -308,6 +327,28 @@ const ImprovedImages = () => {
                 ))}
               </div>
             )}
+
+            {vqaNextCursor && (
+              <div style={{ textAlign: "center", marginTop: "1.5rem" }}>
+                <button
+                  onClick={fetchMoreVQAImages}
+                  disabled={loadingMoreVQA}
+                  style={{
+                    padding: "0.75rem 1.5rem",
+                    fontSize: "0.875rem",
+                    fontWeight: "600",
+                    border: "none",
+                    borderRadius: "8px",
+                    cursor: loadingMoreVQA ? "wait" : "pointer",
+                    backgroundColor: "#6366f1",
+                    color: "white",
+                    opacity: loadingMoreVQA ? 0.7 : 1
+                  }}
+                >
+                  {loadingMoreVQA ? "Loading..." : "Load more"}
+                </button>
+              </div>
+            )}
           </div>
 
           {/* Generated Images Section */}
@@ -502,7 +543,7 @@ const ImprovedImages = () => {
             <div style={{ padding: "2rem" }}>
               <div style={{ textAlign: "center", marginBottom: "2rem" }}>
                 <img
-                  src={selectedImage.image_data}
+                  src={`http://localhost:8000${selectedImage.image_url}`}
                   alt={selectedImage.filename || selectedImage.prompt}
                   style={{
                     maxWidth: "100%",